@@ -0,0 +1,112 @@
+# benchmarks/bench_loader.py
+"""
+So sánh thời gian tải toàn bộ sheet giữa đường cũ (gspread_dataframe.get_as_dataframe
+với evaluate_formulas=True) và bộ tải mới trong utils.google_sheet_utils.
+
+Chạy không cần mạng, trên một worksheet giả lập có lưới lớn hơn vùng dữ liệu
+(giống sheet thật sau một thời gian dài append):
+
+    python -m benchmarks.bench_loader --rows 20000 --grid-rows 40000 --grid-cols 26
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from gspread_dataframe import get_as_dataframe
+from utils import google_sheet_utils
+from utils.google_sheet_utils import _full_reload
+
+# Worksheet giả lập là log chưa từng được nén: không đọc worksheet snapshot (cần kết nối thật)
+google_sheet_utils._read_log_snapshot = lambda sheet_id, headers, marker_only=False: ([], None)
+
+HEADERS = ['task_name', 'add_time', 'task_deadline', 'task_link', 'task_id',
+           'task_des', 'task_report_to', 'task_po', 'task_status', 'task_comment']
+STATUSES = ['Mới tạo', 'Đang thực hiện', 'Đã hoàn thành', 'Đã hủy']
+
+
+class _FakeSpreadsheet:
+    def __init__(self, values):
+        self._values = values
+
+    def values_get(self, range_name, params=None):
+        return {'values': self._values}
+
+
+class _FakeWorksheet:
+    """Worksheet giả lập: đủ các thuộc tính/phương thức mà hai đường tải sử dụng."""
+
+    title = 'Tasks_Processed'
+
+    def __init__(self, values, grid_rows, grid_cols):
+        self._values = values
+        self.row_count = grid_rows
+        self.col_count = grid_cols
+        self.spreadsheet = _FakeSpreadsheet(values)
+
+    def batch_get(self, range_names, **kwargs):
+        # API chỉ trả về vùng có dữ liệu, ô trống cuối hàng bị cắt bỏ
+        return [[list(row) for row in self._values] for _ in range_names]
+
+
+def make_values(rows: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    values = [HEADERS]
+    for i in range(rows):
+        values.append([
+            f"Công việc số {i % max(rows // 4, 1)}",
+            f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2025 {rng.randint(0, 23):02d}:00:00",
+            f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}" if rng.random() > 0.2 else '',
+            f"https://workingspace.familyhospital.vn/task/show/{i}?tab=1" if rng.random() > 0.5 else '',
+            f"TASK-{1700000000 + i}",
+            "Mô tả chi tiết công việc " * rng.randint(0, 4),
+            rng.choice(['an', 'binh', 'chi']),
+            rng.choice(['thu ky 1', 'thu ky 2', 'thu ky 3', '']),
+            rng.choice(STATUSES),
+            '',
+        ])
+    return values
+
+
+def _measure(fn, repeat: int):
+    """Thời gian tốt nhất trong repeat lần, và bộ nhớ đỉnh đo riêng (tracemalloc làm chậm)."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = fn()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000, help="số hàng dữ liệu")
+    parser.add_argument('--grid-rows', type=int, default=None, help="số hàng của lưới (mặc định gấp đôi --rows)")
+    parser.add_argument('--grid-cols', type=int, default=26, help="số cột của lưới")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    values = make_values(args.rows)
+    worksheet = _FakeWorksheet(values, args.grid_rows or args.rows * 2, args.grid_cols)
+
+    def load_new():
+        state = {'headers': None}
+        _full_reload('bench', worksheet, state)
+        return state['df']
+
+    results = [
+        ("get_as_dataframe (cũ)", _measure(lambda: get_as_dataframe(worksheet, evaluate_formulas=True), args.repeat)),
+        ("_full_reload (mới)", _measure(load_new, args.repeat)),
+    ]
+
+    print(f"{args.rows} hàng dữ liệu, lưới {worksheet.row_count}x{worksheet.col_count}, tốt nhất trong {args.repeat} lần")
+    print(f"{'Đường tải':<24}{'Thời gian (s)':>15}{'Bộ nhớ đỉnh (MB)':>20}{'Kích thước df':>16}")
+    for name, (seconds, peak, df) in results:
+        print(f"{name:<24}{seconds:>15.3f}{peak / 2 ** 20:>20.1f}{str(df.shape):>16}")
+
+
+if __name__ == '__main__':
+    main()
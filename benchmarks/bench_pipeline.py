@@ -0,0 +1,157 @@
+# benchmarks/bench_pipeline.py
+"""
+Đo thời gian và bộ nhớ đỉnh của từng bước xử lý log task trong utils.data_utils
+(chuẩn hóa, backfill, lọc bản mới nhất, deadline, quá hạn, tìm kiếm) khi log lớn dần,
+trên log giả lập tất định (benchmarks.synthetic_log). Không cần mạng:
+
+    python -m benchmarks.bench_pipeline --rows 10000 100000 1000000
+    python -m benchmarks.bench_pipeline --rows 100000 --compare .cache/benchmarks/pipeline-20261018-091500.json
+
+Mỗi lần chạy lưu kết quả thành JSON (--output, mặc định trong .cache/benchmarks/) kèm tham số
+sinh dữ liệu và phiên bản thư viện; --compare in tỉ lệ so với một lần chạy trước và đánh dấu
+các bước chậm hơn/tốn bộ nhớ hơn quá ngưỡng --threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import time
+import tracemalloc
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+from benchmarks.synthetic_log import make_task_log_frame
+from utils.data_utils import (
+    normalize_task_frame, backfill_data, filter_latest_tasks_by_name, reduce_task_log,
+    process_deadline_tasks, get_overdue_tasks, search_dataframe,
+)
+
+RESULTS_DIR = ".cache/benchmarks"
+
+
+def _stages(raw_df: pd.DataFrame, search_term: str) -> list:
+    """
+    Các bước cần đo theo thứ tự của pipeline: (tên, hàm). Mỗi bước dùng kết quả đã tính sẵn
+    của bước trước (không tính vào thời gian của bước đó).
+    """
+    df = normalize_task_frame(raw_df)
+    history = backfill_data(df)
+    latest = filter_latest_tasks_by_name(history)
+    return [
+        ('normalize_task_frame', lambda: normalize_task_frame(raw_df)),
+        ('backfill_data', lambda: backfill_data(df)),
+        ('filter_latest_tasks_by_name', lambda: filter_latest_tasks_by_name(history)),
+        ('reduce_task_log', lambda: reduce_task_log(df)),
+        ('process_deadline_tasks', lambda: process_deadline_tasks(latest)),
+        ('get_overdue_tasks', lambda: get_overdue_tasks(latest)),
+        ('search_dataframe (latest)', lambda: search_dataframe(latest, search_term, 'task_name')),
+        ('search_dataframe (log)', lambda: search_dataframe(history, search_term, 'task_des')),
+    ]
+
+
+def _result_rows(result) -> int:
+    """Số hàng kết quả của một bước (tổng các DataFrame nếu bước trả về nhiều nhóm)."""
+    if isinstance(result, pd.DataFrame):
+        return len(result)
+    if isinstance(result, dict):
+        return sum(_result_rows(value) for value in result.values())
+    if isinstance(result, tuple):
+        return sum(_result_rows(value) for value in result)
+    return 0
+
+
+def _measure(fn, repeat: int) -> dict:
+    """Thời gian tốt nhất trong repeat lần, và bộ nhớ đỉnh đo riêng (tracemalloc làm chậm)."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    del result
+    tracemalloc.start()
+    result = fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'seconds': best, 'peak_mb': peak / 2 ** 20, 'output_rows': _result_rows(result)}
+
+
+def run(rows_list: list, repeat: int, generator: dict) -> list:
+    results = []
+    for rows in rows_list:
+        start = time.perf_counter()
+        raw_df = make_task_log_frame(rows, **generator)
+        print(f"\n{rows} hàng log, {raw_df['task_name'].nunique()} task "
+              f"(sinh dữ liệu {time.perf_counter() - start:.1f}s)")
+        print(f"{'Bước':<32}{'Thời gian (s)':>15}{'Bộ nhớ đỉnh (MB)':>20}{'Hàng kết quả':>15}")
+        for stage, fn in _stages(raw_df, 'giao ban'):
+            measured = _measure(fn, repeat)
+            results.append({'rows': rows, 'stage': stage, **measured})
+            print(f"{stage:<32}{measured['seconds']:>15.3f}{measured['peak_mb']:>20.1f}{measured['output_rows']:>15}")
+    return results
+
+
+def compare(results: list, meta: dict, baseline_path: str, threshold: float):
+    """In tỉ lệ thời gian/bộ nhớ so với một lần chạy trước; đánh dấu ⚠️ các bước vượt ngưỡng."""
+    with open(baseline_path, encoding='utf-8') as f:
+        saved = json.load(f)
+    baseline = {(r['rows'], r['stage']): r for r in saved['results']}
+    print(f"\nSo với {baseline_path} (ngưỡng +{threshold:.0%}):")
+    if saved['meta'].get('generator') != meta['generator']:
+        print(f"⚠️ Tham số sinh dữ liệu khác lần chạy đó ({saved['meta'].get('generator')}), kết quả không so sánh trực tiếp được.")
+    print(f"{'Hàng':>9}  {'Bước':<32}{'Thời gian':>12}{'Bộ nhớ':>10}")
+    regressions = 0
+    for result in results:
+        before = baseline.get((result['rows'], result['stage']))
+        if before is None:
+            continue
+        time_ratio = result['seconds'] / before['seconds'] if before['seconds'] else float('inf')
+        memory_ratio = result['peak_mb'] / before['peak_mb'] if before['peak_mb'] else float('inf')
+        regressed = time_ratio > 1 + threshold or memory_ratio > 1 + threshold
+        regressions += regressed
+        print(f"{result['rows']:>9}  {result['stage']:<32}{time_ratio:>11.2f}x{memory_ratio:>9.2f}x"
+              f"{'  ⚠️' if regressed else ''}")
+    print(f"{regressions} bước chậm hơn hoặc tốn bộ nhớ hơn quá ngưỡng.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000], help="số hàng log (có thể nhiều giá trị)")
+    parser.add_argument('--revisions', type=float, default=5, help="số phiên bản trung bình mỗi task")
+    parser.add_argument('--secretaries', type=int, default=8, help="số thư ký (task_po)")
+    parser.add_argument('--blank-ratio', type=float, default=0.6, help="tỉ lệ ô trống cần backfill ở các phiên bản sau")
+    parser.add_argument('--legacy-ratio', type=float, default=0.3, help="tỉ lệ hàng đầu log dùng task_id kiểu cũ")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--base-date', type=date.fromisoformat, default=date.today(),
+                        help="ngày làm mốc cho deadline (YYYY-MM-DD, mặc định hôm nay)")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default=None, help="file JSON lưu kết quả (mặc định .cache/benchmarks/pipeline-<thời điểm>.json)")
+    parser.add_argument('--compare', default=None, help="file JSON của một lần chạy trước để so sánh")
+    parser.add_argument('--threshold', type=float, default=0.2, help="ngưỡng tăng (tỉ lệ) để đánh dấu hồi quy")
+    args = parser.parse_args()
+
+    generator = {
+        'revisions': args.revisions, 'secretaries': args.secretaries, 'blank_ratio': args.blank_ratio,
+        'legacy_ratio': args.legacy_ratio, 'seed': args.seed, 'base_date': args.base_date,
+    }
+    started_at = datetime.now()
+    results = run(args.rows, args.repeat, generator)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"pipeline-{started_at:%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    meta = {
+        'created_at': started_at.isoformat(timespec='seconds'),
+        'generator': {**generator, 'base_date': args.base_date.isoformat()},
+        'repeat': args.repeat,
+        'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__,
+        'machine': platform.machine(), 'platform': platform.platform(),
+    }
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'meta': meta, 'results': results}, f, ensure_ascii=False, indent=2)
+    print(f"\nĐã lưu kết quả vào {output}")
+
+    if args.compare:
+        compare(results, meta, args.compare, args.threshold)
+
+
+if __name__ == '__main__':
+    main()
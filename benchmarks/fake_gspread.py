@@ -0,0 +1,253 @@
+# benchmarks/fake_gspread.py
+"""
+Bản giả lập trong bộ nhớ của client gspread (đối tượng trả về bởi connect_to_google_sheet),
+dùng cho kiểm thử tải không cần mạng (xem benchmarks.load_test):
+
+    client = FakeClient(latency=0.2, read_quota=60, write_quota=60)
+    client.create_spreadsheet(SHEET_IDS['tasks'], {'Tasks_Processed': values})
+    google_sheet_utils.connect_to_google_sheet = lambda: client
+
+Hỗ trợ các lệnh mà ứng dụng dùng: open_by_key, worksheet, add_worksheet, row_values,
+append_row(s), batch_get/get/get_all_values (đọc vùng A1), update, resize, delete_rows.
+Mỗi lệnh là một lệnh gọi API: chịu độ trễ cấu hình được, bị tính vào hạn mức đọc/ghi theo cửa sổ
+thời gian (vượt hạn mức thì ném APIError 429 như Google Sheets), và có thể bị lỗi ngẫu nhiên
+(error_rate) để thử đường thử lại. Giá trị trả về giống FORMATTED_VALUE: chuỗi, bỏ ô trống cuối
+hàng và hàng trống cuối vùng.
+"""
+import json
+import random
+import threading
+import time
+from collections import Counter, deque
+import gspread
+import requests
+from gspread.utils import a1_range_to_grid_range
+
+
+def _api_error(code: int, status: str, message: str) -> gspread.exceptions.APIError:
+    """APIError giống lỗi thật của Google Sheets (gspread đọc mã lỗi từ nội dung JSON)."""
+    response = requests.Response()
+    response.status_code = code
+    response._content = json.dumps({'error': {'code': code, 'message': message, 'status': status}}).encode('utf-8')
+    return gspread.exceptions.APIError(response)
+
+
+def _trim(rows: list) -> list:
+    """Bỏ ô trống cuối mỗi hàng và các hàng trống cuối vùng, như API trả về."""
+    trimmed = []
+    for row in rows:
+        end = len(row)
+        while end and row[end - 1] == '':
+            end -= 1
+        trimmed.append([str(value) for value in row[:end]])
+    while trimmed and not trimmed[-1]:
+        trimmed.pop()
+    return trimmed
+
+
+class FakeClient:
+    """
+    Client giả lập dùng chung cho mọi phiên. Hạn mức mặc định giống hạn mức mỗi người dùng của
+    Google Sheets API (60 lệnh đọc và 60 lệnh ghi mỗi phút); mọi phiên của ứng dụng dùng chung
+    một service account nên dùng chung hạn mức.
+    """
+
+    def __init__(self, latency: float = 0.15, jitter: float = 0.05, read_quota: int = 60, write_quota: int = 60,
+                 quota_window: float = 60.0, error_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.quotas = {'read': read_quota, 'write': write_quota}
+        self.quota_window = quota_window
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._spreadsheets = {}
+        self._recent = {'read': deque(), 'write': deque()}
+        self._stats = Counter()
+
+    # --- Dữ liệu ---
+
+    def create_spreadsheet(self, key: str, worksheets: dict):
+        """Tạo spreadsheet với các worksheet {tên: danh sách hàng giá trị (hàng đầu là header)}."""
+        spreadsheet = FakeSpreadsheet(self, key)
+        for title, values in worksheets.items():
+            spreadsheet.add_worksheet_local(title, values)
+        self._spreadsheets[key] = spreadsheet
+        return spreadsheet
+
+    def open_by_key(self, key: str):
+        self.call('read', 'open_by_key')
+        if key not in self._spreadsheets:
+            raise gspread.exceptions.SpreadsheetNotFound(key)
+        return self._spreadsheets[key]
+
+    # --- Mô phỏng API ---
+
+    def call(self, kind: str, method: str):
+        """
+        Tính một lệnh gọi API: kiểm tra hạn mức theo cửa sổ trượt, lỗi ngẫu nhiên, rồi chờ độ trễ.
+        Lệnh bị từ chối (429) không được tính vào hạn mức, giống API thật.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._stats[f'calls.{method}'] += 1
+            recent = self._recent[kind]
+            while recent and recent[0] <= now - self.quota_window:
+                recent.popleft()
+            if len(recent) >= self.quotas[kind]:
+                self._stats[f'throttled.{kind}'] += 1
+                raise _api_error(429, 'RESOURCE_EXHAUSTED',
+                                 f"Quota exceeded for quota metric '{kind.capitalize()} requests' (giả lập)")
+            recent.append(now)
+            self._stats[f'{kind}s'] += 1
+            fail = self.error_rate and self._random.random() < self.error_rate
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+        time.sleep(delay)
+        with self._lock:
+            self._stats['latency_seconds'] += delay
+            if fail:
+                self._stats['errors'] += 1
+        if fail:
+            raise _api_error(503, 'UNAVAILABLE', "The service is currently unavailable (giả lập)")
+
+    def stats(self) -> dict:
+        """Số lệnh gọi theo phương thức, số lệnh đọc/ghi, số lần bị giới hạn (429) và lỗi giả lập."""
+        with self._lock:
+            stats = dict(self._stats)
+        calls = {key.split('.', 1)[1]: value for key, value in stats.items() if key.startswith('calls.')}
+        return {
+            'calls': dict(sorted(calls.items())),
+            'total_calls': sum(calls.values()),
+            'reads': stats.get('reads', 0),
+            'writes': stats.get('writes', 0),
+            'throttled': {kind: stats.get(f'throttled.{kind}', 0) for kind in ('read', 'write')},
+            'errors': stats.get('errors', 0),
+            'latency_seconds': round(stats.get('latency_seconds', 0.0), 3),
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+
+
+class FakeSpreadsheet:
+    def __init__(self, client: FakeClient, key: str):
+        self.client = client
+        self.id = key
+        self._worksheets = {}
+
+    def add_worksheet_local(self, title: str, values: list, cols: int = None):
+        """Thêm worksheet trực tiếp (không tính là lệnh gọi API), dùng khi dựng dữ liệu ban đầu."""
+        cols = cols or max((len(row) for row in values), default=1)
+        worksheet = FakeWorksheet(self, title, [list(row) for row in values], rows=max(len(values), 1), cols=cols)
+        self._worksheets[title] = worksheet
+        return worksheet
+
+    def worksheet(self, title: str):
+        self.client.call('read', 'worksheet')
+        if title not in self._worksheets:
+            raise gspread.exceptions.WorksheetNotFound(title)
+        return self._worksheets[title]
+
+    def add_worksheet(self, title: str, rows: int, cols: int, index: int = None):
+        self.client.call('write', 'add_worksheet')
+        worksheet = FakeWorksheet(self, title, [], rows=rows, cols=cols)
+        self._worksheets[title] = worksheet
+        return worksheet
+
+
+class FakeWorksheet:
+    """Worksheet giả lập: lưới row_count x col_count, dữ liệu là các hàng chuỗi."""
+
+    def __init__(self, spreadsheet: FakeSpreadsheet, title: str, values: list, rows: int, cols: int):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.row_count = rows
+        self.col_count = cols
+        self._values = values
+        self._lock = threading.Lock()
+
+    def _call(self, kind: str, method: str):
+        self.spreadsheet.client.call(kind, method)
+
+    def _read_range(self, range_name: str) -> list:
+        grid = a1_range_to_grid_range(range_name)
+        row_start, col_start = grid.get('startRowIndex', 0), grid.get('startColumnIndex', 0)
+        row_end, col_end = grid.get('endRowIndex', self.row_count), grid.get('endColumnIndex', self.col_count)
+        if row_end > self.row_count or col_end > self.col_count:
+            raise _api_error(400, 'INVALID_ARGUMENT', f"Range ('{self.title}'!{range_name}) exceeds grid limits.")
+        return _trim([row[col_start:col_end] for row in self._values[row_start:row_end]])
+
+    # --- Đọc ---
+
+    def batch_get(self, ranges: list, **kwargs) -> list:
+        self._call('read', 'batch_get')
+        with self._lock:
+            return [self._read_range(range_name) for range_name in ranges]
+
+    def get(self, range_name: str = None, **kwargs) -> list:
+        self._call('read', 'get')
+        with self._lock:
+            return self._read_range(range_name or f"A1:{gspread.utils.rowcol_to_a1(self.row_count, self.col_count)}")
+
+    def get_all_values(self, **kwargs) -> list:
+        self._call('read', 'get_all_values')
+        with self._lock:
+            return _trim([list(row) for row in self._values])
+
+    def row_values(self, row: int, **kwargs) -> list:
+        self._call('read', 'row_values')
+        with self._lock:
+            return _trim([self._values[row - 1]])[0] if row <= len(self._values) and self._values[row - 1] else []
+
+    # --- Ghi ---
+
+    def append_rows(self, values: list, **kwargs):
+        """Nối sau hàng có dữ liệu cuối cùng, mở rộng lưới nếu cần (như values.append)."""
+        self._call('write', 'append_rows')
+        with self._lock:
+            end = len(self._values)
+            while end and not any(value != '' for value in self._values[end - 1]):
+                end -= 1
+            del self._values[end:]
+            self._values.extend([str(value) for value in row] for row in values)
+            self.row_count = max(self.row_count, len(self._values))
+            self.col_count = max([self.col_count] + [len(row) for row in values])
+
+    def append_row(self, values: list, **kwargs):
+        self._call('write', 'append_row')
+        with self._lock:
+            self._values.append([str(value) for value in values])
+            self.row_count = max(self.row_count, len(self._values))
+
+    def update(self, values: list = None, range_name: str = None, **kwargs):
+        """Ghi đè vùng bắt đầu từ ô range_name (mặc định A1); lỗi nếu vượt ra ngoài lưới."""
+        self._call('write', 'update')
+        grid = a1_range_to_grid_range(range_name or 'A1')
+        row_start, col_start = grid.get('startRowIndex', 0), grid.get('startColumnIndex', 0)
+        with self._lock:
+            if row_start + len(values) > self.row_count or col_start + max(map(len, values), default=0) > self.col_count:
+                raise _api_error(400, 'INVALID_ARGUMENT', f"Range ('{self.title}'!{range_name}) exceeds grid limits.")
+            while len(self._values) < row_start + len(values):
+                self._values.append([])
+            for offset, row in enumerate(values):
+                target = self._values[row_start + offset]
+                target.extend([''] * (col_start + len(row) - len(target)))
+                target[col_start:col_start + len(row)] = [str(value) for value in row]
+
+    def resize(self, rows: int = None, cols: int = None):
+        self._call('write', 'resize')
+        with self._lock:
+            if rows is not None:
+                self.row_count = rows
+                del self._values[rows:]
+            if cols is not None:
+                self.col_count = cols
+                self._values = [row[:cols] for row in self._values]
+
+    def delete_rows(self, start_index: int, end_index: int = None):
+        self._call('write', 'delete_rows')
+        with self._lock:
+            end_index = end_index or start_index
+            del self._values[start_index - 1:end_index]
+            self.row_count -= end_index - start_index + 1
@@ -0,0 +1,303 @@
+# benchmarks/load_test.py
+"""
+Kiểm thử tải trang Family Task Log: N phiên giả lập chạy song song (mỗi phiên một luồng, như các
+phiên trong một tiến trình Streamlit) đi qua các view của pages/1_Family_Task_Logs.py bằng
+streamlit.testing AppTest, trên Google Sheets giả lập (benchmarks.fake_gspread) với độ trễ,
+hạn mức và tỉ lệ lỗi cấu hình được. Không cần mạng:
+
+    python -m benchmarks.load_test --sessions 20 --duration 60 --rows 20000 --latency 0.2
+    python -m benchmarks.load_test --sessions 50 --read-quota 60 --write-ratio 0.2 --error-rate 0.02
+
+Báo cáo thông lượng (lượt tương tác/giây), độ trễ p50/p95/p99/max theo từng thao tác, số lệnh gọi API
+theo phương thức, số lần bị giới hạn (429), bộ đếm cache dữ liệu sheet và số hàng đã ghi; kết quả
+được lưu thành JSON (--output) để so sánh giữa các cấu hình triển khai.
+
+Chương trình chạy trong một thư mục tạm (snapshot, journal ghi riêng), không đụng tới dữ liệu thật.
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGE_PATH = os.path.join(ROOT, 'pages', '1_Family_Task_Logs.py')
+RESULTS_DIR = os.path.join(ROOT, '.cache', 'benchmarks')
+
+# Nút trên thanh công cụ của trang theo từng view, và các view mỗi vai trò dùng được
+TOOLBAR = {
+    'view_all': "👑 Xem tất cả", 'add_new': "➕ Thêm mới", 'search': "🔍 Tìm kiếm",
+    'deadline': "🚨 Deadline", 'overdue': "🔥 Quá hạn", 'refresh': "🔄 Làm mới",
+}
+ROLE_ACTIONS = {
+    'admin': ['view_all', 'search', 'deadline', 'overdue', 'refresh'],
+    'employee': ['search', 'deadline', 'overdue', 'refresh'],
+}
+SEARCH_TERMS = ['giao ban', 'hồ sơ', 'ho so benh an', 'vat tu', 'khoa Nội', 'hợp đồng', 'đào tạo']
+
+
+def _allow_concurrent_app_tests():
+    """
+    Mỗi lượt AppTest.run gán rồi gỡ Runtime giả lập (Runtime._instance = None) khi kết thúc,
+    làm hỏng các phiên khác đang chạy song song. Giữ lại runtime giả lập gần nhất cho các phiên đó.
+    Ngoài ra ast.parse của Python 3.11 không an toàn khi nhiều luồng gọi cùng lúc (SystemError
+    "AST constructor recursion depth mismatch" khi biên dịch trang, trang chạy ra rỗng), nên
+    bước biên dịch script của các phiên được chạy lần lượt. Mỗi lượt run cũng tạm thay
+    config.get_option (global.appTest) rồi trả lại khi xong, khiến phiên khác đang chạy mất dữ liệu
+    kiểm thử của widget (KeyError '$$ID-...'): đặt tùy chọn này một lần cho cả tiến trình.
+    """
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, util
+
+    config.get_option = util.build_mock_config_get_option({'global.appTest': True})
+    app_test.patch_config_options = lambda overrides: contextlib.nullcontext()
+
+    compile_lock = threading.Lock()
+    original_get_bytecode = ScriptCache.get_bytecode
+
+    def get_bytecode(self, script_path):
+        with compile_lock:
+            return original_get_bytecode(self, script_path)
+
+    ScriptCache.get_bytecode = get_bytecode
+
+    last = {}
+    original_instance = Runtime.instance.__func__
+
+    def instance(cls):
+        if cls._instance is not None:
+            last['runtime'] = cls._instance
+            return cls._instance
+        return last['runtime'] if 'runtime' in last else original_instance(cls)
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or 'runtime' in last)
+
+
+class SimulatedSession:
+    """Một người dùng đăng nhập, lần lượt bấm các chức năng trên thanh công cụ như người thật."""
+
+    def __init__(self, index: int, role: str, username: str, args, deadline: float, records: list, lock):
+        from streamlit.testing.v1 import AppTest
+
+        self.index = index
+        self.role = role
+        self.args = args
+        self.deadline = deadline
+        self.records = records
+        self.lock = lock
+        self.random = random.Random(args.seed * 1000 + index)
+        self.writes = 0
+        self.app = AppTest.from_file(PAGE_PATH, default_timeout=args.timeout)
+        self.app.session_state['logged_in'] = True
+        self.app.session_state['username'] = username
+        self.app.session_state['role'] = role
+
+    def _step(self, action: str, interact):
+        """Chạy một lượt tương tác (một lần rerun trang) và ghi lại độ trễ."""
+        start = time.perf_counter()
+        error = None
+        try:
+            interact()
+            if self.app.exception:
+                error = self.app.exception[0].value
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        record = {'session': self.index, 'action': action, 'seconds': time.perf_counter() - start, 'error': error}
+        with self.lock:
+            self.records.append(record)
+        return error is None
+
+    def _widget(self, widgets, label: str):
+        """Widget theo nhãn; trang có thể không hiện widget đó (vd. chế độ chỉ đọc khi không đọc được sheet)."""
+        for widget in widgets:
+            if widget.label == label:
+                return widget
+        raise LookupError(f"Trang không có '{label}'")
+
+    def _button(self, label: str):
+        return self._widget(self.app.button, label)
+
+    def _open(self, view: str) -> bool:
+        if self.app.session_state['active_view'] == view:
+            return True
+        return self._step(f"open:{view}", lambda: self._button(TOOLBAR[view]).click().run())
+
+    def _search(self):
+        if self._open('search'):
+            term = self.random.choice(SEARCH_TERMS)
+
+            def submit():
+                self._widget(self.app.text_input, "Từ khóa:").input(term)
+                self._button("Thực hiện tìm kiếm").click().run()
+            self._step('search', submit)
+
+    def _add_task(self):
+        if self._open('add_new'):
+            def submit():
+                name = f"Việc kiểm thử tải #{self.index}-{self.writes}"
+                self._widget(self.app.text_input, "Tên công việc (*)").input(name)
+                self._widget(self.app.text_input, "Giao cho (*)").input("Nguyễn Thị Hà")
+                self._button("Lưu công việc").click().run()
+            if self._step('add_task', submit):
+                self.writes += 1
+
+    def run(self):
+        self._step('open_page', self.app.run)
+        steps = 0
+        while time.monotonic() < self.deadline and (not self.args.steps or steps < self.args.steps):
+            time.sleep(self.random.uniform(0, 2 * self.args.think_time))
+            if self.role == 'admin' and self.random.random() < self.args.write_ratio:
+                self._add_task()
+            else:
+                action = self.random.choice(ROLE_ACTIONS[self.role])
+                if action == 'search':
+                    self._search()
+                elif action == 'refresh':
+                    self._step('refresh', lambda: self._button(TOOLBAR['refresh']).click().run())
+                else:
+                    self._open(action)
+            steps += 1
+
+
+def _latency_summary(seconds: list) -> dict:
+    values = np.array(seconds)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {'count': len(values), 'p50': p50, 'p95': p95, 'p99': p99, 'max': values.max(), 'mean': values.mean()}
+
+
+def report(records: list, elapsed: float) -> dict:
+    by_action = {}
+    for record in records:
+        by_action.setdefault(record['action'], []).append(record)
+    summary = {'steps': len(records), 'elapsed_seconds': elapsed, 'throughput': len(records) / elapsed,
+               'errors': sum(r['error'] is not None for r in records), 'actions': {}}
+    print(f"\n{len(records)} lượt tương tác trong {elapsed:.1f}s: {summary['throughput']:.2f} lượt/giây, "
+          f"{summary['errors']} lỗi")
+    print(f"{'Thao tác':<18}{'Số lượt':>9}{'p50 (s)':>10}{'p95 (s)':>10}{'p99 (s)':>10}{'max (s)':>10}{'Lỗi':>7}")
+    for action, items in sorted(by_action.items()) + [('(tất cả)', records)]:
+        latency = _latency_summary([r['seconds'] for r in items])
+        latency['errors'] = sum(r['error'] is not None for r in items)
+        summary['actions'][action] = latency
+        print(f"{action:<18}{latency['count']:>9}{latency['p50']:>10.3f}{latency['p95']:>10.3f}"
+              f"{latency['p99']:>10.3f}{latency['max']:>10.3f}{latency['errors']:>7}")
+    errors = sorted({r['error'] for r in records if r['error']})
+    for error in errors[:5]:
+        print(f"  ❌ {error}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=10, help="số phiên chạy song song")
+    parser.add_argument('--duration', type=float, default=30, help="thời gian chạy (giây)")
+    parser.add_argument('--steps', type=int, default=0, help="số thao tác tối đa mỗi phiên (0: không giới hạn)")
+    parser.add_argument('--admin-ratio', type=float, default=0.2, help="tỉ lệ phiên có vai trò admin")
+    parser.add_argument('--write-ratio', type=float, default=0.1, help="xác suất một thao tác của admin là thêm task")
+    parser.add_argument('--think-time', type=float, default=1.0, help="thời gian nghĩ trung bình giữa hai thao tác (giây)")
+    parser.add_argument('--rows', type=int, default=20000, help="số hàng log giả lập ban đầu")
+    parser.add_argument('--latency', type=float, default=0.15, help="độ trễ mỗi lệnh gọi API (giây)")
+    parser.add_argument('--jitter', type=float, default=0.05, help="dao động độ trễ (giây)")
+    parser.add_argument('--read-quota', type=int, default=60, help="số lệnh đọc tối đa mỗi --quota-window giây")
+    parser.add_argument('--write-quota', type=int, default=60, help="số lệnh ghi tối đa mỗi --quota-window giây")
+    parser.add_argument('--quota-window', type=float, default=60.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="tỉ lệ lệnh gọi API lỗi ngẫu nhiên (503)")
+    parser.add_argument('--no-rate-limit', action='store_true',
+                        help="gọi thẳng API giả lập, không qua bộ giới hạn tốc độ của ứng dụng (utils.sheets_client)")
+    parser.add_argument('--timeout', type=float, default=60.0, help="thời gian tối đa một lượt chạy trang (giây)")
+    parser.add_argument('--drain', type=float, default=30.0, help="thời gian chờ hàng đợi ghi xong sau khi chạy (giây)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help="file JSON lưu kết quả (mặc định .cache/benchmarks/load-<thời điểm>.json)")
+    args = parser.parse_args()
+
+    started_at = datetime.now()
+    output = os.path.abspath(args.output or os.path.join(RESULTS_DIR, f"load-{started_at:%Y%m%d-%H%M%S}.json"))
+    # Snapshot và journal của hàng đợi ghi dùng đường dẫn tương đối: chạy trong thư mục tạm
+    # để không đọc/ghi dữ liệu thật; chỉ import utils sau khi đổi thư mục
+    os.chdir(tempfile.mkdtemp(prefix='task-load-test-'))
+    os.environ.setdefault('STREAMLIT_LOGGER_LEVEL', 'error')
+    sys.path.insert(0, ROOT)
+    from benchmarks.fake_gspread import FakeClient
+    from benchmarks.synthetic_log import make_task_log_values
+    from utils import google_sheet_utils
+    from utils.sheets_client import call_with_rate_limit, configure_rate_limiter, get_rate_limiter_stats
+    from utils.config import SHEET_IDS, TASK_SHEET_NAME
+
+    sheet_id = SHEET_IDS['tasks']
+    client = FakeClient(latency=args.latency, jitter=args.jitter, read_quota=args.read_quota,
+                        write_quota=args.write_quota, quota_window=args.quota_window,
+                        error_rate=args.error_rate, seed=args.seed)
+    spreadsheet = client.create_spreadsheet(sheet_id, {TASK_SHEET_NAME: make_task_log_values(args.rows, seed=args.seed)})
+    google_sheet_utils.connect_to_google_sheet = lambda: client
+    if not args.no_rate_limit:
+        # Như RateLimitedHTTPClient với client thật: mọi lệnh gọi đi qua bộ giới hạn, hạn mức theo API giả lập
+        configure_rate_limiter(read_per_minute=int(args.read_quota * 60 / args.quota_window),
+                               write_per_minute=int(args.write_quota * 60 / args.quota_window))
+        fake_call = client.call
+        client.call = lambda kind, method: call_with_rate_limit(kind, fake_call, kind, method)
+    _allow_concurrent_app_tests()
+
+    rng = random.Random(args.seed)
+    usernames = ['an', 'binh', 'chi', 'dung', 'giang', 'hieu']
+    records, lock = [], threading.Lock()
+    deadline = time.monotonic() + args.duration
+    sessions = []
+    for i in range(args.sessions):
+        role = 'admin' if rng.random() < args.admin_ratio else 'employee'
+        username = 'admin' if role == 'admin' else rng.choice(usernames)
+        sessions.append(SimulatedSession(i, role, username, args, deadline, records, lock))
+    print(f"{args.sessions} phiên ({sum(s.role == 'admin' for s in sessions)} admin), log {args.rows} hàng, "
+          f"độ trễ API {args.latency}s, hạn mức {args.read_quota} đọc/{args.write_quota} ghi mỗi {args.quota_window:g}s")
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=session.run, name=f"load-session-{session.index}") for session in sessions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    summary = report(records, elapsed)
+
+    # Chờ hàng đợi ghi đẩy hết các task vừa thêm lên sheet giả lập
+    worksheet = spreadsheet._worksheets[TASK_SHEET_NAME]
+    submitted = sum(session.writes for session in sessions)
+    drain_until = time.monotonic() + args.drain
+    while len(worksheet._values) - 1 - args.rows < submitted and time.monotonic() < drain_until:
+        time.sleep(0.2)
+    api = client.stats()
+    summary.update(
+        writes_submitted=submitted,
+        rows_appended=len(worksheet._values) - 1 - args.rows,
+        api=api,
+        sheet_cache=google_sheet_utils.get_sheet_cache_stats(sheet_id),
+        handle_cache=google_sheet_utils.get_handle_cache_stats(),
+        rate_limiter=None if args.no_rate_limit else get_rate_limiter_stats(),
+    )
+    print(f"\nLệnh gọi API: {api['total_calls']} ({api['reads']} đọc, {api['writes']} ghi), "
+          f"bị giới hạn (429): {api['throttled']}, lỗi giả lập: {api['errors']}")
+    print("  " + ", ".join(f"{method}={count}" for method, count in api['calls'].items()))
+    print(f"Cache dữ liệu sheet: {summary['sheet_cache']}")
+    if summary['rate_limiter']:
+        waits = summary['rate_limiter']['waits']
+        print("Chờ lượt gọi API: " + ", ".join(
+            f"{name} {w['granted']} lượt, TB {w['mean_wait'] * 1000:.0f} ms, tối đa {w['max_wait'] * 1000:.0f} ms"
+            for name, w in waits.items()) + f"; quá hạn chờ: {summary['rate_limiter']['timeouts']}")
+    print(f"Task đã thêm: {submitted}, hàng đã ghi lên sheet: {summary['rows_appended']}")
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    meta = {'created_at': started_at.isoformat(timespec='seconds'), 'args': vars(args)}
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'meta': meta, 'summary': summary, 'records': records}, f, ensure_ascii=False, indent=2, default=float)
+    print(f"\nĐã lưu kết quả vào {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+# benchmarks/startup_profile.py
+"""
+Đo thời gian import lúc khởi động (python -X importtime) của các đường vào package utils mà
+một worker mới phải chạy, và kiểm tra hồi quy import chậm:
+
+    python -m benchmarks.startup_profile
+    python -m benchmarks.startup_profile --repeat 5 --compare .cache/benchmarks/startup-20261018-100000.json
+
+Mỗi kịch bản chạy trong một tiến trình Python riêng (không có cache module), sau khi đã
+import streamlit (server luôn tải sẵn), nên chỉ tính phần import thêm của kịch bản. Kết quả
+là tổng thời gian và phân rã theo package gốc (utils, pandas, numpy, gspread,...).
+
+Kiểm tra hồi quy: các kịch bản chạy trước khi người dùng đăng nhập (LIGHT_SCENARIOS) không
+được tải thư viện nặng nào trong HEAVY_MODULES; nếu có, in chuỗi import dẫn tới thư viện đó
+và thoát với mã 1. Kết quả lưu thành JSON (--output); --compare in tỉ lệ so với một lần chạy
+trước và đánh dấu các kịch bản chậm hơn quá ngưỡng --threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+
+RESULTS_DIR = ".cache/benchmarks"
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Kịch bản: tên -> câu lệnh import (chạy sau `import streamlit`)
+SCENARIOS = {
+    'import utils': "import utils",
+    'login gate': "from utils import is_authorized",
+    'perf helpers': "from utils import timed, get_perf_report",
+    'task page': "from utils import *",
+}
+# Các kịch bản chạy trước bước kiểm tra đăng nhập/quyền: phải nhẹ
+LIGHT_SCENARIOS = ('import utils', 'login gate', 'perf helpers')
+HEAVY_MODULES = ('pandas', 'numpy', 'pytz', 'gspread', 'pyarrow', 'google')
+
+
+def _parse_importtime(stderr: str) -> list:
+    """
+    Các dòng của -X importtime sau khi streamlit đã import xong:
+    [{'module', 'depth', 'self_us', 'cumulative_us'}], theo thứ tự import hoàn tất.
+    """
+    entries, started = [], False
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        module = name.strip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if not started:
+            started = depth == 0 and module == 'streamlit'
+            continue
+        entries.append({'module': module, 'depth': depth, 'self_us': int(self_us), 'cumulative_us': int(cumulative_us)})
+    return entries
+
+
+def _import_chain(entries: list, index: int) -> list:
+    """Chuỗi module cha đã import module ở vị trí index (các dòng importtime liệt kê con trước cha)."""
+    chain, depth = [entries[index]['module']], entries[index]['depth']
+    for entry in entries[index + 1:]:
+        if entry['depth'] < depth:
+            chain.append(entry['module'])
+            depth = entry['depth']
+    return chain[::-1]
+
+
+def profile(statement: str) -> dict:
+    """Chạy statement trong một tiến trình mới với -X importtime; trả về tổng thời gian và phân rã."""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import streamlit\n{statement}"],
+        cwd=ROOT, capture_output=True, text=True, env={**os.environ, 'STREAMLIT_LOGGER_LEVEL': 'error'},
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Lỗi khi chạy {statement!r}:\n{completed.stderr[-2000:]}")
+    entries = _parse_importtime(completed.stderr)
+    packages = {}
+    for entry in entries:
+        package = entry['module'].split('.')[0]
+        packages[package] = packages.get(package, 0) + entry['self_us']
+    heavy = {}
+    for index, entry in enumerate(entries):
+        package = entry['module'].split('.')[0]
+        if package in HEAVY_MODULES and package not in heavy:
+            heavy[package] = _import_chain(entries, index)
+    return {
+        'seconds': sum(entry['self_us'] for entry in entries) / 1e6,
+        'modules': len(entries),
+        'packages': {name: us / 1e6 for name, us in sorted(packages.items(), key=lambda item: -item[1])},
+        'heavy': heavy,
+    }
+
+
+def run(repeat: int, top: int) -> dict:
+    """Mỗi kịch bản chạy repeat lần, giữ lần nhanh nhất."""
+    results = {}
+    for scenario, statement in SCENARIOS.items():
+        best = min((profile(statement) for _ in range(repeat)), key=lambda result: result['seconds'])
+        results[scenario] = best
+        breakdown = ', '.join(f"{name} {seconds * 1000:.0f}" for name, seconds in list(best['packages'].items())[:top])
+        print(f"{scenario:<14}{best['seconds'] * 1000:>9.0f} ms {best['modules']:>5} module  ({breakdown})")
+    return results
+
+
+def check(results: dict) -> int:
+    """In các kịch bản nhẹ đã tải thư viện nặng (kèm chuỗi import); trả về số vi phạm."""
+    violations = 0
+    for scenario in LIGHT_SCENARIOS:
+        for package, chain in results[scenario]['heavy'].items():
+            violations += 1
+            print(f"❌ '{scenario}' tải {package}: {' -> '.join(chain)}")
+    if not violations:
+        print(f"✅ Các kịch bản {', '.join(LIGHT_SCENARIOS)} không tải {', '.join(HEAVY_MODULES)}.")
+    return violations
+
+
+def compare(results: dict, baseline_path: str, threshold: float):
+    """In tỉ lệ thời gian import so với một lần chạy trước; đánh dấu ⚠️ các kịch bản vượt ngưỡng."""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)['results']
+    print(f"\nSo với {baseline_path} (ngưỡng +{threshold:.0%}):")
+    regressions = 0
+    for scenario, result in results.items():
+        before = baseline.get(scenario)
+        if before is None:
+            continue
+        ratio = result['seconds'] / before['seconds'] if before['seconds'] else float('inf')
+        regressed = ratio > 1 + threshold
+        regressions += regressed
+        print(f"{scenario:<14}{before['seconds'] * 1000:>9.0f} ms -> {result['seconds'] * 1000:>6.0f} ms"
+              f"{ratio:>8.2f}x{'  ⚠️' if regressed else ''}")
+    print(f"{regressions} kịch bản import chậm hơn quá ngưỡng.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3, help="số lần chạy mỗi kịch bản (giữ lần nhanh nhất)")
+    parser.add_argument('--top', type=int, default=6, help="số package tốn thời gian nhất in ra mỗi kịch bản")
+    parser.add_argument('--output', default=None, help="file JSON lưu kết quả (mặc định .cache/benchmarks/startup-<thời điểm>.json)")
+    parser.add_argument('--compare', default=None, help="file JSON của một lần chạy trước để so sánh")
+    parser.add_argument('--threshold', type=float, default=0.2, help="ngưỡng tăng (tỉ lệ) để đánh dấu hồi quy")
+    args = parser.parse_args()
+
+    started_at = datetime.now()
+    print(f"{'Kịch bản':<14}{'Import':>12} {'Số':>5}         (ms theo package)")
+    results = run(args.repeat, args.top)
+    violations = check(results)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"startup-{started_at:%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    meta = {
+        'created_at': started_at.isoformat(timespec='seconds'), 'repeat': args.repeat,
+        'python': platform.python_version(), 'machine': platform.machine(), 'platform': platform.platform(),
+    }
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'meta': meta, 'results': results}, f, ensure_ascii=False, indent=2)
+    print(f"\nĐã lưu kết quả vào {output}")
+
+    if args.compare:
+        compare(results, args.compare, args.threshold)
+    sys.exit(1 if violations else 0)
+
+
+if __name__ == '__main__':
+    main()
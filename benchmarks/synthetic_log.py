@@ -0,0 +1,146 @@
+# benchmarks/synthetic_log.py
+"""
+Sinh log task giả lập giống worksheet Tasks_Processed (mỗi lần sửa task là một hàng mới),
+dùng cho các benchmark và kiểm thử tải. Dữ liệu là tất định: cùng tham số (kể cả seed và
+base_date) luôn sinh ra cùng một log.
+
+- Mỗi task có trung bình `revisions` phiên bản, xen kẽ với các task khác theo thời gian.
+- Phiên bản đầu của task có đủ thông tin; các phiên bản sau để trống các cột cần backfill
+  (deadline, link, mô tả, người nhận báo cáo, thư ký) với xác suất blank_ratio.
+- Một phần đầu log (legacy_ratio) dùng task_id kiểu cũ, phần còn lại dùng ULID (generate_task_id).
+"""
+from datetime import date
+import numpy as np
+import pandas as pd
+from utils.data_utils import TASK_ID_PREFIX, TASK_FILL_COLUMNS, TASK_DATETIME_FORMATS
+
+HEADERS = ['task_name', 'add_time', 'task_deadline', 'task_link', 'task_id',
+           'task_des', 'task_report_to', 'task_po', 'task_status', 'task_comment']
+STATUSES = ['Mới tạo', 'Đang thực hiện', 'Chờ phản hồi', 'Đã hoàn thành', 'Đã hủy']
+# Phiên bản đầu phần lớn là "Mới tạo", các phiên bản sau dần chuyển sang hoàn thành
+_FIRST_STATUS_WEIGHTS = [0.8, 0.15, 0.05, 0.0, 0.0]
+_LATER_STATUS_WEIGHTS = [0.05, 0.4, 0.2, 0.3, 0.05]
+
+_TASK_VERBS = ['Chuẩn bị', 'Kiểm tra', 'Báo cáo', 'Cập nhật', 'Tổng hợp', 'Liên hệ', 'Rà soát', 'Đặt lịch']
+_TASK_OBJECTS = ['hồ sơ bệnh án', 'lịch trực khoa Nội', 'vật tư phòng mổ', 'hợp đồng nhà cung cấp',
+                 'số liệu khám chữa bệnh', 'kế hoạch đào tạo điều dưỡng', 'biên bản giao ban', 'thiết bị chẩn đoán hình ảnh']
+_FAMILY_NAMES = ['Nguyễn', 'Trần', 'Lê', 'Phạm', 'Hoàng', 'Võ', 'Đặng', 'Bùi']
+_GIVEN_NAMES = ['Thị Hà', 'Văn Bình', 'Ngọc Ánh', 'Minh Đức', 'Thu Trang', 'Quốc Huy', 'Thanh Tâm', 'Hải Yến']
+_REPORT_TO = ['an', 'binh', 'chi', 'dung', 'giang', 'hieu']
+_DESCRIPTION_WORDS = ['phối hợp', 'với', 'phòng', 'tài chính', 'điều dưỡng', 'trưởng khoa', 'gửi', 'bản', 'tổng hợp',
+                      'trước', 'cuộc họp', 'giao ban', 'tuần', 'này', 'đảm bảo', 'đầy đủ', 'chữ ký', 'xác nhận']
+_COMMENTS = ['Đã nhắc lại qua Zalo', 'Chờ sếp duyệt', 'Thiếu chữ ký trưởng khoa', 'Đã gửi email', 'Hoãn sang tuần sau']
+_CROCKFORD_CHARS = np.array(list('0123456789ABCDEFGHJKMNPQRSTVWXYZ'))
+_START_TIME = pd.Timestamp('2024-01-01 07:00:00')
+
+
+def secretary_names(count: int) -> list:
+    """Tên thư ký (task_po) giả lập, tiếng Việt có dấu."""
+    return [f"{_FAMILY_NAMES[i % len(_FAMILY_NAMES)]} {_GIVEN_NAMES[(i // len(_FAMILY_NAMES) + i) % len(_GIVEN_NAMES)]}"
+            + (f" {i // len(_FAMILY_NAMES)}" if i >= len(_FAMILY_NAMES) else '') for i in range(count)]
+
+
+def _crockford(values: np.ndarray, length: int) -> np.ndarray:
+    chars = _CROCKFORD_CHARS[(values[:, None] >> np.arange(5 * (length - 1), -1, -5)) & 31]
+    return chars.view(f'<U{length}').ravel()
+
+
+def _format_add_time(times: pd.DatetimeIndex) -> np.ndarray:
+    """Định dạng add_time như trên sheet (nhanh hơn DatetimeIndex.strftime nhiều lần với log lớn)."""
+    return np.array([
+        f"{d:02d}/{m:02d}/{y} {hh:02d}:{mm:02d}:{ss:02d}"
+        for y, m, d, hh, mm, ss in zip(times.year, times.month, times.day, times.hour, times.minute, times.second)
+    ], dtype=object)
+
+
+def _with_blanks(values: np.ndarray, blank: np.ndarray) -> np.ndarray:
+    values = values.astype(object)
+    values[blank] = ''
+    return values
+
+
+def _make_columns(rows: int, revisions: float = 5, secretaries: int = 8, blank_ratio: float = 0.6,
+                  legacy_ratio: float = 0.3, seed: int = 0, base_date: date = None) -> dict:
+    """
+    Các cột của log giả lập (mảng object, ô trống là ''), theo thứ tự HEADERS.
+    Thời điểm add_time bắt đầu từ 01/01/2024, trung bình một hàng mỗi phút; deadline nằm quanh
+    base_date (mặc định hôm nay) để các nhóm quá hạn / sắp đến hạn đều có task.
+    """
+    rng = np.random.default_rng(seed)
+    n_tasks = max(int(rows / revisions), 1)
+    base_date = pd.Timestamp(base_date or date.today())
+
+    # Hàng tạo mới của mỗi task nằm rải rác trong log; các hàng còn lại là bản sửa của một task đã có
+    first_rows = np.sort(rng.choice(rows, size=n_tasks, replace=False))
+    first_rows[0] = 0
+    is_first = np.zeros(rows, dtype=bool)
+    is_first[first_rows] = True
+    created = np.searchsorted(first_rows, np.arange(rows), side='right')
+    task_of_row = np.floor(rng.random(rows) * created).astype(np.int64)
+    task_of_row[first_rows] = np.arange(n_tasks)
+
+    names = np.char.add(
+        np.char.add(np.array(_TASK_VERBS)[np.arange(n_tasks) % len(_TASK_VERBS)], ' '),
+        np.array(_TASK_OBJECTS)[(np.arange(n_tasks) // len(_TASK_VERBS)) % len(_TASK_OBJECTS)],
+    )
+    task_names = np.char.add(np.char.add(names, ' #'), np.arange(n_tasks).astype(str))
+
+    add_time = _START_TIME + pd.to_timedelta(np.cumsum(rng.integers(1, 120, rows)), unit='s')
+    add_time_text = _format_add_time(add_time)
+
+    legacy = np.arange(rows) < int(rows * legacy_ratio)
+    ms = ((add_time - pd.Timedelta(hours=7) - pd.Timestamp(0)) // pd.Timedelta(milliseconds=1)).to_numpy(dtype=np.int64)
+    random_part = rng.integers(0, 32, size=(rows, 16))
+    ulid = np.char.add(_crockford(ms, 10), _CROCKFORD_CHARS[random_part].view('<U16').ravel())
+    task_ids = np.where(legacy, np.char.add('TASK-', (1700000000 + np.arange(rows)).astype(str)),
+                        np.char.add(TASK_ID_PREFIX, ulid)).astype(object)
+
+    deadline_days, deadline_of_task = np.unique(rng.integers(-30, 45, n_tasks), return_inverse=True)
+    task_deadline = (base_date + pd.to_timedelta(deadline_days, unit='D')).strftime(
+        TASK_DATETIME_FORMATS['task_deadline']).to_numpy(dtype=object)[deadline_of_task]
+    task_link = np.char.add('https://workingspace.familyhospital.vn/task/show/',
+                            np.char.add((100000 + np.arange(n_tasks)).astype(str), '?tab=1')).astype(object)
+    task_link[rng.random(n_tasks) < 0.4] = ''
+    word_idx = rng.integers(0, len(_DESCRIPTION_WORDS), size=(n_tasks, 8))
+    task_des = np.array([' '.join(words) for words in np.array(_DESCRIPTION_WORDS, dtype=object)[word_idx]], dtype=object)
+    task_report_to = np.array(_REPORT_TO, dtype=object)[rng.integers(0, len(_REPORT_TO), n_tasks)]
+    task_po = np.array(secretary_names(secretaries), dtype=object)[rng.integers(0, secretaries, n_tasks)]
+
+    # Bản sửa có thể đổi deadline/thư ký; phần lớn để trống các cột cần backfill
+    per_task = {
+        'task_deadline': task_deadline, 'task_link': task_link, 'task_des': task_des,
+        'task_report_to': task_report_to, 'task_po': task_po,
+    }
+    columns = {
+        'task_name': task_names[task_of_row].astype(object),
+        'add_time': add_time_text,
+        'task_id': task_ids,
+        'task_status': np.where(
+            is_first,
+            rng.choice(STATUSES, size=rows, p=_FIRST_STATUS_WEIGHTS),
+            rng.choice(STATUSES, size=rows, p=_LATER_STATUS_WEIGHTS),
+        ).astype(object),
+        'task_comment': _with_blanks(np.array(_COMMENTS, dtype=object)[rng.integers(0, len(_COMMENTS), rows)],
+                                     is_first | (rng.random(rows) < 0.5)),
+    }
+    for column in TASK_FILL_COLUMNS:
+        columns[column] = _with_blanks(per_task[column][task_of_row], ~is_first & (rng.random(rows) < blank_ratio))
+
+    return {header: columns[header] for header in HEADERS}
+
+
+def make_task_log_values(rows: int, **kwargs) -> list:
+    """
+    Log giả lập dạng danh sách hàng giá trị chuỗi như API trả về (hàng đầu là header).
+    Tham số: xem _make_columns (revisions, secretaries, blank_ratio, legacy_ratio, seed, base_date).
+    """
+    columns = _make_columns(rows, **kwargs)
+    values = np.empty((rows, len(HEADERS)), dtype=object)
+    for i, column in enumerate(columns.values()):
+        values[:, i] = column
+    return [list(HEADERS)] + values.tolist()
+
+
+def make_task_log_frame(rows: int, **kwargs) -> pd.DataFrame:
+    """Log giả lập dạng DataFrame chuỗi thô (ô trống là ''), như dữ liệu đọc từ sheet trước khi chuẩn hóa."""
+    return pd.DataFrame(_make_columns(rows, **kwargs), dtype=object)
@@ -1,41 +1,56 @@
 # pages/1_Family_Task_Log.py
 
 import streamlit as st
-import pandas as pd
-from datetime import datetime
 
-# Import các hàm tiện ích
+# --- CẤU HÌNH TRANG VÀ KIỂM TRA ĐĂNG NHẬP ---
+st.set_page_config(page_title="Family Task Log", page_icon="📝", layout="wide")
+
+if not st.session_state.get('logged_in'):
+    st.error("Bạn cần đăng nhập để xem trang này.")
+    st.stop()
+
+# Import các hàm tiện ích sau khi kiểm tra đăng nhập: package utils chỉ tải module con
+# (cùng pandas, gspread,...) khi tên đầu tiên của nó được dùng, nên phiên chưa đăng nhập không phải chờ
 from utils import (
     is_authorized,
     set_active_view,
-    search_dataframe,
-    get_data_from_sheet,
+    search_tasks,
+    get_task_views,
+    make_task_refs,
+    resolve_task_refs,
+    with_sort,
+    get_inbox_deadline_buckets,
     add_row_from_dict,
+    refresh_sheet_data,
+    compact_task_log,
     SHEET_IDS,
-    render_task_card,
-    process_deadline_tasks,
-    get_overdue_tasks,
-    filter_latest_tasks_by_name,
+    render_task_list,
+    reset_task_list,
+    render_task_table,
+    track_write,
+    render_write_status,
+    render_session_memory_report,
+    start_rerun_timer,
+    finish_rerun_timer,
+    get_deadline_buckets,
     get_current_hcm_time_str,
-    backfill_data
+    generate_task_id
 )
 
-# --- CẤU HÌNH TRANG VÀ KIỂM TRA ĐĂNG NHẬP ---
-st.set_page_config(page_title="Family Task Log", page_icon="📝", layout="wide")
-
-if not st.session_state.get('logged_in'):
-    st.error("Bạn cần đăng nhập để xem trang này.")
-    st.stop()
+# Đo thời gian mỗi lượt rerun của trang (xem trang Hiệu năng)
+start_rerun_timer()
 
 # --- KHỞI TẠO STATE ---
 if 'active_view' not in st.session_state:
     st.session_state.active_view = 'none'
 if 'editing_task_key' not in st.session_state:
     st.session_state.editing_task_key = None
-if 'search_results_df' not in st.session_state:
-    st.session_state.search_results_df = None
-if 'overdue_results_df' not in st.session_state:
-    st.session_state.overdue_results_df = None
+# Kết quả tìm kiếm/lọc chỉ lưu tham chiếu gọn (make_task_refs) tới dữ liệu dùng chung,
+# không lưu bản sao DataFrame cho từng phiên
+if 'search_results' not in st.session_state:
+    st.session_state.search_results = None
+if 'overdue_results' not in st.session_state:
+    st.session_state.overdue_results = None
 if 'deadline_results' not in st.session_state:
     st.session_state.deadline_results = None
 
@@ -47,7 +62,8 @@ st.markdown("---")
 cols = st.columns(6)
 with cols[0]:
     if st.button("🔄 Làm mới", use_container_width=True):
-        st.cache_data.clear()
+        # Chỉ kiểm tra lại sheet; dữ liệu chỉ được đọc lại nếu sheet thực sự thay đổi
+        refresh_sheet_data(SHEET_IDS.get("tasks"))
         st.session_state.editing_task_key = None
         st.rerun()
 if is_authorized('view_all_tasks'):
@@ -61,7 +77,7 @@ if is_authorized('add_new_task'):
 if is_authorized('search_task'):
     with cols[3]:
         if st.button("🔍 Tìm kiếm", use_container_width=True):
-            st.session_state.search_results_df = None
+            st.session_state.search_results = None
             set_active_view('search')
 if is_authorized('process_deadline_tasks'):
     with cols[4]:
@@ -71,20 +87,32 @@ if is_authorized('process_deadline_tasks'):
 if is_authorized('get_overdue_tasks'):
     with cols[5]:
         if st.button("🔥 Quá hạn", use_container_width=True):
-            st.session_state.overdue_results_df = None
+            st.session_state.overdue_results = None
             set_active_view('overdue')
+render_write_status()
 st.markdown("---")
 
 # --- KHU VỰC HIỂN THỊ NỘI DUNG ---
 task_sheet_id = SHEET_IDS.get("tasks")
 with st.spinner("Đang tải và xử lý dữ liệu..."):
-    df_tasks_raw = get_data_from_sheet(task_sheet_id)
-
-    # BƯỚC MỚI: TỰ ĐỘNG FILL DỮ LIỆU
-    df_backfilled = backfill_data(df_tasks_raw) if not df_tasks_raw.empty else df_tasks_raw
+    # Log gốc, log đã tự động fill dữ liệu, task mới nhất và các phân nhóm theo thư ký:
+    # tính một lần cho mỗi phiên bản dữ liệu và dùng chung cho mọi phiên, các view bên dưới
+    # chỉ lấy lại từ đây, không đọc hay tính lại
+    task_views = get_task_views(task_sheet_id)
+    df_tasks_raw = task_views['raw']
+    df_backfilled = task_views['history']
+    latest_df = task_views['latest']
 
-    # Lọc ra task mới nhất từ dữ liệu đã được làm giàu
-    latest_df = filter_latest_tasks_by_name(df_backfilled) if not df_backfilled.empty else df_backfilled
+# Không kết nối được Google Sheets: dữ liệu lấy từ snapshot cục bộ, khóa mọi thao tác ghi
+read_only = task_views['read_only']
+# Nhân viên/quản lý mặc định chỉ xem các task của mình (thư ký phụ trách hoặc người nhận báo cáo)
+use_inbox = not is_authorized('view_all_tasks') and bool(st.session_state.get('username'))
+if read_only:
+    st.warning(
+        "⚠️ **Chế độ chỉ đọc**: không kết nối được Google Sheets. "
+        f"Đang hiển thị dữ liệu đã đồng bộ lúc {task_views['synced_at'] or 'không rõ'}. "
+        "Tạm thời không thể thêm hoặc chỉnh sửa công việc."
+    )
 
 if st.session_state.active_view == 'none':
     st.info("👋 Chào mừng bạn. Vui lòng chọn một chức năng từ thanh công cụ bên trên.")
@@ -92,19 +120,26 @@ if st.session_state.active_view == 'none':
 if st.session_state.active_view != 'none':
     # 1. HIỂN THỊ DANH SÁCH TASK
     if st.session_state.active_view == 'view_all':
-        with st.spinner("Đang tải danh sách công việc..."):
-            df_tasks_raw = get_data_from_sheet(task_sheet_id)
-            latest_df = filter_latest_tasks_by_name(df_tasks_raw) if not df_tasks_raw.empty else pd.DataFrame()
         with st.container(border=False):
-            st.markdown("##### 📝 Danh sách công việc")
+            title_cols = st.columns((8, 2))
+            with title_cols[0]:
+                st.markdown("##### 📝 Danh sách công việc")
+            table_mode = False
+            if is_authorized('bulk_edit_tasks'):
+                with title_cols[1]:
+                    table_mode = st.toggle("Chế độ bảng", key='task_table_mode')
             if not latest_df.empty:
-                for index, row in latest_df.iterrows():
-                    render_task_card(row, task_sheet_id, index)
+                if table_mode:
+                    render_task_table(latest_df, task_sheet_id, read_only=read_only)
+                else:
+                    render_task_list(latest_df, task_sheet_id, 'view_all', read_only=read_only, task_log=task_views)
             else:
                 st.info("Không có dữ liệu công việc để hiển thị.")
 
     # 2. HIỂN THỊ FORM THÊM TASK MỚI
-    if st.session_state.active_view == 'add_new':
+    if st.session_state.active_view == 'add_new' and read_only:
+        st.info("Không thể thêm công việc mới khi đang ở chế độ chỉ đọc.")
+    elif st.session_state.active_view == 'add_new':
         with st.container(border=True):
             st.markdown("##### ✨ Tạo một công việc mới")
             with st.form("new_task_form", clear_on_submit=True):
@@ -116,10 +151,11 @@ if st.session_state.active_view != 'none':
                     if not task_name or not task_po:
                         st.warning("Vui lòng điền đầy đủ Tên công việc và Người thực hiện.")
                     else:
-                        new_row_data = {'task_name': task_name, 'add_time': get_current_hcm_time_str(),'task_id': f"TASK-{int(datetime.now().timestamp())}",'task_des': task_des,'task_report_to': st.session_state.username,'task_po': task_po,'task_status': "Mới tạo"}
+                        new_row_data = {'task_name': task_name, 'add_time': get_current_hcm_time_str(),'task_id': generate_task_id(),'task_des': task_des,'task_report_to': st.session_state.username,'task_po': task_po,'task_status': "Mới tạo"}
                         with st.spinner("Đang lưu..."):
-                            success = add_row_from_dict(task_sheet_id, new_row_data)
-                        if success:
+                            write_id = add_row_from_dict(task_sheet_id, new_row_data)
+                        if write_id:
+                            track_write(write_id)
                             st.success("Đã thêm công việc mới thành công!")
                             st.rerun()
                         else:
@@ -127,9 +163,6 @@ if st.session_state.active_view != 'none':
 
     # 3. HIỂN THỊ GIAO DIỆN TÌM KIẾM
     if st.session_state.active_view == 'search':
-        with st.spinner("Đang chuẩn bị dữ liệu..."):
-            df_tasks_raw = get_data_from_sheet(task_sheet_id)
-            # latest_df = filter_latest_tasks_by_name(df_tasks_raw) if not df_tasks_raw.empty else pd.DataFrame()
         search_controls_container = st.container(border=True)
         # with search_controls_container:
         with st.form("search_form"):
@@ -138,101 +171,122 @@ if st.session_state.active_view != 'none':
             with c1:
                 search_term = st.text_input("Từ khóa:", label_visibility="collapsed")
             with c2:
-                search_in_col = st.selectbox("Tìm trong cột:", options=['task_name', 'task_po', 'task_des', 'task_status'], label_visibility="collapsed")
+                search_in_col = st.selectbox("Tìm trong cột:", options=['Tất cả các cột', 'task_name', 'task_po', 'task_des', 'task_status'], label_visibility="collapsed")
             submitted = st.form_submit_button("Thực hiện tìm kiếm")
             if submitted:
                 if search_term.strip():
-                    results_df = search_dataframe(df=latest_df, search_term=search_term, search_column=search_in_col)
-                    st.session_state.search_results_df = results_df
+                    # Tìm bằng chỉ mục dùng chung: không phân biệt dấu, nhiều từ, xếp hạng theo độ khớp
+                    search_columns = None if search_in_col == 'Tất cả các cột' else [search_in_col]
+                    results_df = search_tasks(latest_df, search_term, search_columns)
+                    st.session_state.search_results = make_task_refs(results_df)
+                    reset_task_list('search')
                 else:
                     st.warning("Vui lòng nhập từ khóa để tìm kiếm.")
-                    st.session_state.search_results_df = None
+                    st.session_state.search_results = None
         results_container = st.container(border=False)
         # with results_container:
-        if st.session_state.search_results_df is not None:
+        if st.session_state.search_results is not None:
             st.markdown(f"##### 🔍 Kết quả tìm kiếm")
-            results_df = st.session_state.search_results_df
+            results_df = resolve_task_refs(task_views, st.session_state.search_results)
             if not results_df.empty:
-                for index, row in results_df.iterrows():
-                    render_task_card(row, task_sheet_id, index)
+                render_task_list(results_df, task_sheet_id, 'search', read_only=read_only, task_log=task_views)
             else:
                 st.info("Không tìm thấy công việc nào phù hợp.")
         elif not latest_df.empty:
             st.markdown("##### Nhập thông tin để tìm kiếm")
             # for index, row in latest_df.iterrows():
-            #     render_task_card(row, task_sheet_id, index)
+            #     render_task_card(row, task_sheet_id, index, read_only=read_only)
         else:
             st.info("Không có dữ liệu.")
 
     # 4. HIỂN THỊ GIAO DIỆN TÌM KIẾM DEADLINE
     if st.session_state.active_view == 'deadline':
-        with st.spinner("Đang chuẩn bị dữ liệu..."):
-            df_tasks_raw = get_data_from_sheet(task_sheet_id)
-            latest_df = filter_latest_tasks_by_name(df_tasks_raw) if not df_tasks_raw.empty else pd.DataFrame()
         filter_container = st.container(border=True)
         # with filter_container:
         st.markdown("<h1 style='text-align: center;'>Tra cứu task sắp đến hạn</h1>", unsafe_allow_html=True)
         with st.form("deadline_filter_form"):
             st.write("**Bộ lọc tìm kiếm deadline:**")
-            po_list = latest_df['task_po'].dropna().unique().tolist()
-            selected_pos = st.segmented_control("Chọn thư ký:", options=po_list, selection_mode="multi")
+            selected_pos = st.segmented_control("Chọn thư ký:", options=task_views['po_list'], selection_mode="multi")
             submitted = st.form_submit_button("Tìm kiếm Deadline")
             if submitted:
-                filtered_df = latest_df[latest_df['task_po'].isin(selected_pos)] if selected_pos else latest_df
-                due_today, due_soon, due_later = process_deadline_tasks(filtered_df)
-                st.session_state.deadline_results = {"today": due_today, "soon": due_soon, "later": due_later}
+                # Tra chỉ mục deadline dùng chung (chỉ dựng lại khi dữ liệu hoặc ngày thay đổi)
+                buckets = get_deadline_buckets(latest_df, selected_pos)
+                st.session_state.deadline_results = {key: make_task_refs(buckets[key]) for key in ("today", "soon", "later")}
+                reset_task_list('deadline_today', 'deadline_soon', 'deadline_later')
+        results = None
         if st.session_state.deadline_results:
-            results = st.session_state.deadline_results
+            results = {key: resolve_task_refs(task_views, refs) for key, refs in st.session_state.deadline_results.items()}
+        elif use_inbox:
+            st.caption("Đang hiển thị các task của bạn. Chọn thư ký và bấm tìm kiếm để xem theo bộ lọc khác.")
+            results = get_inbox_deadline_buckets(task_views, st.session_state.username)
+        if results:
             with st.container(border=True):
                 st.error(f"🔴 Hết hạn hôm nay ({len(results['today'])} task)")
                 if not results['today'].empty:
-                    for index, row in results['today'].iterrows():
-                        render_task_card(row, task_sheet_id, index)
+                    render_task_list(results['today'], task_sheet_id, 'deadline_today', read_only=read_only, task_log=task_views)
                 else: st.write("_Không có task nào._")
             with st.container(border=True):
                 st.warning(f"🟠 Sắp hết hạn trong 2-3 ngày tới ({len(results['soon'])} task)")
                 if not results['soon'].empty:
-                    for index, row in results['soon'].iterrows():
-                        render_task_card(row, task_sheet_id, index)
+                    render_task_list(results['soon'], task_sheet_id, 'deadline_soon', read_only=read_only, task_log=task_views)
                 else: st.write("_Không có task nào._")
             with st.expander(f"🟢 Các task khác chưa tới deadline ({len(results['later'])} task)"):
                 if not results['later'].empty:
-                    for index, row in results['later'].iterrows():
-                        render_task_card(row, task_sheet_id, index)
+                    render_task_list(results['later'], task_sheet_id, 'deadline_later', read_only=read_only, task_log=task_views)
                 else: st.write("_Không có task nào._")
 
     # 5. HIỂN THỊ GIAO DIỆN TASK QUÁ HẠN
     if st.session_state.active_view == 'overdue':
-        with st.spinner("Đang chuẩn bị dữ liệu..."):
-            df_tasks_raw = get_data_from_sheet(task_sheet_id)
-            latest_df = filter_latest_tasks_by_name(df_tasks_raw) if not df_tasks_raw.empty else pd.DataFrame()
         filter_container = st.container(border=True)
         # with filter_container:
         st.markdown("<h1 style='text-align: center;'>Tra cứu task quá hạn</h1>", unsafe_allow_html=True)
         with st.form("overdue_filter_form"):
             st.write("**Lọc các task đã quá hạn:**")
-            po_list = latest_df['task_po'].dropna().unique().tolist()
-            selected_pos = st.segmented_control("Chọn thư ký:", options=po_list, selection_mode="multi")
+            selected_pos = st.segmented_control("Chọn thư ký:", options=task_views['po_list'], selection_mode="multi")
             submitted = st.form_submit_button("Tìm Task Quá Hạn")
             if submitted:
-                filtered_df = latest_df[latest_df['task_po'].isin(selected_pos)] if selected_pos else latest_df
-                st.session_state.overdue_results_df = get_overdue_tasks(filtered_df)
-        if st.session_state.overdue_results_df is not None:
-            results_df = st.session_state.overdue_results_df
+                st.session_state.overdue_results = make_task_refs(get_deadline_buckets(latest_df, selected_pos)['overdue'])
+                reset_task_list('overdue')
+        overdue_refs = st.session_state.overdue_results
+        if overdue_refs is None and use_inbox:
+            st.caption("Đang hiển thị các task của bạn. Chọn thư ký và bấm tìm kiếm để xem theo bộ lọc khác.")
+            overdue_refs = make_task_refs(get_inbox_deadline_buckets(task_views, st.session_state.username)['overdue'])
+        if overdue_refs is not None:
+            results_df = resolve_task_refs(task_views, overdue_refs)
             with st.container(border=True):
                 st.error(f"🔥 Tìm thấy {len(results_df)} task đã quá hạn")
                 if not results_df.empty:
                     sort_cols = st.columns((2, 2, 8))
                     with sort_cols[0]:
                         if st.button("Trễ ít nhất 🔼"):
-                            st.session_state.overdue_results_df = results_df.sort_values(by='days_overdue', ascending=True)
+                            # Trễ ít nhất = deadline gần hôm nay nhất
+                            st.session_state.overdue_results = with_sort(overdue_refs, 'task_deadline', False)
+                            reset_task_list('overdue')
                             st.rerun()
                     with sort_cols[1]:
                         if st.button("Trễ nhiều nhất 🔽"):
-                            st.session_state.overdue_results_df = results_df.sort_values(by='days_overdue', ascending=False)
+                            st.session_state.overdue_results = with_sort(overdue_refs, 'task_deadline', True)
+                            reset_task_list('overdue')
                             st.rerun()
                     st.markdown("---")
-                    for index, row in results_df.iterrows():
-                        render_task_card(row, task_sheet_id, index)
+                    render_task_list(results_df, task_sheet_id, 'overdue', read_only=read_only, task_log=task_views)
                 else:
                     st.success("🎉 Không có task nào bị trễ trong bộ lọc này. Tuyệt vời!")
+
+# --- NÉN LOG TASK (ADMIN) ---
+if is_authorized('compact_task_log'):
+    st.markdown("---")
+    if st.button("🗜️ Nén log task", disabled=read_only,
+                 help="Ghi trạng thái mới nhất của mỗi task vào snapshot và chuyển các phiên bản cũ sang lưu trữ."):
+        with st.spinner("Đang nén log..."):
+            summary = compact_task_log(task_sheet_id)
+        if summary is not None:
+            st.success(f"Đã nén log: {summary['tasks']} task trong snapshot, {summary['archived']} phiên bản cũ "
+                       f"được lưu trữ, {summary['removed']} hàng được xóa khỏi log.")
+
+# --- BÁO CÁO BỘ NHỚ PHIÊN (ADMIN) ---
+if is_authorized('access_admin_dashboard'):
+    st.markdown("---")
+    render_session_memory_report()
+
+finish_rerun_timer('task_log')
@@ -0,0 +1,23 @@
+# pages/2_Performance.py
+
+import streamlit as st
+
+from utils import is_authorized
+
+# --- CẤU HÌNH TRANG VÀ KIỂM TRA QUYỀN ---
+st.set_page_config(page_title="Hiệu năng", page_icon="📈", layout="wide")
+
+if not st.session_state.get('logged_in'):
+    st.error("Bạn cần đăng nhập để xem trang này.")
+    st.stop()
+if not is_authorized('access_admin_dashboard'):
+    st.error("⚠️ Truy cập bị từ chối. Bạn không có quyền xem trang này.")
+    st.stop()
+
+# --- GIAO DIỆN ---
+# Import sau khi kiểm tra quyền: view_utils kéo theo pandas, gspread,...
+from utils import render_perf_report
+
+st.title("📈 Hiệu năng")
+st.markdown("---")
+render_perf_report()
@@ -1,13 +1,54 @@
-from .config import SHEET_IDS, TASK_SHEET_NAME
+import importlib
 
-# Từ google_sheet_utils.py
-from .google_sheet_utils import get_data_from_sheet, get_sheet_headers, add_row_from_dict
+# Các tên công khai của package theo module chứa chúng. Module con (cùng pandas, numpy, pytz,
+# gspread, pyarrow mà chúng dùng) chỉ được import khi một tên của nó được dùng lần đầu, nên
+# `from utils import is_authorized` ở bước kiểm tra đăng nhập không phải tải các thư viện nặng.
+# Thêm hàm công khai mới thì khai báo tên vào đây. Xem benchmarks/startup_profile.py.
+_EXPORTS = {
+    # Từ config.py
+    'config': ['SHEET_IDS', 'TASK_SHEET_NAME'],
 
-# Từ auth_utils.py
-from .auth_utils import is_authorized, require_role
+    # Từ google_sheet_utils.py
+    'google_sheet_utils': ['get_data_from_sheet', 'get_task_log', 'get_sheet_headers', 'add_row_from_dict', 'add_rows_from_dicts', 'refresh_sheet_data', 'get_handle_cache_stats', 'get_sheet_cache_stats', 'get_data_version', 'compact_task_log', 'get_task_archive'],
 
-# Từ view_utils.py
-from .view_utils import render_task_card, set_active_view
+    # Từ task_pipeline.py
+    'task_pipeline': ['get_task_views', 'make_task_refs', 'resolve_task_refs', 'with_sort', 'get_user_inbox', 'get_inbox_deadline_buckets'],
 
-# Từ data_utils.py
-from .data_utils import search_dataframe, process_deadline_tasks, get_overdue_tasks, filter_latest_tasks_by_name, get_current_hcm_time_str, get_id_from_url, backfill_data
+    # Từ sheets_client.py
+    'sheets_client': ['get_rate_limiter_stats', 'configure_rate_limiter'],
+
+    # Từ write_queue.py
+    'write_queue': ['get_write_status'],
+
+    # Từ perf_utils.py
+    'perf_utils': ['timed', 'get_perf_report', 'export_perf_log'],
+
+    # Từ search_index.py
+    'search_index': ['search_tasks', 'fold_accents'],
+
+    # Từ auth_utils.py
+    'auth_utils': ['is_authorized', 'require_role'],
+
+    # Từ view_utils.py
+    'view_utils': ['render_task_card', 'render_task_list', 'reset_task_list', 'render_task_table', 'render_task_timeline', 'set_active_view', 'track_write', 'render_write_status', 'render_session_memory_report', 'start_rerun_timer', 'finish_rerun_timer', 'render_perf_report'],
+
+    # Từ data_utils.py
+    'data_utils': ['search_dataframe', 'process_deadline_tasks', 'get_overdue_tasks', 'get_deadline_buckets', 'get_hcm_today', 'filter_latest_tasks_by_name', 'get_current_hcm_time_str', 'get_id_from_url', 'backfill_data', 'reduce_task_log', 'fold_task_log', 'diff_task_edits', 'find_blanked_fill_edits', 'generate_task_id', 'get_task_timeline'],
+}
+_MODULE_OF = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = list(_MODULE_OF)
+
+
+def __getattr__(name):
+    """Import module con chứa name khi tên này được dùng lần đầu, rồi lưu lại cho các lần sau."""
+    module = _MODULE_OF.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
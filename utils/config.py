@@ -8,3 +8,60 @@ SHEET_IDS = {
 }
 
 TASK_SHEET_NAME = "Tasks_Processed"
+
+# Nén log (compact_task_log): trạng thái mới nhất của mỗi task được ghi vào worksheet snapshot,
+# các phiên bản cũ bị thay thế được chuyển sang worksheet lưu trữ (lịch sử vẫn tra cứu được).
+TASK_SNAPSHOT_SHEET_NAME = "Tasks_Snapshot"
+TASK_ARCHIVE_SHEET_NAME = "Tasks_Archive"
+
+# Số hàng cuối dùng làm "dấu vân tay" khi đồng bộ gia tăng (delta) sheet log.
+# Nếu các hàng này bị sửa/xóa trên sheet, dữ liệu sẽ được tải lại toàn bộ.
+DELTA_FINGERPRINT_ROWS = 5
+
+# Thư mục lưu bản chụp (snapshot) cục bộ của các sheet, dùng để khởi động nhanh
+# và hiển thị ở chế độ chỉ đọc khi không kết nối được Google Sheets.
+SNAPSHOT_DIR = ".cache/snapshots"
+
+# Sau SHEET_PROBE_INTERVAL giây, một lượt kiểm tra rẻ (header + vài hàng cuối, một lệnh gọi API)
+# xác định sheet có thay đổi hay không; chỉ khi có thay đổi mới đọc delta/tải lại.
+# Trong lúc kiểm tra, các phiên vẫn được trả ngay dữ liệu hiện có (stale-while-revalidate).
+SHEET_PROBE_INTERVAL = 30
+# Dữ liệu chưa được kiểm tra lại quá SHEET_DATA_MAX_STALENESS giây thì lượt đọc phải chờ (giới hạn cứng).
+SHEET_DATA_MAX_STALENESS = 1800
+
+# --- Hàng đợi ghi (write queue) ---
+# Các hàng được gom lại và ghi bằng một lệnh append_rows mỗi WRITE_FLUSH_INTERVAL giây.
+WRITE_FLUSH_INTERVAL = 1.0
+# Thử lại khi gặp lỗi quota (429) hoặc lỗi tạm thời: chờ theo cấp số nhân có jitter.
+WRITE_RETRY_BASE_DELAY = 1.0
+WRITE_RETRY_MAX_DELAY = 60.0
+WRITE_MAX_ATTEMPTS = 8
+# File nhật ký các hàng chưa ghi xong, để không mất dữ liệu khi tiến trình khởi động lại.
+WRITE_JOURNAL_PATH = ".cache/write_journal.jsonl"
+
+# --- Giới hạn tốc độ gọi Google Sheets API (sheets_client) ---
+# Hạn mức của project: mặc định Google Sheets API cho 60 lệnh đọc và 60 lệnh ghi mỗi phút cho mỗi
+# người dùng; mọi phiên dùng chung một service account nên dùng chung hạn mức này.
+SHEETS_READ_REQUESTS_PER_MINUTE = 60
+SHEETS_WRITE_REQUESTS_PER_MINUTE = 60
+# Số lệnh được gọi dồn ngay (dung lượng token bucket); phần còn lại được cấp đều theo thời gian.
+SHEETS_RATE_BURST = 10
+# Số request đồng thời tối đa, cũng là số kết nối keep-alive giữ trong pool.
+SHEETS_MAX_CONCURRENT_REQUESTS = 8
+# Chờ lượt quá SHEETS_QUEUE_TIMEOUT giây thì bỏ (ConnectionError): phiên dùng dữ liệu đã cache,
+# hàng đợi ghi sẽ thử lại sau.
+SHEETS_QUEUE_TIMEOUT = 30.0
+
+# --- Hiển thị danh sách task ---
+# Số card mỗi trang (mặc định) và các lựa chọn cho người dùng
+TASK_PAGE_SIZE = 20
+TASK_PAGE_SIZE_OPTIONS = [10, 20, 50, 100]
+
+# --- Đo hiệu năng (perf_utils) ---
+# Cận trên (giây) các bucket của histogram độ trễ; bucket cuối chứa mọi giá trị lớn hơn.
+PERF_LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+# Số sự kiện (span) gần nhất được giữ trong bộ nhớ để xem/xuất log, và số phiên được theo dõi.
+PERF_EVENT_BUFFER = 5000
+PERF_MAX_SESSIONS = 200
+# Logger nhận bản ghi JSON của từng span (mức INFO); cấu hình handler để chuyển sang hệ thống log.
+PERF_LOGGER_NAME = "family_task.perf"
@@ -1,8 +1,140 @@
 # utils/data_utils.py
+import re
+import secrets
+import threading
+import time
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import pytz
+from utils.perf_utils import timed
+
+# --- SCHEMA CỦA LOG TASK ---
+# Các cột thời gian và định dạng chuỗi tương ứng trên sheet
+TASK_DATETIME_FORMATS = {
+    'add_time': '%d/%m/%Y %H:%M:%S',
+    'task_deadline': '%Y-%m-%d',
+}
+# Các cột có ít giá trị lặp lại nhiều lần, lưu dạng category cho nhẹ và so sánh nhanh
+TASK_CATEGORICAL_COLUMNS = ['task_po', 'task_status', 'task_report_to']
+# Các cột an toàn để tự động điền từ lần cập nhật trước của cùng task (backfill)
+TASK_FILL_COLUMNS = ['task_deadline', 'task_link', 'task_des', 'task_report_to', 'task_po']
+
+HCM_TIMEZONE = pytz.timezone('Asia/Ho_Chi_Minh')
+# add_time được ghi theo giờ Việt Nam (UTC+7, không có giờ mùa hè)
+HCM_UTC_OFFSET = pd.Timedelta(hours=7)
+
+# --- ID CỦA HÀNG LOG ---
+# task_id dạng 'TASK-' + ULID (26 ký tự Crockford base32: 10 ký tự thời gian theo ms + 16 ký tự ngẫu nhiên).
+# Chuỗi ID sắp xếp theo thứ tự từ điển cũng là thứ tự thời gian tạo.
+TASK_ID_PREFIX = 'TASK-'
+_CROCKFORD_ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+_CROCKFORD_CHARS = np.array(list(_CROCKFORD_ALPHABET))
+_ULID_TASK_ID_PATTERN = re.compile(rf'{TASK_ID_PREFIX}[0-7][{_CROCKFORD_ALPHABET}]{{25}}')
+_task_id_state = {'lock': threading.Lock(), 'ms': -1, 'random': 0}
+
+
+def normalize_task_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Áp dụng schema của log task một lần duy nhất khi nạp dữ liệu:
+    - Ô rỗng hoặc chỉ có khoảng trắng thành NaN, các cột văn bản có kiểu object.
+    - add_time/task_deadline thành datetime64 (giá trị sai định dạng thành NaT).
+    - task_po/task_status/task_report_to thành category.
+    Hàm có thể gọi lại trên DataFrame đã chuẩn hóa (các cột đã đúng kiểu được giữ nguyên).
+    """
+    df = df.copy()
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype) or pd.api.types.is_datetime64_any_dtype(df[col]):
+            continue
+        values = df[col].astype(object)
+        blank = values.str.strip().eq('').fillna(False).astype(bool)
+        df[col] = values.mask(blank | values.isna(), np.nan)
+
+    for col, fmt in TASK_DATETIME_FORMATS.items():
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col], format=fmt, errors='coerce')
+
+    for col in TASK_CATEGORICAL_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    return df
+
+
+def concat_task_frames(frames: list, ignore_index: bool = True) -> pd.DataFrame:
+    """
+    Nối các DataFrame đã chuẩn hóa mà vẫn giữ kiểu category
+    (pd.concat sẽ đổi về object nếu tập category của các phần khác nhau).
+    """
+    frames = list(frames)
+    for col in TASK_CATEGORICAL_COLUMNS:
+        parts = [f[col] for f in frames if col in f.columns and isinstance(f[col].dtype, pd.CategoricalDtype)]
+        if len(parts) < 2:
+            continue
+        categories = parts[0].cat.categories
+        for part in parts[1:]:
+            categories = categories.union(part.cat.categories, sort=False)
+        dtype = pd.CategoricalDtype(categories)
+        frames = [f.assign(**{col: f[col].astype(dtype)}) if col in f.columns else f for f in frames]
+    return pd.concat(frames, ignore_index=ignore_index)
+
+
+def format_task_value(column: str, value):
+    """Chuyển một giá trị đã chuẩn hóa về dạng chuỗi để ghi lại lên sheet."""
+    if value is None or (np.isscalar(value) and pd.isna(value)) or value is pd.NaT:
+        return ''
+    if column in TASK_DATETIME_FORMATS and isinstance(value, (datetime, pd.Timestamp)):
+        return value.strftime(TASK_DATETIME_FORMATS[column])
+    return value
+
+
+def _encode_crockford(value: int, length: int) -> str:
+    return ''.join(_CROCKFORD_ALPHABET[(value >> shift) & 31] for shift in range(5 * (length - 1), -1, -5))
+
+
+def generate_task_id() -> str:
+    """
+    Tạo task_id duy nhất, tăng dần theo thời gian (kiểu ULID) cho mỗi hàng log mới.
+    Trong cùng một mili giây (hoặc khi đồng hồ lùi), phần ngẫu nhiên được tăng thêm 1 để
+    các ID do tiến trình này tạo luôn tăng dần; phần ngẫu nhiên 80 bit tránh trùng giữa các tiến trình.
+    """
+    state = _task_id_state
+    with state['lock']:
+        ms = time.time_ns() // 1_000_000
+        if ms <= state['ms']:
+            ms, random_part = state['ms'], state['random'] + 1
+            if random_part >> 80:
+                ms, random_part = ms + 1, secrets.randbits(79)
+        else:
+            random_part = secrets.randbits(80)
+        state['ms'], state['random'] = ms, random_part
+    return TASK_ID_PREFIX + _encode_crockford(ms, 10) + _encode_crockford(random_part, 16)
+
+
+def task_order_key(df: pd.DataFrame) -> pd.Series:
+    """
+    Khóa sắp xếp theo thời gian cho từng hàng log, so sánh được bằng chuỗi:
+    - Hàng có task_id kiểu ULID: chính phần ULID (không cần đọc add_time).
+    - Hàng cũ (task_id dạng khác hoặc trống): thời điểm add_time mã hóa cùng định dạng,
+      phần ngẫu nhiên bằng 0. Hàng không có add_time có khóa NaN.
+    """
+    if 'task_id' in df.columns:
+        ids = df['task_id'].astype(object)
+        is_ulid = ids.str.fullmatch(_ULID_TASK_ID_PATTERN).fillna(False).astype(bool)
+    else:
+        ids, is_ulid = None, pd.Series(False, index=df.index)
+    key = pd.Series(np.nan, index=df.index, dtype=object)
+    if is_ulid.any():
+        key[is_ulid] = ids[is_ulid].str[len(TASK_ID_PREFIX):]
+
+    legacy = ~is_ulid
+    if 'add_time' in df.columns and legacy.any():
+        add_time = df.loc[legacy, 'add_time']
+        add_time = add_time[add_time.notna()]
+        if not add_time.empty:
+            ms = ((add_time - HCM_UTC_OFFSET - pd.Timestamp(0)) // pd.Timedelta(milliseconds=1)).to_numpy(dtype=np.int64)
+            chars = _CROCKFORD_CHARS[(ms[:, None] >> np.arange(45, -1, -5)) & 31]
+            key[add_time.index] = np.char.add(chars.view('<U10').ravel(), '0' * 16).astype(object)
+    return key
 
 
 def search_dataframe(df: pd.DataFrame, search_term: str, search_column: str) -> pd.DataFrame:
@@ -12,87 +144,281 @@ def search_dataframe(df: pd.DataFrame, search_term: str, search_column: str) ->
     if df.empty or not search_term.strip() or search_column not in df.columns:
         return pd.DataFrame(columns=df.columns)
 
-    mask = df[search_column].astype(str).str.contains(search_term, case=False, na=False)
+    mask = df[search_column].astype(str).str.contains(search_term, case=False, na=False, regex=False)
     return df[mask]
 
 
-def filter_latest_tasks_by_name(df: pd.DataFrame):
+def _in_time_order(df: pd.DataFrame, key: pd.Series) -> tuple:
     """
-    Lọc DataFrame để chỉ giữ lại task có add_time mới nhất cho mỗi task_name.
+    (df, key) theo thứ tự thời gian của key, hàng không có khóa ở cuối.
+    Log chỉ-thêm với ID tăng dần vốn đã đúng thứ tự, khi đó không cần sắp xếp.
     """
-    if df.empty or 'add_time' not in df.columns or 'task_name' not in df.columns:
-        return df
+    if key.notna().all() and key.is_monotonic_increasing:
+        return df, key
+    order = np.argsort(key.fillna('~').to_numpy(dtype=str), kind='stable')
+    return df.iloc[order], key.iloc[order]
+
 
-    df_copy = df.copy()
-    df_copy['add_time_str'] = df_copy['add_time'].astype(str)
-    df_copy['add_time_dt'] = pd.to_datetime(
-        df_copy['add_time_str'],
-        format='%d/%m/%Y %H:%M:%S',
-        errors='coerce'
-    )
+def _latest_rows(ordered_df: pd.DataFrame, key: pd.Series) -> pd.DataFrame:
+    """
+    Hàng cuối cùng (có khóa thời gian) của mỗi task_name, với dữ liệu đã theo thứ tự thời gian
+    (_in_time_order); kết quả sắp theo task_name.
+    """
+    valid = ordered_df[key.notna().to_numpy()]
+    return valid[~valid['task_name'].duplicated(keep='last')].sort_values(by='task_name', kind='stable')
 
-    df_copy.dropna(subset=['add_time_dt'], inplace=True)
-    if df_copy.empty:
-        return df_copy.drop(columns=['add_time_str', 'add_time_dt'], errors='ignore')
 
-    df_sorted = df_copy.sort_values(by=['task_name', 'add_time_dt'], ascending=[True, False])
-    df_latest = df_sorted.drop_duplicates(subset='task_name', keep='first')
+def filter_latest_tasks_by_name(df: pd.DataFrame):
+    """
+    Lọc DataFrame để chỉ giữ lại hàng mới nhất (theo task_id, hoặc add_time với hàng cũ)
+    cho mỗi task_name.
+    """
+    if df.empty or 'add_time' not in df.columns or 'task_name' not in df.columns:
+        return df
 
-    return df_latest.drop(columns=['add_time_str', 'add_time_dt'], errors='ignore')
+    return _latest_rows(*_in_time_order(df, task_order_key(df)))
 
 
-def process_deadline_tasks(df: pd.DataFrame):
+def reduce_task_log(df: pd.DataFrame) -> dict:
     """
-    Phân loại và sắp xếp các task sắp đến hạn, trừ những task đã hoàn thành.
+    Gộp log task trong một lượt (thay cho backfill_data rồi filter_latest_tasks_by_name) và trả về:
+    - 'history': toàn bộ log đã backfill; trong mỗi task_name các hàng theo thứ tự thời gian.
+    - 'latest': trạng thái mới nhất (đã backfill) của mỗi task_name, sắp theo task_name.
+    - 'offsets': {task_name: mảng vị trí (iloc) các hàng của task trong history, theo thời gian}.
+    Thứ tự thời gian lấy từ task_order_key; log chỉ-thêm với ID tăng dần không cần sắp xếp lại.
     """
-    if df.empty:
-        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+    if df.empty or 'add_time' not in df.columns or 'task_name' not in df.columns:
+        return {'history': df, 'latest': df, 'offsets': {}}
 
-    df_filtered = df[df['task_status'] != 'Đã hoàn thành'].copy()
-    df_filtered['deadline_dt'] = pd.to_datetime(df_filtered['task_deadline'], format='%Y-%m-%d', errors='coerce')
+    with timed('pipeline.backfill', rows=len(df)):
+        history, key = _in_time_order(df, task_order_key(df))
+        history = history.copy()
+        fill_cols = [col for col in TASK_FILL_COLUMNS if col in history.columns]
+        history[fill_cols] = history.groupby('task_name', sort=False)[fill_cols].ffill()
+        offsets = history.groupby('task_name', sort=False).indices
+    with timed('pipeline.latest', rows=len(history)):
+        latest = _latest_rows(history, key)
+    return {'history': history, 'latest': latest, 'offsets': offsets}
 
-    today = pd.Timestamp.now().normalize()
-    df_valid = df_filtered.dropna(subset=['deadline_dt']).copy()
-    df_valid = df_valid[df_valid['deadline_dt'] >= today]
 
-    if df_valid.empty:
-        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+def fold_task_log(reduced: dict, new_rows: pd.DataFrame):
+    """
+    Chế độ gia tăng của reduce_task_log: gộp thêm các hàng mới được append vào log.
+    Trạng thái mới nhất của mỗi task chính là giá trị mang sang (carry-forward) để
+    backfill các hàng mới, nên không cần xử lý lại phần log cũ.
+    Trả về None nếu các hàng mới không nối tiếp được (thiếu khóa thời gian hoặc cũ hơn
+    trạng thái hiện có); khi đó nơi gọi cần chạy lại reduce_task_log trên toàn bộ log.
+    """
+    if new_rows.empty:
+        return reduced
+    history, latest = reduced['history'], reduced['latest']
+    if history.empty or 'add_time' not in history.columns or 'task_name' not in history.columns:
+        return reduce_task_log(new_rows)
+
+    new_key = task_order_key(new_rows)
+    if new_key.isna().any():
+        return None
+    new_ordered, new_key = _in_time_order(new_rows, new_key)
+    carry = latest[latest['task_name'].isin(new_ordered['task_name'])]
+    previous_key = new_ordered['task_name'].map(pd.Series(task_order_key(carry).to_numpy(), index=carry['task_name']))
+    if (previous_key.notna() & (new_key < previous_key.fillna(''))).any():
+        return None
 
-    due_today_df = df_valid[df_valid['deadline_dt'] == today]
-    tomorrow = today + timedelta(days=1)
-    day_after_tomorrow = today + timedelta(days=2)
-    due_soon_df = df_valid[(df_valid['deadline_dt'] >= tomorrow) & (df_valid['deadline_dt'] <= day_after_tomorrow)]
-    three_days_later = today + timedelta(days=3)
-    due_later_df = df_valid[df_valid['deadline_dt'] >= three_days_later]
+    # Đặt trạng thái mới nhất của các task liên quan lên trước làm giá trị mang sang
+    combined = concat_task_frames([carry, new_ordered], ignore_index=False)
+    fill_cols = [col for col in TASK_FILL_COLUMNS if col in combined.columns]
+    combined[fill_cols] = combined.groupby('task_name', sort=False)[fill_cols].ffill()
+    new_filled = combined.iloc[len(carry):]
+
+    new_latest = _latest_rows(new_filled, new_key)
+    latest = concat_task_frames(
+        [latest[~latest['task_name'].isin(new_latest['task_name'])], new_latest], ignore_index=False
+    ).sort_values(by='task_name', kind='stable')
+    # Nối vị trí các hàng mới (nằm sau history cũ) vào chỉ mục của từng task; sao chép dict
+    # để các phiên đang giữ kết quả cũ không bị ảnh hưởng
+    offsets = dict(reduced['offsets'])
+    for name, positions in new_filled.groupby('task_name', sort=False).indices.items():
+        positions = positions + len(history)
+        offsets[name] = np.concatenate([offsets[name], positions]) if name in offsets else positions
+    history = concat_task_frames([history, new_filled], ignore_index=False)
+    return {'history': history, 'latest': latest, 'offsets': offsets}
+
+
+def get_task_timeline(reduced: dict, task_name: str, archived: dict = None) -> pd.DataFrame:
+    """
+    Các phiên bản (hàng log đã backfill) của một task theo thứ tự thời gian, lấy qua
+    reduced['offsets'] nên chỉ tốn thời gian theo số phiên bản của task đó.
+    archived: các phiên bản đã được nén sang worksheet lưu trữ (get_task_archive), nếu muốn
+    xem cả lịch sử trước lần nén.
+    """
+    positions = reduced.get('offsets', {}).get(task_name)
+    timeline = reduced['history'].iloc[positions if positions is not None else slice(0, 0)]
+    if archived is None:
+        return timeline
+    older = get_task_timeline(archived, task_name)
+    if older.empty:
+        return timeline
+
+    combined = concat_task_frames([older, timeline])
+    if 'task_id' in combined.columns:
+        # Lần nén bị dừng giữa chừng có thể để cùng một hàng ở cả worksheet lưu trữ lẫn log
+        combined = combined[~combined['task_id'].duplicated() | combined['task_id'].isna()]
+    combined, _ = _in_time_order(combined, task_order_key(combined))
+    combined = combined.copy()
+    fill_cols = [col for col in TASK_FILL_COLUMNS if col in combined.columns]
+    combined[fill_cols] = combined[fill_cols].ffill()
+    return combined
+
+
+def diff_task_edits(original_df: pd.DataFrame, edited_df: pd.DataFrame, columns: list) -> list:
+    """
+    So sánh bảng đã chỉnh sửa với trạng thái mới nhất ban đầu (cùng index) trên các cột cho phép sửa.
+    Trả về danh sách dict cho các task có thay đổi: toàn bộ dữ liệu của task với giá trị mới,
+    sẵn sàng ghi thành hàng log mới. Ô trống và NaN được coi là bằng nhau.
+    """
+    edited_df = edited_df.reindex(original_df.index)
+    changed = pd.Series(False, index=original_df.index)
+    for column in columns:
+        before, after = original_df[column], edited_df[column]
+        if column in TASK_DATETIME_FORMATS:
+            before, after = pd.to_datetime(before, errors='coerce'), pd.to_datetime(after, errors='coerce')
+            same = (before == after) | (before.isna() & after.isna())
+        else:
+            same = before.astype(object).fillna('').astype(str).str.strip() == after.astype(object).fillna('').astype(str).str.strip()
+        changed |= ~same
+
+    rows = []
+    for label in changed.index[changed.to_numpy()]:
+        row = original_df.loc[label].to_dict()
+        for column in columns:
+            value = edited_df.at[label, column]
+            if column in TASK_DATETIME_FORMATS:
+                value = pd.to_datetime(value, errors='coerce')
+            elif isinstance(value, str):
+                value = value.strip()
+            row[column] = value
+        rows.append(row)
+    return rows
+
+
+def find_blanked_fill_edits(original_df: pd.DataFrame, edited_df: pd.DataFrame, columns: list) -> dict:
+    """
+    Các task mà bảng đã chỉnh sửa xóa trắng một cột backfill (TASK_FILL_COLUMNS) đang có giá trị:
+    {task_name: [cột]}. Hàng log mới với ô trống sẽ được điền lại giá trị cũ khi gộp log
+    (backfill), nên thay đổi đó không có tác dụng và không được ghi.
+    """
+    edited_df = edited_df.reindex(original_df.index)
+    blanked = {}
+    for column in columns:
+        if column not in TASK_FILL_COLUMNS:
+            continue
+        before, after = original_df[column], edited_df[column]
+        if column in TASK_DATETIME_FORMATS:
+            after_blank = pd.to_datetime(after, errors='coerce').isna()
+        else:
+            after_blank = after.astype(object).fillna('').astype(str).str.strip() == ''
+        before_blank = before.astype(object).fillna('').astype(str).str.strip() == ''
+        for name in original_df.loc[after_blank & ~before_blank, 'task_name']:
+            blanked.setdefault(name, []).append(column)
+    return blanked
+
+
+def get_hcm_today() -> pd.Timestamp:
+    """Ngày hôm nay (00:00, không kèm múi giờ) theo giờ Asia/Ho_Chi_Minh."""
+    return pd.Timestamp(datetime.now(HCM_TIMEZONE).date())
+
+
+def build_deadline_index(latest_df: pd.DataFrame, today: pd.Timestamp = None) -> dict:
+    """
+    Dựng chỉ mục deadline cho các task chưa hoàn thành và có deadline:
+    task được sắp theo task_deadline và chia theo thư ký (task_po), kèm mốc ranh giới
+    các ngày (tìm nhị phân) để phân loại quá hạn / hôm nay / 2-3 ngày tới / sau đó.
+    Cột days_overdue (số ngày đã trễ so với hôm nay) được tính sẵn.
+    Chỉ mục gắn với ngày `today`, cần dựng lại khi dữ liệu hoặc ngày thay đổi.
+    """
+    today = get_hcm_today() if today is None else today
+    if latest_df.empty or 'task_deadline' not in latest_df.columns:
+        return {'today': today, 'all': _deadline_partition(pd.DataFrame(), today), 'by_po': {}}
+
+    open_df = latest_df[(latest_df['task_status'] != 'Đã hoàn thành') & latest_df['task_deadline'].notna()]
+    open_df = open_df.sort_values(by='task_deadline', kind='stable')
+    open_df = open_df.assign(days_overdue=(today - open_df['task_deadline']).dt.days)
+
+    by_po = {}
+    if 'task_po' in open_df.columns:
+        for po, group in open_df.groupby('task_po', observed=True, sort=False):
+            by_po[po] = _deadline_partition(group, today)
+    return {'today': today, 'all': _deadline_partition(open_df, today), 'by_po': by_po}
+
+
+def _deadline_partition(sorted_df: pd.DataFrame, today: pd.Timestamp) -> dict:
+    """Tách một nhóm task đã sắp theo deadline thành 4 nhóm bằng tìm nhị phân theo ranh giới ngày."""
+    if sorted_df.empty:
+        empty = pd.DataFrame()
+        return {'overdue': empty, 'today': empty, 'soon': empty, 'later': empty}
+    deadlines = sorted_df['task_deadline'].to_numpy()
+    boundaries = [today, today + timedelta(days=1), today + timedelta(days=3)]
+    i_today, i_tomorrow, i_later = np.searchsorted(deadlines, [b.to_datetime64() for b in boundaries], side='left')
+    return {
+        'overdue': sorted_df.iloc[:i_today],
+        'today': sorted_df.iloc[i_today:i_tomorrow],
+        'soon': sorted_df.iloc[i_tomorrow:i_later],
+        'later': sorted_df.iloc[i_later:],
+    }
+
+
+def query_deadline_index(index: dict, selected_pos=None) -> dict:
+    """
+    Lấy 4 nhóm task {'overdue', 'today', 'soon', 'later'} (mỗi nhóm sắp theo deadline)
+    cho các thư ký được chọn, hoặc cho tất cả nếu không chọn ai.
+    """
+    if not selected_pos:
+        return dict(index['all'])
+    partitions = [index['by_po'][po] for po in selected_pos if po in index['by_po']]
+    if len(partitions) == 1:
+        return dict(partitions[0])
+    buckets = {}
+    for name in ('overdue', 'today', 'soon', 'later'):
+        parts = [p[name] for p in partitions if not p[name].empty]
+        buckets[name] = (
+            concat_task_frames(parts, ignore_index=False).sort_values(by='task_deadline', kind='stable')
+            if parts else pd.DataFrame()
+        )
+    return buckets
+
+
+# Chỉ mục deadline dùng chung, dựng lại khi DataFrame nguồn hoặc ngày (giờ HCM) thay đổi
+_deadline_index_memo = {'lock': threading.Lock(), 'source': None, 'index': None}
+
+
+def get_deadline_buckets(latest_df: pd.DataFrame, selected_pos=None) -> dict:
+    """
+    Phân loại deadline bằng chỉ mục dùng chung (xem build_deadline_index).
+    Chỉ mục chỉ được dựng lại khi latest_df là một phiên bản dữ liệu mới hoặc sang ngày mới.
+    """
+    today = get_hcm_today()
+    memo = _deadline_index_memo
+    with memo['lock']:
+        if memo['source'] is not latest_df or memo['index']['today'] != today:
+            memo['index'] = build_deadline_index(latest_df, today)
+            memo['source'] = latest_df
+        index = memo['index']
+    return query_deadline_index(index, selected_pos)
 
-    due_today_df = due_today_df.sort_values(by='deadline_dt')
-    due_soon_df = due_soon_df.sort_values(by='deadline_dt')
-    due_later_df = due_later_df.sort_values(by='deadline_dt')
 
-    return due_today_df, due_soon_df, due_later_df
+def process_deadline_tasks(df: pd.DataFrame):
+    """
+    Phân loại và sắp xếp các task sắp đến hạn, trừ những task đã hoàn thành.
+    """
+    buckets = query_deadline_index(build_deadline_index(df))
+    return buckets['today'], buckets['soon'], buckets['later']
 
 
 def get_overdue_tasks(df: pd.DataFrame):
     """
     Lọc và xử lý các task đã quá deadline, trừ những task đã hoàn thành.
     """
-    if df.empty:
-        return pd.DataFrame()
-
-    df_filtered = df[df['task_status'] != 'Đã hoàn thành'].copy()
-    df_filtered['deadline_dt'] = pd.to_datetime(df_filtered['task_deadline'], format='%Y-%m-%d', errors='coerce')
-
-    today = pd.Timestamp.now().normalize()
-    df_valid = df_filtered.dropna(subset=['deadline_dt']).copy()
-    df_overdue = df_valid[df_valid['deadline_dt'] < today].copy()
-
-    if df_overdue.empty:
-        return pd.DataFrame()
-
-    df_overdue['days_overdue'] = (today - df_overdue['deadline_dt']).dt.days
-    df_overdue = df_overdue.sort_values(by='deadline_dt', ascending=True)
-
-    return df_overdue
+    return query_deadline_index(build_deadline_index(df))['overdue']
 
 
 def get_current_hcm_time_str() -> str:
@@ -100,8 +426,7 @@ def get_current_hcm_time_str() -> str:
     Lấy thời gian hiện tại theo múi giờ GMT+7 (Asia/Ho_Chi_Minh)
     và trả về dưới dạng chuỗi đã được định dạng dd/mm/yyyy HH:MM:SS.
     """
-    hcm_tz = pytz.timezone('Asia/Ho_Chi_Minh')
-    current_time_aware = datetime.now(hcm_tz)
+    current_time_aware = datetime.now(HCM_TIMEZONE)
     return current_time_aware.strftime('%d/%m/%Y %H:%M:%S')
 
 
@@ -123,34 +448,9 @@ def backfill_data(df: pd.DataFrame):
     """
     Tự động điền các giá trị bị thiếu cho một số cột được chỉ định,
     bằng cách lấy giá trị gần nhất của cùng một task trong quá khứ.
+    Khi cần cả trạng thái mới nhất, dùng reduce_task_log để chỉ sắp xếp một lần.
     """
     if df.empty or 'task_name' not in df.columns:
         return df
 
-    df_copy = df.copy()
-
-    # --- BƯỚC MỚI: CHUẨN HÓA DỮ LIỆU RỖNG ---
-    # Chuyển đổi tất cả các ô có chuỗi rỗng thành giá trị NaN (Not a Number)
-    # để hàm ffill() có thể hoạt động chính xác.
-    df_copy.replace('', np.nan, inplace=True)
-
-    # Chuyển đổi cột thời gian để sắp xếp chính xác
-    df_copy['add_time_dt'] = pd.to_datetime(df_copy['add_time'], format='%d/%m/%Y %H:%M:%S', errors='coerce')
-
-    # Sắp xếp theo tên và thời gian tăng dần (từ cũ đến mới)
-    df_copy.sort_values(by=['task_name', 'add_time_dt'], ascending=True, inplace=True)
-
-    # Danh sách các cột an toàn để tự động điền
-    cols_to_fill = [
-        'task_deadline',
-        'task_link',
-        'task_des',
-        'task_report_to',
-        'task_po'
-    ]
-
-    # Chỉ áp dụng ffill cho các cột đã chọn trong mỗi nhóm task_name
-    df_copy[cols_to_fill] = df_copy.groupby('task_name')[cols_to_fill].ffill()
-
-    # Bỏ cột tạm thời
-    return df_copy.drop(columns=['add_time_dt'], errors='ignore')
+    return reduce_task_log(df)['history']
@@ -1,88 +1,921 @@
-# utils/google_sheet_utils.py
-import streamlit as st
-import gspread
-from gspread_dataframe import get_as_dataframe
-import pandas as pd
-from utils.config import SHEET_IDS, TASK_SHEET_NAME
-
-
-@st.cache_resource(ttl=600)
-def connect_to_google_sheet():
-    """Tạo kết nối tới Google Sheets bằng thông tin từ st.secrets."""
-    try:
-        gc = gspread.service_account_from_dict(st.secrets["gcp_service_account"])
-        return gc
-    except Exception as e:
-        st.error(f"Lỗi kết nối Google Sheets: {e}")
-        return None
-
-
-@st.cache_data(ttl=3600)
-def get_sheet_headers(sheet_id: str) -> list:
-    """Lấy danh sách tên các cột từ hàng đầu tiên của sheet được chỉ định."""
-    try:
-        gc = connect_to_google_sheet()
-        spreadsheet = gc.open_by_key(sheet_id)
-        worksheet = spreadsheet.worksheet(TASK_SHEET_NAME)
-        return worksheet.row_values(1)
-    except Exception as e:
-        st.error(f"Không thể đọc header từ sheet ID '{sheet_id}': {e}")
-        return []
-
-
-def add_row_from_dict(sheet_id: str, data_dict: dict):
-    """
-    Tự động sắp xếp và thêm một hàng mới từ một dictionary,
-    đồng thời yêu cầu Google Sheet tự diễn giải kiểu dữ liệu.
-    """
-    gc = connect_to_google_sheet()
-    if gc is None:
-        return False
-    try:
-        headers = get_sheet_headers(sheet_id)
-        if not headers:
-            st.error("Không có header, không thể thêm dữ liệu.")
-            return False
-
-        # Sắp xếp lại dữ liệu theo đúng thứ tự của header
-        ordered_row = [data_dict.get(header, '') for header in headers]
-
-        # Làm sạch giá trị 'nan' trước khi ghi
-        sanitized_row = ['' if pd.isna(item) else item for item in ordered_row]
-
-        spreadsheet = gc.open_by_key(sheet_id)
-        worksheet = spreadsheet.worksheet(TASK_SHEET_NAME)
-
-        # Ghi dữ liệu và yêu cầu Google Sheet tự nhận diện kiểu (ngày tháng, số,...)
-        worksheet.append_row(sanitized_row, value_input_option='USER_ENTERED')
-
-        # Xóa cache để đảm bảo dữ liệu được làm mới
-        st.cache_data.clear()
-        return True
-    except Exception as e:
-        st.error(f"Lỗi khi thêm dữ liệu vào Google Sheet: {e}")
-        return False
-
-
-@st.cache_data(ttl=600)
-def get_data_from_sheet(sheet_id: str):
-    """Lấy toàn bộ dữ liệu từ sheet được chỉ định và trả về dưới dạng DataFrame."""
-    if not sheet_id:
-        st.error("Sheet ID không được cung cấp.")
-        return pd.DataFrame()
-    gc = connect_to_google_sheet()
-    if gc is None:
-        return pd.DataFrame()
-    try:
-        spreadsheet = gc.open_by_key(sheet_id)
-        worksheet = spreadsheet.worksheet(TASK_SHEET_NAME)
-        df = get_as_dataframe(worksheet, evaluate_formulas=True)
-        # df.dropna(how='all', inplace=True)
-        print(df)
-        return df
-    except gspread.exceptions.WorksheetNotFound:
-        st.error(f"Lỗi: Không tìm thấy trang tính (worksheet) có tên '{TASK_SHEET_NAME}'.")
-        return pd.DataFrame()
-    except Exception as e:
-        st.error(f"Lỗi không xác định khi lấy dữ liệu từ sheet ID '{sheet_id}': {e}")
-        return pd.DataFrame()
+# utils/google_sheet_utils.py
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime
+import streamlit as st
+import gspread
+from gspread.utils import ValueRenderOption, rowcol_to_a1
+import numpy as np
+import pandas as pd
+from utils.config import (
+    SHEET_IDS, TASK_SHEET_NAME, TASK_SNAPSHOT_SHEET_NAME, TASK_ARCHIVE_SHEET_NAME, DELTA_FINGERPRINT_ROWS,
+    SHEET_PROBE_INTERVAL, SHEET_DATA_MAX_STALENESS,
+)
+from utils.snapshot_utils import load_snapshot, save_snapshot_async
+from utils.perf_utils import timed, increment
+from utils.sheets_client import RateLimitedHTTPClient
+from utils.data_utils import (
+    normalize_task_frame, concat_task_frames, format_task_value, reduce_task_log, fold_task_log, task_order_key,
+)
+from utils.write_queue import (
+    configure_write_queue, enqueue_row, enqueue_rows, get_write_statuses, STATUS_COMMITTED, STATUS_FAILED,
+)
+
+
+@st.cache_resource(ttl=600)
+def connect_to_google_sheet():
+    """Tạo kết nối tới Google Sheets bằng thông tin từ st.secrets."""
+    try:
+        # Mọi request đi qua bộ giới hạn tốc độ dùng chung và pool kết nối keep-alive (xem sheets_client)
+        gc = gspread.service_account_from_dict(st.secrets["gcp_service_account"], http_client=RateLimitedHTTPClient)
+        return gc
+    except Exception as e:
+        st.error(f"Lỗi kết nối Google Sheets: {e}")
+        return None
+
+
+def _payload_bytes(rows: list) -> int:
+    """Ước lượng dung lượng dữ liệu của các hàng gửi/nhận qua API: tổng số byte UTF-8 của các ô."""
+    return sum(len(''.join(map(str, row)).encode('utf-8')) for row in rows)
+
+
+def _track_api_call(method: str, bytes_read: int = 0, bytes_written: int = 0):
+    """Đếm một lệnh gọi Google Sheets API (và dung lượng dữ liệu) cho trang hiệu năng."""
+    increment('sheets.api_calls')
+    increment(f'sheets.api_calls.{method}')
+    if bytes_read:
+        increment('sheets.bytes_read', bytes_read)
+    if bytes_written:
+        increment('sheets.bytes_written', bytes_written)
+
+
+@st.cache_resource
+def _get_handle_cache() -> dict:
+    """
+    Cache dùng chung các worksheet handle theo (sheet_id, tên worksheet), kèm kích thước
+    lưới và hàng header, để không phải gọi open_by_key + worksheet (2 lệnh gọi API
+    metadata) mỗi lần đọc/ghi.
+    """
+    return {'lock': threading.Lock(), 'handles': {}, 'api_calls_saved': 0}
+
+
+def get_worksheet(sheet_id: str, worksheet_name: str = TASK_SHEET_NAME, refresh: bool = False):
+    """
+    Lấy worksheet handle từ cache, chỉ mở lại spreadsheet khi chưa có hoặc refresh=True.
+    Ném ConnectionError nếu chưa kết nối được Google Sheets.
+    """
+    cache = _get_handle_cache()
+    key = (sheet_id, worksheet_name)
+    with cache['lock']:
+        handle = cache['handles'].get(key)
+        if handle is not None and not refresh:
+            cache['api_calls_saved'] += 2
+            increment('handle_cache.hits')
+            return handle['worksheet']
+
+    gc = connect_to_google_sheet()
+    if gc is None:
+        raise ConnectionError("Chưa kết nối được Google Sheets.")
+    increment('handle_cache.misses')
+    try:
+        _track_api_call('open_by_key')
+        spreadsheet = gc.open_by_key(sheet_id)
+        _track_api_call('worksheet')
+        worksheet = spreadsheet.worksheet(worksheet_name)
+    except gspread.exceptions.WorksheetNotFound:
+        invalidate_worksheet(sheet_id, worksheet_name)
+        raise
+
+    with cache['lock']:
+        cache['handles'][key] = {
+            'worksheet': worksheet,
+            'row_count': worksheet.row_count,
+            'col_count': worksheet.col_count,
+            'headers': None,
+        }
+    return worksheet
+
+
+def invalidate_worksheet(sheet_id: str, worksheet_name: str = TASK_SHEET_NAME):
+    """Bỏ handle đã cache (worksheet bị xóa/đổi tên hoặc schema thay đổi)."""
+    cache = _get_handle_cache()
+    with cache['lock']:
+        cache['handles'].pop((sheet_id, worksheet_name), None)
+
+
+def _remember_headers(sheet_id: str, headers: list, worksheet_name: str = TASK_SHEET_NAME):
+    """Cập nhật header đã cache khi một lần đọc dữ liệu vừa thấy hàng header."""
+    cache = _get_handle_cache()
+    with cache['lock']:
+        handle = cache['handles'].get((sheet_id, worksheet_name))
+        if handle is not None:
+            handle['headers'] = list(headers)
+
+
+def get_handle_cache_stats() -> dict:
+    """Số handle đang cache và số lệnh gọi API metadata đã tiết kiệm được."""
+    cache = _get_handle_cache()
+    with cache['lock']:
+        return {'handles': len(cache['handles']), 'api_calls_saved': cache['api_calls_saved']}
+
+
+def get_sheet_headers(sheet_id: str) -> list:
+    """Lấy danh sách tên các cột từ hàng đầu tiên của sheet được chỉ định (có cache)."""
+    try:
+        worksheet = get_worksheet(sheet_id)
+        cache = _get_handle_cache()
+        with cache['lock']:
+            handle = cache['handles'].get((sheet_id, TASK_SHEET_NAME))
+            if handle is not None and handle['headers'] is not None:
+                cache['api_calls_saved'] += 1
+                increment('handle_cache.header_hits')
+                return list(handle['headers'])
+        headers = worksheet.row_values(1)
+        _track_api_call('row_values', bytes_read=_payload_bytes([headers]))
+        _remember_headers(sheet_id, headers)
+        return headers
+    except Exception as e:
+        st.error(f"Không thể đọc header từ sheet ID '{sheet_id}': {e}")
+        return []
+
+
+def add_row_from_dict(sheet_id: str, data_dict: dict):
+    """
+    Tự động sắp xếp và thêm một hàng mới từ một dictionary,
+    đồng thời yêu cầu Google Sheet tự diễn giải kiểu dữ liệu.
+
+    Hàng được đưa vào hàng đợi ghi nền (gom nhiều hàng vào một lệnh append_rows,
+    tự thử lại khi gặp lỗi quota) và hiển thị ngay trong dữ liệu đã cache.
+    Trả về write_id để theo dõi trạng thái ghi (xem get_write_status),
+    hoặc False nếu không thể đưa vào hàng đợi.
+    """
+    try:
+        headers = get_sheet_headers(sheet_id)
+        if not headers:
+            st.error("Không có header, không thể thêm dữ liệu.")
+            return False
+
+        # Sắp xếp lại dữ liệu theo đúng thứ tự của header, đưa giá trị đã chuẩn hóa
+        # (ngày giờ, NaN/NaT,...) về đúng dạng chuỗi trên sheet trước khi ghi
+        sanitized_row = [format_task_value(header, data_dict.get(header, '')) for header in headers]
+
+        write_id = enqueue_row(sheet_id, sanitized_row)
+
+        # Ghi xuyên (write-through) vào dữ liệu đã cache thay vì xóa toàn bộ cache
+        _write_through(sheet_id, headers, sanitized_row, write_id)
+        return write_id
+    except Exception as e:
+        st.error(f"Lỗi khi thêm dữ liệu vào Google Sheet: {e}")
+        return False
+
+
+def add_rows_from_dicts(sheet_id: str, data_dicts: list):
+    """
+    Thêm nhiều hàng cùng lúc (ví dụ các task sửa trong chế độ bảng).
+    Tất cả hàng được đưa vào hàng đợi ghi cùng nhau nên được ghi bằng một lệnh
+    append_rows duy nhất, đúng thứ tự truyền vào.
+    Trả về danh sách write_id, hoặc False nếu không thể đưa vào hàng đợi.
+    """
+    try:
+        headers = get_sheet_headers(sheet_id)
+        if not headers:
+            st.error("Không có header, không thể thêm dữ liệu.")
+            return False
+
+        sanitized_rows = [
+            [format_task_value(header, data_dict.get(header, '')) for header in headers]
+            for data_dict in data_dicts
+        ]
+        write_ids = enqueue_rows(sheet_id, sanitized_rows)
+        for row, write_id in zip(sanitized_rows, write_ids):
+            _write_through(sheet_id, headers, row, write_id)
+        return write_ids
+    except Exception as e:
+        st.error(f"Lỗi khi thêm dữ liệu vào Google Sheet: {e}")
+        return False
+
+
+def _append_rows(sheet_id: str, rows: list):
+    """Ghi nhiều hàng vào sheet bằng một lệnh gọi API (dùng bởi hàng đợi ghi)."""
+    worksheet = get_worksheet(sheet_id)
+    try:
+        # Ghi dữ liệu và yêu cầu Google Sheet tự nhận diện kiểu (ngày tháng, số,...)
+        _track_api_call('append_rows', bytes_written=_payload_bytes(rows))
+        with timed('sheets.append_rows', sheet=sheet_id, rows=len(rows)):
+            worksheet.append_rows(rows, value_input_option='USER_ENTERED')
+    except Exception:
+        # Handle có thể đã cũ (worksheet bị đổi tên/xóa): lần thử lại sẽ mở lại
+        invalidate_worksheet(sheet_id)
+        raise
+
+
+@st.cache_resource
+def _get_sheet_sync_state(sheet_id: str) -> dict:
+    """
+    Trạng thái đồng bộ gia tăng của một sheet, dùng chung cho mọi phiên.
+    Nằm trong cache_resource nên không bị xóa bởi st.cache_data.clear().
+    Khi tiến trình mới khởi động, trạng thái được nạp từ snapshot trên đĩa
+    để lần đọc đầu tiên chỉ cần lấy phần delta.
+    """
+    state = {
+        'lock': threading.Lock(),       # Bảo vệ dữ liệu bên dưới; chỉ giữ trong thời gian ngắn
+        'sync_lock': threading.Lock(),  # Chỉ một lượt đồng bộ (đọc API) cho mỗi sheet tại một thời điểm
+        'df': None,          # DataFrame đã tích lũy
+        'reduced': None,     # reduce_task_log(df): {'history', 'latest'}, cập nhật gia tăng
+        'headers': None,     # Hàng header lần đọc gần nhất
+        'last_row': 0,       # Số thứ tự (trên sheet) của hàng cuối cùng đã đọc
+        'tail_hash': None,   # Dấu vân tay của DELTA_FINGERPRINT_ROWS hàng cuối
+        'compaction': None,  # Mốc nén của worksheet snapshot lúc tải (xem compact_task_log)
+        'synced_at': None,   # Thời điểm đồng bộ thành công gần nhất
+        'synced_ts': 0.0,    # time.monotonic() của lần đồng bộ/kiểm tra gần nhất
+        'pending': [],       # {'write_id', 'row'} vừa ghi, hiển thị lạc quan cho tới khi được xác nhận
+        'dirty': False,      # True khi còn hàng pending chưa được đồng bộ về
+        'view': None,        # {'raw', 'history', 'latest', 'version'} đã ghép df + pending (tính lười)
+        'version': 0,        # Tăng mỗi khi dữ liệu trả về thay đổi (đồng bộ có dữ liệu mới hoặc ghi xuyên)
+        'epoch': 0,          # Tăng mỗi lần tải lại toàn bộ; cùng epoch thì df chỉ được nối thêm hàng
+        'stats': {'hits': 0, 'stale_hits': 0, 'misses': 0, 'coalesced': 0, 'refreshes': 0, 'refresh_errors': 0,
+                  'probes': 0, 'probe_changes': 0},
+    }
+    snapshot_df, meta = load_snapshot(sheet_id)
+    if snapshot_df is not None and meta.get('headers'):
+        snapshot_df = normalize_task_frame(snapshot_df)
+        state.update(
+            df=snapshot_df,
+            reduced=reduce_task_log(snapshot_df),
+            headers=meta['headers'],
+            last_row=meta['last_row'],
+            tail_hash=meta['tail_hash'],
+            compaction=meta.get('compaction'),
+            synced_at=meta.get('saved_at'),
+        )
+    return state
+
+
+def _snapshot_meta(state: dict) -> dict:
+    """Các thông tin đồng bộ cần lưu kèm snapshot để có thể tiếp tục đọc delta."""
+    return {'headers': state['headers'], 'last_row': state['last_row'], 'tail_hash': state['tail_hash'],
+            'compaction': state['compaction']}
+
+
+def _pad_rows(rows: list, width: int) -> list:
+    """Chuẩn hóa độ dài mỗi hàng theo số cột header (API bỏ các ô trống ở cuối hàng)."""
+    return [list(row[:width]) + [''] * (width - len(row)) for row in rows]
+
+
+def _fingerprint(rows: list) -> str:
+    """Tính hash cho một nhóm hàng để phát hiện thay đổi/xóa ở cuối sheet."""
+    return hashlib.sha1(repr(rows).encode('utf-8')).hexdigest()
+
+
+def _col_letter(col: int) -> str:
+    """Tên cột A1 (A, B, ..., AA, ...) của cột thứ col (bắt đầu từ 1)."""
+    return rowcol_to_a1(1, col)[:-1]
+
+
+def _rows_to_dataframe(headers: list, rows: list) -> pd.DataFrame:
+    """
+    Tạo DataFrame trực tiếp từ các hàng giá trị đã pad theo header, không qua bước
+    suy luận kiểu từ chuỗi, rồi áp dụng schema của log task (normalize_task_frame).
+    Hàng trống hoàn toàn bị bỏ ngay trên danh sách giá trị.
+    """
+    rows = [row for row in rows if any(value != '' for value in row)]
+    values = np.array(rows, dtype=object).reshape(len(rows), len(headers))
+    values[values == ''] = np.nan
+    return normalize_task_frame(pd.DataFrame(values, columns=headers, dtype=object))
+
+
+def _read_values(worksheet, range_names: list) -> list:
+    """
+    Đọc nhiều vùng trong một lần gọi API. Dùng FORMATTED_VALUE để mọi ô là chuỗi
+    đúng như hiển thị trên sheet (ngày tháng, số,...).
+    """
+    with timed('sheets.read', worksheet=worksheet.title, ranges=len(range_names)) as span:
+        values = worksheet.batch_get(range_names, value_render_option=ValueRenderOption.formatted)
+        span['bytes'] = sum(_payload_bytes(rows) for rows in values)
+    _track_api_call('batch_get', bytes_read=span['bytes'])
+    return values
+
+
+def _full_reload(sheet_id: str, worksheet, state: dict):
+    """
+    Đọc lại toàn bộ worksheet và khởi tạo lại trạng thái đồng bộ.
+    Chỉ đọc trong phạm vi các cột có header (nếu đã biết), không đọc cả lưới.
+    Nếu log đã được nén (compact_task_log), dữ liệu là snapshot cộng các hàng log phía sau;
+    các hàng đầu log đã nằm trong snapshot nhưng chưa bị xóa (nén dở dang) được bỏ qua.
+    """
+    width = len(state['headers']) if state['headers'] else worksheet.col_count
+    values = _read_values(worksheet, [f"A1:{_col_letter(width)}"])[0]
+    headers = list(values[0]) if values else []
+    rows = _pad_rows(values[1:], len(headers))
+
+    snapshot_rows, marker = _read_log_snapshot(sheet_id, headers)
+    log_df = _rows_to_dataframe(headers, rows[_compacted_prefix(rows, marker):])
+    if snapshot_rows:
+        log_df = concat_task_frames([_rows_to_dataframe(headers, snapshot_rows), log_df])
+    state['df'] = log_df
+    state['reduced'] = reduce_task_log(state['df'])
+    state['headers'] = headers
+    state['last_row'] = len(values)
+    state['tail_hash'] = _fingerprint(rows[-DELTA_FINGERPRINT_ROWS:])
+    state['compaction'] = marker
+
+
+# Cột cuối của worksheet snapshot, chứa mốc nén (JSON) ở hàng dữ liệu đầu tiên
+_COMPACTION_MARKER_COLUMN = '_compaction'
+
+
+def _align_rows(rows: list, from_headers: list, to_headers: list) -> list:
+    """Sắp lại các hàng theo thứ tự cột to_headers (cột không có trong from_headers để trống)."""
+    if from_headers == to_headers:
+        return rows
+    positions = [from_headers.index(header) if header in from_headers else None for header in to_headers]
+    return [[row[i] if i is not None else '' for i in positions] for row in rows]
+
+
+def _read_log_snapshot(sheet_id: str, headers: list, marker_only: bool = False) -> tuple:
+    """
+    Đọc worksheet snapshot do compact_task_log ghi: (các hàng theo thứ tự cột headers của log, mốc nén).
+    Mốc nén {'rows', 'tail_hash'} mô tả phần đầu log đã được đưa vào snapshot.
+    Trả về ([], None) nếu log chưa từng được nén. marker_only=True chỉ đọc header và hàng chứa mốc nén.
+    """
+    try:
+        worksheet = get_worksheet(sheet_id, TASK_SNAPSHOT_SHEET_NAME)
+    except gspread.exceptions.WorksheetNotFound:
+        return [], None
+    end_row = min(2, worksheet.row_count) if marker_only else ''
+    values = _read_values(worksheet, [f"A1:{_col_letter(worksheet.col_count)}{end_row}"])[0]
+    if len(values) < 2 or _COMPACTION_MARKER_COLUMN not in values[0]:
+        return [], None
+    snapshot_headers = list(values[0])
+    rows = _pad_rows(values[1:], len(snapshot_headers))
+    marker = json.loads(rows[0][snapshot_headers.index(_COMPACTION_MARKER_COLUMN)] or 'null')
+    return _align_rows(rows, snapshot_headers, headers), marker
+
+
+def _compaction_changed(sheet_id: str, state: dict) -> bool:
+    """
+    Khi log chưa có hàng dữ liệu nào lúc đồng bộ trước (ví dụ ngay sau khi nén), dấu vân tay
+    các hàng cuối không nhận ra được việc log vừa được nối thêm rồi nén tiếp; khi đó so sánh
+    thêm mốc nén hiện tại của worksheet snapshot (một lệnh gọi API).
+    """
+    if state['last_row'] > 1:
+        return False
+    return _read_log_snapshot(sheet_id, state['headers'], marker_only=True)[1] != state['compaction']
+
+
+def _compacted_prefix(rows: list, marker) -> int:
+    """
+    Số hàng đầu log đã nằm trong snapshot nhưng chưa bị xóa khỏi log (lần nén bị dừng giữa chừng),
+    nhận ra qua dấu vân tay các hàng cuối của phần đã nén. Bằng 0 nếu phần đó đã được xóa.
+    """
+    if not marker:
+        return 0
+    count = marker['rows']
+    fp_count = min(DELTA_FINGERPRINT_ROWS, count)
+    if len(rows) >= count and _fingerprint(rows[count - fp_count:count]) == marker['tail_hash']:
+        return count
+    return 0
+
+
+def _apply_delta(sheet_id: str, worksheet, state: dict) -> bool:
+    """
+    Chỉ đọc các hàng mới được thêm sau lần đọc trước và nối vào DataFrame đã cache.
+    Trả về False nếu header hoặc dấu vân tay các hàng cuối không khớp
+    (có hàng cũ bị sửa/xóa) để nơi gọi tải lại toàn bộ.
+    """
+    headers = state['headers']
+    if not headers:
+        return False
+
+    # Đọc lại K hàng cuối đã biết (để đối chiếu) cùng mọi hàng phía sau, trong một lần gọi API
+    fp_count = min(DELTA_FINGERPRINT_ROWS, state['last_row'] - 1)
+    start_row = state['last_row'] - fp_count + 1
+    header_values, tail_values = _read_values(worksheet, ["1:1", f"A{start_row}:{_col_letter(len(headers))}"])
+
+    current_headers = list(header_values[0]) if header_values else []
+    if current_headers != headers:
+        # Schema thay đổi: lần tải lại toàn bộ sẽ đọc theo kích thước lưới mới
+        state['headers'] = None
+        return False
+
+    rows = _pad_rows(tail_values, len(headers))
+    if len(rows) < fp_count or _fingerprint(rows[:fp_count]) != state['tail_hash']:
+        return False
+    if _compaction_changed(sheet_id, state):
+        return False
+
+    new_rows = rows[fp_count:]
+    if new_rows:
+        new_df = _rows_to_dataframe(headers, new_rows)
+        old_len = len(state['df'])
+        state['df'] = concat_task_frames([state['df'], new_df])
+        state['reduced'] = _fold_or_reduce(state['reduced'], state['df'], old_len)
+        state['last_row'] += len(new_rows)
+        state['tail_hash'] = _fingerprint(rows[-DELTA_FINGERPRINT_ROWS:])
+    return True
+
+
+def _probe_changed(sheet_id: str, worksheet, state: dict) -> bool:
+    """
+    Kiểm tra rẻ xem sheet có thay đổi so với lần đồng bộ trước: đọc hàng header, các hàng
+    cuối đã biết (DELTA_FINGERPRINT_ROWS) và các hàng phía sau nếu có, trong một lệnh gọi API.
+    Vùng đọc không có hàng kết thúc: lưới có thể vừa khít dữ liệu, đọc quá lưới sẽ bị API từ chối.
+    Trả về True nếu header khác, có hàng mới, dấu vân tay các hàng cuối không khớp, hoặc log vừa được nén.
+    """
+    headers = state['headers']
+    if not headers:
+        return True
+    last_row = state['last_row']
+    fp_count = min(DELTA_FINGERPRINT_ROWS, last_row - 1)
+    col = _col_letter(len(headers))
+    header_values, tail_values = _read_values(worksheet, ["1:1", f"A{last_row - fp_count + 1}:{col}"])
+
+    if (list(header_values[0]) if header_values else []) != headers:
+        return True
+    rows = _pad_rows(tail_values, len(headers))
+    return len(rows) != fp_count or _fingerprint(rows) != state['tail_hash'] or _compaction_changed(sheet_id, state)
+
+
+def _revalidate(sheet_id: str, state: dict):
+    """
+    Kiểm tra sheet bằng _probe_changed và chỉ đồng bộ (delta/toàn bộ) khi có thay đổi.
+    Khi chưa có dữ liệu hoặc còn hàng pending chờ xác nhận thì đồng bộ luôn.
+    Gọi khi đang giữ state['sync_lock'].
+    """
+    with state['lock']:
+        probe_state = {key: state[key] for key in ('headers', 'last_row', 'tail_hash', 'compaction')}
+        can_probe = state['df'] is not None and not state['dirty']
+    if can_probe:
+        worksheet = get_worksheet(sheet_id)
+        try:
+            with timed('sheets.probe', sheet=sheet_id) as span:
+                changed = span['changed'] = _probe_changed(sheet_id, worksheet, probe_state)
+        except Exception:
+            invalidate_worksheet(sheet_id)
+            raise
+        increment('sheet_cache.probes')
+        increment('sheet_cache.probe_changes', int(changed))
+        with state['lock']:
+            state['stats']['probes'] += 1
+            if not changed:
+                state['synced_at'] = datetime.now().isoformat(timespec='seconds')
+                state['synced_ts'] = time.monotonic()
+                return
+            state['stats']['probe_changes'] += 1
+    _sync_state(sheet_id, state)
+
+
+def _sync_state(sheet_id: str, state: dict):
+    """
+    Đồng bộ trạng thái với sheet (delta, hoặc toàn bộ nếu cần). Gọi khi đang giữ state['sync_lock'].
+    Việc đọc API và gộp dữ liệu được làm trên bản sao các trường đồng bộ, nên các phiên khác
+    vẫn đọc được dữ liệu hiện có trong lúc chờ; kết quả chỉ được gán vào state ở cuối.
+    Các hàng pending đã ghi xong (hoặc thất bại hẳn) trước lần đọc này, hoặc có task_id đã
+    xuất hiện trong các hàng vừa đọc về, được bỏ khỏi danh sách chờ.
+    """
+    worksheet = get_worksheet(sheet_id)
+    with state['lock']:
+        synced = {key: state[key] for key in ('df', 'reduced', 'headers', 'last_row', 'tail_hash', 'compaction')}
+        pending_ids = [p['write_id'] for p in state['pending']]
+
+    # Lấy trạng thái ghi trước khi đọc: hàng đã ghi xong lúc này chắc chắn có trong lần đọc
+    statuses = get_write_statuses(pending_ids)
+    done_ids = {w for w, status in statuses.items() if status in (STATUS_COMMITTED, STATUS_FAILED, None)}
+
+    before = _snapshot_meta(synced)
+    old_len = len(synced['df']) if synced['df'] is not None else 0
+    with timed('sheets.sync', sheet=sheet_id) as span:
+        try:
+            applied = synced['df'] is not None and _apply_delta(sheet_id, worksheet, synced)
+        except Exception:
+            invalidate_worksheet(sheet_id)
+            raise
+        if not applied:
+            if synced['df'] is not None:
+                # Delta thất bại (sửa/xóa hàng cũ hoặc đổi schema): mở lại handle để có
+                # kích thước lưới mới nhất trước khi tải lại toàn bộ
+                worksheet = get_worksheet(sheet_id, refresh=True)
+            _full_reload(sheet_id, worksheet, synced)
+            _remember_headers(sheet_id, synced['headers'])
+            old_len = 0
+        span.update(mode='delta' if applied else 'full', rows=len(synced['df']) - old_len)
+    increment(f"sheets.sync.{span['mode']}")
+    # task_id là duy nhất: hàng pending có ID đã nằm trong dữ liệu đọc về thì đã được ghi
+    confirmed_ids = set()
+    if 'task_id' in synced['headers'] and synced['headers'] == before['headers']:
+        confirmed_ids = set(synced['df']['task_id'].iloc[old_len:].dropna())
+    id_col = synced['headers'].index('task_id') if confirmed_ids else None
+
+    meta = _snapshot_meta(synced)
+    with state['lock']:
+        state.update(synced)
+        state['synced_at'] = datetime.now().isoformat(timespec='seconds')
+        state['synced_ts'] = time.monotonic()
+        pending = [
+            p for p in state['pending']
+            if p['write_id'] not in done_ids and (id_col is None or p['row'][id_col] not in confirmed_ids)
+        ]
+        if not applied:
+            state['epoch'] += 1
+        if not applied or meta != before or len(pending) != len(state['pending']):
+            _bump_version(state)
+        state['pending'] = pending
+        state['dirty'] = bool(pending)
+
+    if meta != before:
+        # Cập nhật snapshot trên đĩa ở nền sau mỗi lần đồng bộ có thay đổi
+        save_snapshot_async(sheet_id, synced['df'], meta)
+
+
+def _bump_version(state: dict):
+    """Đánh dấu dữ liệu trả về đã thay đổi. Gọi khi đang giữ state['lock']."""
+    state['version'] += 1
+    state['view'] = None
+
+
+def _data_age(state: dict) -> float:
+    """Số giây từ lần đồng bộ gần nhất (vô cùng nếu chưa đồng bộ hoặc vừa bị đánh dấu hết hạn)."""
+    return time.monotonic() - state['synced_ts'] if state['synced_ts'] else float('inf')
+
+
+def _count(state: dict, key: str):
+    with state['lock']:
+        state['stats'][key] += 1
+    increment(f'sheet_cache.{key}')
+
+
+def _refresh_in_background(sheet_id: str, state: dict):
+    """
+    Kiểm tra/đồng bộ lại sheet ở một luồng nền nếu chưa có lượt nào đang chạy (single-flight).
+    Các phiên vẫn được trả dữ liệu hiện có trong lúc chờ.
+    """
+    if not state['sync_lock'].acquire(blocking=False):
+        return
+
+    def run():
+        try:
+            _revalidate(sheet_id, state)
+            _count(state, 'refreshes')
+        except Exception as e:
+            _count(state, 'refresh_errors')
+            print(f"Không thể đồng bộ nền sheet ID '{sheet_id}', tiếp tục dùng dữ liệu cũ: {e}")
+        finally:
+            state['sync_lock'].release()
+
+    threading.Thread(target=run, name=f"sheet-refresh-{sheet_id}", daemon=True).start()
+
+
+def _fold_or_reduce(reduced: dict, df: pd.DataFrame, old_len: int) -> dict:
+    """Gộp gia tăng các hàng df[old_len:] vào kết quả reduce cũ; reduce lại toàn bộ nếu không được."""
+    with timed('pipeline.fold', rows=len(df) - old_len) as span:
+        folded = fold_task_log(reduced, df.iloc[old_len:]) if reduced is not None else None
+        span['folded'] = folded is not None
+    return folded if folded is not None else reduce_task_log(df)
+
+
+def _current_view(state: dict) -> dict:
+    """
+    Dữ liệu đã xác nhận cộng các hàng pending: {'raw', 'history', 'latest', 'version', 'epoch',
+    'confirmed_rows'}. Gọi khi đang giữ state['lock'].
+    """
+    if state['view'] is None:
+        # Cùng epoch, confirmed_rows hàng đầu của raw không bao giờ đổi giữa các phiên bản
+        lineage = {'version': state['version'], 'epoch': state['epoch'], 'confirmed_rows': len(state['df'])}
+        if not state['pending']:
+            state['view'] = {'raw': state['df'], **state['reduced'], **lineage}
+        else:
+            pending_df = _rows_to_dataframe(state['headers'], [p['row'] for p in state['pending']])
+            raw = concat_task_frames([state['df'], pending_df])
+            state['view'] = {'raw': raw, **_fold_or_reduce(state['reduced'], raw, len(state['df'])), **lineage}
+    return state['view']
+
+
+def _write_through(sheet_id: str, headers: list, row: list, write_id: str):
+    """
+    Áp dụng hàng vừa đưa vào hàng đợi ghi vào dữ liệu đã cache của đúng sheet đó:
+    hàng được hiển thị ngay (lạc quan) và sheet được đánh dấu dirty cho tới khi
+    hàng đợi ghi xong và dữ liệu được xác nhận lại ở nền.
+    Header và cache của các sheet/hàm khác được giữ nguyên.
+    """
+    state = _get_sheet_sync_state(sheet_id)
+    with state['lock']:
+        if state['df'] is None or state['headers'] != headers:
+            # Chưa có dữ liệu khớp schema để ghép vào: lần đọc kế tiếp sẽ đồng bộ lại
+            state['synced_ts'] = 0.0
+            return
+        state['pending'].append({'write_id': write_id, 'row': row})
+        state['dirty'] = True
+        _bump_version(state)
+
+
+def _confirm_writes(sheet_id: str):
+    """
+    Được hàng đợi ghi gọi (ở luồng nền) sau mỗi lần ghi của sheet:
+    đọc delta để xác nhận các hàng pending đã nằm trên sheet.
+    """
+    state = _get_sheet_sync_state(sheet_id)
+    try:
+        with state['sync_lock']:
+            if state['dirty']:
+                _sync_state(sheet_id, state)
+    except Exception as e:
+        # Hàng pending vẫn được hiển thị; lần đồng bộ theo TTL sau sẽ thử lại
+        print(f"Không thể xác nhận dữ liệu vừa ghi vào sheet ID '{sheet_id}': {e}")
+
+
+def _find_written_rows(sheet_id: str, rows: list) -> set:
+    """
+    Được hàng đợi ghi gọi (ở luồng nền) trước khi ghi lại các hàng nạp từ journal hoặc sau một
+    lần ghi lỗi: đồng bộ dữ liệu của sheet rồi trả về vị trí các hàng trong rows đã có trên sheet,
+    so theo cặp task_id + add_time. Không so được (thiếu cột, header đã đổi) thì trả về tập rỗng.
+    """
+    state = _get_sheet_sync_state(sheet_id)
+    with state['sync_lock']:
+        _sync_state(sheet_id, state)
+    with state['lock']:
+        df, headers = state['df'], state['headers']
+    key_columns = ['task_id', 'add_time']
+    if df is None or df.empty or not set(key_columns) <= set(headers) or any(len(row) != len(headers) for row in rows):
+        return set()
+    candidates = _rows_to_dataframe(headers, rows)
+    if len(candidates) != len(rows):
+        return set()
+    on_sheet = pd.MultiIndex.from_frame(df[key_columns])
+    found = pd.MultiIndex.from_frame(candidates[key_columns]).isin(on_sheet)
+    return set(np.flatnonzero(found).tolist())
+
+
+def refresh_sheet_data(sheet_id: str):
+    """
+    Đánh dấu dữ liệu của sheet đã hết hạn: lần đọc kế tiếp chờ kiểm tra lại sheet
+    (chỉ đọc delta/tải lại nếu sheet thực sự thay đổi).
+    """
+    state = _get_sheet_sync_state(sheet_id)
+    with state['lock']:
+        state['synced_ts'] = 0.0
+
+
+def _get_offline_view(sheet_id: str) -> dict:
+    """
+    Lấy bản dữ liệu gần nhất (trong bộ nhớ hoặc snapshot trên đĩa) khi không
+    đọc được sheet. DataFrame 'raw' trả về được đánh dấu chỉ đọc qua df.attrs.
+    """
+    state = _get_sheet_sync_state(sheet_id)
+    with state['lock']:
+        if state['df'] is None:
+            return _empty_view()
+        view = dict(_current_view(state))
+        synced_at = state['synced_at']
+    view['raw'] = view['raw'].copy()
+    view['raw'].attrs['read_only'] = True
+    view['raw'].attrs['synced_at'] = synced_at
+    return view
+
+
+def _empty_view() -> dict:
+    return {'raw': pd.DataFrame(), 'history': pd.DataFrame(), 'latest': pd.DataFrame(),
+            'version': 0, 'epoch': -1, 'confirmed_rows': 0}
+
+
+def get_task_log(sheet_id: str) -> dict:
+    """
+    Lấy log task của sheet cùng các kết quả đã gộp, nhất quán với nhau:
+    - 'raw': log gốc (giống get_data_from_sheet).
+    - 'history': log đã backfill; 'latest': trạng thái mới nhất của mỗi task (xem reduce_task_log).
+    - 'version': số phiên bản dữ liệu của sheet (xem get_data_version), dùng làm khóa memo.
+    - 'epoch', 'confirmed_rows': giữa hai phiên bản cùng epoch, confirmed_rows hàng đầu (của phiên bản cũ)
+      không đổi, nên nơi gọi có thể cập nhật gia tăng theo các hàng phía sau.
+
+    Dữ liệu được giữ trong bộ nhớ dùng chung cho mọi phiên. Sau SHEET_PROBE_INTERVAL giây,
+    một lượt kiểm tra rẻ (_probe_changed) xác định sheet có thay đổi không; chỉ khi có mới
+    đồng bộ. Sheet là log chỉ-thêm, nên mỗi lần đồng bộ chỉ đọc các hàng mới (delta) và chỉ
+    gộp các hàng đó vào history/latest; chỉ tải lại toàn bộ khi phát hiện các hàng cũ bị sửa hoặc xóa.
+    Trong lúc kiểm tra, dữ liệu hiện có vẫn được trả ngay và việc kiểm tra chạy ở nền
+    (stale-while-revalidate); chỉ khi chưa có dữ liệu hoặc dữ liệu chưa được kiểm tra quá
+    SHEET_DATA_MAX_STALENESS giây thì lượt đọc mới phải chờ. Mọi lượt kiểm tra/đồng bộ đồng thời
+    của cùng một sheet được gộp làm một (single-flight).
+    Sau khi log được nén (compact_task_log), lần tải lại toàn bộ chỉ đọc worksheet snapshot
+    cùng các hàng ghi sau lần nén, thay vì toàn bộ lịch sử chỉnh sửa.
+    Nếu không kết nối được sheet, trả về snapshot cục bộ ở chế độ chỉ đọc
+    (view['raw'].attrs['read_only'] == True).
+
+    Các DataFrame trả về được chia sẻ giữa các phiên, nơi gọi không được sửa trực tiếp.
+    """
+    if not sheet_id:
+        st.error("Sheet ID không được cung cấp.")
+        return _empty_view()
+    state = _get_sheet_sync_state(sheet_id)
+    try:
+        # Thời gian phiên phải chờ dữ liệu (gồm cả chờ đọc API khi cache hết hạn)
+        with timed('sheets.get_task_log', sheet=sheet_id) as span:
+            age = _data_age(state)
+            if state['df'] is not None and age <= SHEET_PROBE_INTERVAL:
+                span['outcome'] = 'hits'
+            elif state['df'] is not None and age <= SHEET_DATA_MAX_STALENESS:
+                span['outcome'] = 'stale_hits'
+                _refresh_in_background(sheet_id, state)
+            else:
+                with state['sync_lock']:
+                    # Một phiên khác có thể vừa đồng bộ xong trong lúc chờ: dùng luôn kết quả đó
+                    if state['df'] is None or _data_age(state) > SHEET_DATA_MAX_STALENESS:
+                        span['outcome'] = 'misses'
+                        _revalidate(sheet_id, state)
+                    else:
+                        span['outcome'] = 'coalesced'
+            _count(state, span['outcome'])
+            with state['lock']:
+                return dict(_current_view(state))
+    except gspread.exceptions.WorksheetNotFound:
+        invalidate_worksheet(sheet_id)
+        st.error(f"Lỗi: Không tìm thấy trang tính (worksheet) có tên '{TASK_SHEET_NAME}'.")
+        return _empty_view()
+    except Exception as e:
+        offline_view = _get_offline_view(sheet_id)
+        if offline_view['raw'].empty:
+            st.error(f"Lỗi không xác định khi lấy dữ liệu từ sheet ID '{sheet_id}': {e}")
+        else:
+            print(f"Không đọc được sheet ID '{sheet_id}', dùng snapshot cục bộ: {e}")
+        return offline_view
+
+
+def get_sheet_cache_stats(sheet_id: str) -> dict:
+    """
+    Bộ đếm của cache dữ liệu một sheet: hits (còn hạn), stale_hits (trả dữ liệu cũ, kiểm tra nền),
+    misses (phải chờ), coalesced (chờ lượt đồng bộ của phiên khác), refreshes/refresh_errors
+    (kiểm tra nền), probes/probe_changes (số lượt kiểm tra và số lượt thấy sheet thay đổi),
+    cùng tuổi dữ liệu (giây), phiên bản dữ liệu và việc có lượt đồng bộ đang chạy hay không.
+    """
+    state = _get_sheet_sync_state(sheet_id)
+    with state['lock']:
+        stats = dict(state['stats'])
+        stats['age_seconds'] = round(_data_age(state), 1) if state['synced_ts'] else None
+        stats['synced_at'] = state['synced_at']
+        stats['version'] = state['version']
+    stats['refreshing'] = state['sync_lock'].locked()
+    return stats
+
+
+def get_data_version(sheet_id: str) -> int:
+    """
+    Số phiên bản dữ liệu của sheet trong tiến trình này: tăng mỗi khi dữ liệu trả về bởi
+    get_task_log thay đổi, giữ nguyên khi lượt kiểm tra thấy sheet không đổi.
+    """
+    state = _get_sheet_sync_state(sheet_id)
+    with state['lock']:
+        return state['version']
+
+
+def get_data_from_sheet(sheet_id: str):
+    """
+    Lấy dữ liệu từ sheet được chỉ định và trả về dưới dạng DataFrame (log gốc).
+    Xem get_task_log về cơ chế cache/đồng bộ và chế độ chỉ đọc.
+    """
+    return get_task_log(sheet_id)['raw']
+
+
+def _open_or_add_worksheet(sheet_id: str, worksheet_name: str, headers: list):
+    """Mở worksheet (handle mới nhất); nếu chưa có thì tạo mới với hàng header."""
+    try:
+        return get_worksheet(sheet_id, worksheet_name, refresh=True)
+    except gspread.exceptions.WorksheetNotFound:
+        _track_api_call('open_by_key')
+        spreadsheet = connect_to_google_sheet().open_by_key(sheet_id)
+        _track_api_call('add_worksheet')
+        worksheet = spreadsheet.add_worksheet(title=worksheet_name, rows=1, cols=len(headers))
+        _track_api_call('update', bytes_written=_payload_bytes([headers]))
+        worksheet.update(values=[headers], range_name='A1')
+        return worksheet
+
+
+def _compact_log(sheet_id: str) -> dict:
+    """
+    Thực hiện một lượt nén (xem compact_task_log), theo thứ tự để dừng ở bước nào dữ liệu đọc về cũng đúng:
+    1. Nối các phiên bản bị thay thế vào worksheet lưu trữ (bộ nạp không đọc worksheet này).
+    2. Ghi đè worksheet snapshot bằng trạng thái mới nhất kèm mốc nén, trong một lệnh gọi API;
+       từ đây bộ nạp bỏ qua phần đầu log đã nằm trong snapshot.
+    3. Kiểm tra lại các hàng cuối của phần đã nén rồi xóa phần đó khỏi đầu log. Hàng mới chỉ được
+       nối vào cuối log nên các lượt ghi đồng thời không bị ảnh hưởng.
+    Một lần nén dở dang trước đó được hoàn tất trong lượt này.
+    """
+    worksheet = get_worksheet(sheet_id, refresh=True)
+    values = _read_values(worksheet, [f"A1:{_col_letter(worksheet.col_count)}"])[0]
+    headers = list(values[0]) if values else []
+    rows = _pad_rows(values[1:], len(headers))
+    snapshot_rows, marker = _read_log_snapshot(sheet_id, headers)
+    summary = {'tasks': len(snapshot_rows), 'archived': 0, 'removed': 0}
+    if not rows:
+        return summary
+
+    skip = _compacted_prefix(rows, marker)
+    if skip < len(rows):
+        candidates = [row for row in snapshot_rows + rows[skip:] if any(value != '' for value in row)]
+        latest = reduce_task_log(_rows_to_dataframe(headers, candidates))['latest']
+        if latest.empty:
+            return summary
+        # Snapshot theo thứ tự thời gian để log snapshot + phần đuôi vẫn tăng dần (không phải sắp xếp khi nạp)
+        latest = latest.iloc[np.argsort(task_order_key(latest).to_numpy(dtype=str), kind='stable')]
+        kept = set(latest.index)
+        archived = [row for i, row in enumerate(candidates) if i not in kept]
+        fp_count = min(DELTA_FINGERPRINT_ROWS, len(rows))
+        marker = {'rows': len(rows), 'tail_hash': _fingerprint(rows[len(rows) - fp_count:])}
+
+        if archived:
+            archive_ws = _open_or_add_worksheet(sheet_id, TASK_ARCHIVE_SHEET_NAME, headers)
+            _track_api_call('row_values')
+            archive_headers = archive_ws.row_values(1) or headers
+            _track_api_call('append_rows', bytes_written=_payload_bytes(archived))
+            archive_ws.append_rows(_align_rows(archived, headers, archive_headers), value_input_option='USER_ENTERED')
+
+        snapshot_headers = headers + [_COMPACTION_MARKER_COLUMN]
+        table = [snapshot_headers] + [
+            [format_task_value(header, value) for header, value in zip(headers, row)] + ['']
+            for row in latest[headers].itertuples(index=False, name=None)
+        ]
+        table[1][-1] = json.dumps(marker)
+        snapshot_ws = _open_or_add_worksheet(sheet_id, TASK_SNAPSHOT_SHEET_NAME, snapshot_headers)
+        if snapshot_ws.row_count < len(table) or snapshot_ws.col_count < len(snapshot_headers):
+            _track_api_call('resize')
+            snapshot_ws.resize(rows=max(snapshot_ws.row_count, len(table)), cols=max(snapshot_ws.col_count, len(snapshot_headers)))
+        _track_api_call('update', bytes_written=_payload_bytes(table))
+        snapshot_ws.update(values=table, range_name='A1', value_input_option='USER_ENTERED')
+        # Bỏ các hàng/cột thừa của snapshot cũ (chỉ sau khi snapshot mới đã được ghi)
+        _track_api_call('resize')
+        snapshot_ws.resize(rows=len(table), cols=len(snapshot_headers))
+        summary = {'tasks': len(table) - 1, 'archived': len(archived), 'removed': 0}
+
+    count = marker['rows']
+    fp_count = min(DELTA_FINGERPRINT_ROWS, count)
+    check = _read_values(worksheet, [f"A{count - fp_count + 2}:{_col_letter(len(headers))}{count + 1}"])[0]
+    check = _pad_rows(list(check) + [[]] * (fp_count - len(check)), len(headers))
+    if _fingerprint(check) != marker['tail_hash']:
+        raise RuntimeError("Phần đầu log đã thay đổi trong lúc nén, chưa xóa hàng nào khỏi log.")
+    _track_api_call('delete_rows')
+    worksheet.delete_rows(2, count + 1)
+    summary['removed'] = count
+    return summary
+
+
+def compact_task_log(sheet_id: str):
+    """
+    Nén log task: ghi trạng thái mới nhất của mỗi task vào worksheet TASK_SNAPSHOT_SHEET_NAME,
+    chuyển các phiên bản cũ bị thay thế sang worksheet TASK_ARCHIVE_SHEET_NAME (tra cứu qua
+    get_task_archive) và xóa phần log đã nén. Sau đó việc đọc/gộp log chỉ tỉ lệ với số task
+    cộng số hàng ghi sau lần nén, không còn tỉ lệ với tổng số lần chỉnh sửa.
+
+    An toàn với các lượt ghi đồng thời (add_row_from_dict chỉ nối hàng vào cuối log): chỉ phần
+    đầu log đã đọc được xóa. Trả về {'tasks', 'archived', 'removed'}, hoặc None nếu có lỗi.
+    """
+    state = _get_sheet_sync_state(sheet_id)
+    try:
+        with state['sync_lock'], timed('sheets.compact', sheet=sheet_id):
+            summary = _compact_log(sheet_id)
+            # Nạp lại snapshot + phần log còn lại ngay, để lượt đọc kế tiếp không phải chờ
+            _sync_state(sheet_id, state)
+        return summary
+    except Exception as e:
+        st.error(f"Lỗi khi nén log của sheet ID '{sheet_id}': {e}")
+        return None
+
+
+@st.cache_resource
+def _get_archive_cache() -> dict:
+    """Worksheet lưu trữ đã đọc của mỗi sheet, kèm epoch của dữ liệu lúc đọc."""
+    return {'lock': threading.Lock(), 'archives': {}}
+
+
+def get_task_archive(sheet_id: str) -> dict:
+    """
+    Các phiên bản cũ đã được compact_task_log chuyển sang worksheet lưu trữ, cùng dạng với
+    get_task_log: {'history', 'offsets'} (dùng được với get_task_timeline). Chỉ đọc khi cần
+    (ví dụ khi xem lịch sử một task) và đọc lại sau mỗi lần dữ liệu được tải lại toàn bộ (epoch mới),
+    như sau một lần nén.
+    """
+    state = _get_sheet_sync_state(sheet_id)
+    with state['lock']:
+        epoch = state['epoch']
+    cache = _get_archive_cache()
+    with cache['lock']:
+        entry = cache['archives'].get(sheet_id)
+    if entry is not None and entry['epoch'] == epoch:
+        return entry['archive']
+
+    try:
+        worksheet = get_worksheet(sheet_id, TASK_ARCHIVE_SHEET_NAME)
+        values = _read_values(worksheet, [f"A1:{_col_letter(worksheet.col_count)}"])[0]
+    except gspread.exceptions.WorksheetNotFound:
+        values = []
+    except Exception as e:
+        print(f"Không đọc được worksheet lưu trữ của sheet ID '{sheet_id}': {e}")
+        return {'history': pd.DataFrame(), 'offsets': {}}
+    headers = list(values[0]) if values else []
+    history = _rows_to_dataframe(headers, _pad_rows(values[1:], len(headers)))
+    offsets = history.groupby('task_name', sort=False).indices if 'task_name' in history.columns else {}
+    archive = {'history': history, 'offsets': offsets}
+    with cache['lock']:
+        cache['archives'][sheet_id] = {'epoch': epoch, 'archive': archive}
+    return archive
+
+
+configure_write_queue(append_rows=_append_rows, on_flush=_confirm_writes, find_written=_find_written_rows)
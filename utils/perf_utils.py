@@ -0,0 +1,164 @@
+# utils/perf_utils.py
+import bisect
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from datetime import datetime
+from utils.config import PERF_LATENCY_BUCKETS, PERF_EVENT_BUFFER, PERF_MAX_SESSIONS, PERF_LOGGER_NAME
+
+# Mỗi span còn được ghi thành một dòng JSON qua logger này (mức INFO) nếu logger được bật
+_logger = logging.getLogger(PERF_LOGGER_NAME)
+
+
+def _empty_metrics() -> dict:
+    return {
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'started_ts': time.monotonic(),
+        'spans': {},                                # tên span -> histogram độ trễ
+        'counters': {},                             # tên bộ đếm -> giá trị
+        'sessions': OrderedDict(),                  # session_id -> histogram độ trễ rerun của phiên
+        'events': deque(maxlen=PERF_EVENT_BUFFER),  # các span gần nhất (bản ghi có cấu trúc)
+    }
+
+
+# Số liệu dùng chung cho mọi phiên của tiến trình; không phụ thuộc Streamlit để đo được cả
+# các luồng nền (đồng bộ sheet, hàng đợi ghi) và các benchmark
+_metrics = {'lock': threading.Lock(), **_empty_metrics()}
+
+
+def _new_histogram() -> dict:
+    return {'count': 0, 'total': 0.0, 'max': 0.0, 'buckets': [0] * (len(PERF_LATENCY_BUCKETS) + 1)}
+
+
+def _observe(histogram: dict, seconds: float):
+    histogram['count'] += 1
+    histogram['total'] += seconds
+    histogram['max'] = max(histogram['max'], seconds)
+    histogram['buckets'][bisect.bisect_left(PERF_LATENCY_BUCKETS, seconds)] += 1
+
+
+def _quantile(histogram: dict, q: float) -> float:
+    """Ước lượng phân vị q từ histogram: cận trên của bucket chứa phân vị (không vượt quá max)."""
+    rank = q * histogram['count']
+    seen = 0
+    for bound, n in zip(PERF_LATENCY_BUCKETS + [histogram['max']], histogram['buckets']):
+        seen += n
+        if n and seen >= rank:
+            return min(bound, histogram['max'])
+    return histogram['max']
+
+
+def _summarize(histogram: dict) -> dict:
+    count = histogram['count']
+    return {
+        'count': count,
+        'mean': histogram['total'] / count if count else 0.0,
+        'p50': _quantile(histogram, 0.5),
+        'p95': _quantile(histogram, 0.95),
+        'p99': _quantile(histogram, 0.99),
+        'max': histogram['max'],
+        'total': histogram['total'],
+    }
+
+
+def record_span(name: str, seconds: float, **fields):
+    """Ghi nhận một khoảng thời gian đã đo: cập nhật histogram của span và lưu bản ghi có cấu trúc."""
+    event = {'ts': datetime.now().isoformat(timespec='milliseconds'), 'type': 'span', 'name': name,
+             'seconds': round(seconds, 6), **fields}
+    with _metrics['lock']:
+        _observe(_metrics['spans'].setdefault(name, _new_histogram()), seconds)
+        _metrics['events'].append(event)
+    if _logger.isEnabledFor(logging.INFO):
+        _logger.info(json.dumps(event, ensure_ascii=False, default=str))
+
+
+@contextmanager
+def timed(name: str, **fields):
+    """
+    Đo thời gian một khối lệnh như một span:
+
+        with timed('sheets.sync', sheet=sheet_id) as span:
+            ...
+            span['mode'] = 'delta'   # thêm thông tin vào bản ghi của span
+
+    Nếu khối lệnh ném lỗi, span vẫn được ghi kèm tên lỗi.
+    """
+    start = time.perf_counter()
+    try:
+        yield fields
+    except BaseException as e:
+        fields['error'] = type(e).__name__
+        raise
+    finally:
+        record_span(name, time.perf_counter() - start, **fields)
+
+
+def increment(name: str, value: int = 1):
+    """Cộng value vào bộ đếm name (số lệnh gọi API, cache hit/miss, số byte,...)."""
+    with _metrics['lock']:
+        _metrics['counters'][name] = _metrics['counters'].get(name, 0) + value
+
+
+def record_rerun(session_id: str, seconds: float, **fields):
+    """
+    Ghi nhận thời gian một lượt rerun trang của một phiên: span 'rerun' chung và histogram
+    riêng của phiên (giữ PERF_MAX_SESSIONS phiên gần nhất).
+    """
+    record_span('rerun', seconds, session=session_id, **fields)
+    with _metrics['lock']:
+        sessions = _metrics['sessions']
+        session = sessions.get(session_id)
+        if session is None:
+            session = sessions[session_id] = {'histogram': _new_histogram()}
+        sessions.move_to_end(session_id)
+        session.update(fields, last_seen=datetime.now().isoformat(timespec='seconds'))
+        _observe(session['histogram'], seconds)
+        while len(sessions) > PERF_MAX_SESSIONS:
+            sessions.popitem(last=False)
+
+
+def get_perf_report() -> dict:
+    """
+    Số liệu hiệu năng của tiến trình từ lần khởi động (hoặc reset) gần nhất:
+    - 'spans': {tên: {'count', 'mean', 'p50', 'p95', 'p99', 'max', 'total'}} (giây; phân vị ước lượng từ histogram).
+    - 'counters': {tên: giá trị}.
+    - 'sessions': độ trễ rerun của từng phiên, phiên hoạt động gần nhất trước.
+    """
+    with _metrics['lock']:
+        spans = {name: _summarize(histogram) for name, histogram in sorted(_metrics['spans'].items())}
+        counters = dict(sorted(_metrics['counters'].items()))
+        sessions = [
+            {'session': session_id, **{k: v for k, v in session.items() if k != 'histogram'},
+             **_summarize(session['histogram'])}
+            for session_id, session in reversed(_metrics['sessions'].items())
+        ]
+        started_at, uptime = _metrics['started_at'], time.monotonic() - _metrics['started_ts']
+    return {'started_at': started_at, 'uptime_seconds': uptime, 'spans': spans, 'counters': counters,
+            'sessions': sessions}
+
+
+def get_recent_spans(limit: int = None) -> list:
+    """Các bản ghi span gần nhất (cũ trước), tối đa limit bản ghi."""
+    with _metrics['lock']:
+        events = list(_metrics['events'])
+    return events[-limit:] if limit else events
+
+
+def export_perf_log() -> str:
+    """
+    Xuất số liệu dạng log có cấu trúc (JSON Lines): mỗi span gần nhất một dòng,
+    cuối cùng là một dòng 'summary' chứa get_perf_report().
+    """
+    summary = {'ts': datetime.now().isoformat(timespec='milliseconds'), 'type': 'summary', **get_perf_report()}
+    lines = [json.dumps(event, ensure_ascii=False, default=str) for event in get_recent_spans()]
+    lines.append(json.dumps(summary, ensure_ascii=False, default=str))
+    return '\n'.join(lines) + '\n'
+
+
+def reset_perf_metrics():
+    """Xóa toàn bộ số liệu đã thu thập và bắt đầu đo lại từ đầu."""
+    with _metrics['lock']:
+        _metrics.update(_empty_metrics())
@@ -11,6 +11,8 @@ PERMISSIONS = {
     'view_all_tasks': ['admin'],
     'add_new_task': ['admin',],
     'edit_own_task': ['admin', 'manager', 'employee'],
+    'bulk_edit_tasks': ['admin'],
+    'compact_task_log': ['admin'],
     'delete_task': ['admin'],
     'search_task': ['admin', 'manager', 'employee'],
     'process_deadline_tasks': ['admin', 'manager', 'employee'],
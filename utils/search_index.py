@@ -0,0 +1,173 @@
+# utils/search_index.py
+import bisect
+import re
+import threading
+import unicodedata
+import pandas as pd
+from utils.perf_utils import timed
+
+# Các cột được đánh chỉ mục và trọng số khi xếp hạng kết quả
+SEARCH_COLUMN_WEIGHTS = {
+    'task_name': 3.0,
+    'task_po': 2.0,
+    'task_status': 1.5,
+    'task_des': 1.0,
+}
+# Khớp theo tiền tố (đang gõ dở) được tính điểm thấp hơn khớp nguyên từ
+_PREFIX_FACTOR = 0.5
+_TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def fold_accents(text: str) -> str:
+    """Bỏ dấu tiếng Việt và chuyển về chữ thường: 'Đã hoàn thành' -> 'da hoan thanh'."""
+    decomposed = unicodedata.normalize('NFD', str(text).lower().replace('đ', 'd'))
+    return ''.join(ch for ch in decomposed if unicodedata.category(ch) != 'Mn')
+
+
+def tokenize(text) -> list:
+    """Tách văn bản (đã bỏ dấu) thành các từ."""
+    if text is None or (not isinstance(text, str) and pd.isna(text)):
+        return []
+    return _TOKEN_PATTERN.findall(fold_accents(text))
+
+
+def build_search_index(df: pd.DataFrame) -> dict:
+    """
+    Dựng chỉ mục đảo (từ -> các hàng) cho từng cột trong SEARCH_COLUMN_WEIGHTS.
+    Mỗi cột có một danh sách từ đã sắp xếp để tra tiền tố bằng tìm nhị phân.
+    """
+    columns = [col for col in SEARCH_COLUMN_WEIGHTS if col in df.columns]
+    index = {
+        'columns': columns,
+        'postings': {col: {} for col in columns},   # col -> token -> set(label)
+        'vocab': {col: [] for col in columns},      # col -> danh sách token đã sắp xếp
+        'doc_tokens': {},                           # label -> {col: set(token)} để gỡ khi cập nhật
+        'source': df,                               # DataFrame đã được đánh chỉ mục
+    }
+    _add_rows(index, df)
+    return index
+
+
+def _add_rows(index: dict, df: pd.DataFrame):
+    for col in index['columns']:
+        postings, vocab = index['postings'][col], index['vocab'][col]
+        new_tokens = set()
+        for label, value in df[col].items():
+            tokens = set(tokenize(value))
+            index['doc_tokens'].setdefault(label, {})[col] = tokens
+            for token in tokens:
+                labels = postings.get(token)
+                if labels is None:
+                    postings[token] = labels = set()
+                    new_tokens.add(token)
+                labels.add(label)
+        if new_tokens:
+            vocab.extend(new_tokens)
+            vocab.sort()
+
+
+def _remove_rows(index: dict, labels):
+    for label in labels:
+        for col, tokens in index['doc_tokens'].pop(label, {}).items():
+            postings, vocab = index['postings'][col], index['vocab'][col]
+            for token in tokens:
+                token_labels = postings.get(token)
+                if token_labels is None:
+                    continue
+                token_labels.discard(label)
+                if not token_labels:
+                    del postings[token]
+                    del vocab[bisect.bisect_left(vocab, token)]
+
+
+def update_search_index(index: dict, df: pd.DataFrame):
+    """
+    Cập nhật chỉ mục theo phiên bản dữ liệu mới: chỉ đánh chỉ mục các hàng mới xuất hiện
+    hoặc có nội dung thay đổi, và gỡ các hàng không còn (ví dụ trạng thái cũ của task
+    vừa được cập nhật), không xử lý lại toàn bộ.
+    """
+    old = index['source']
+    columns = index['columns']
+    kept = old.index.intersection(df.index)
+    old_kept = old.loc[kept, columns].astype(object)
+    new_kept = df.loc[kept, columns].astype(object)
+    same = (old_kept == new_kept) | (old_kept.isna() & new_kept.isna())
+    changed = kept[~same.all(axis=1).to_numpy()]
+
+    _remove_rows(index, old.index.difference(df.index).append(changed))
+    _add_rows(index, df.loc[df.index.difference(old.index).append(changed)])
+    index['source'] = df
+
+
+def _matching_labels(index: dict, col: str, term: str) -> dict:
+    """Các hàng có từ khớp term trong cột col: {label: điểm} (khớp nguyên từ > khớp tiền tố)."""
+    postings, vocab = index['postings'][col], index['vocab'][col]
+    weight = SEARCH_COLUMN_WEIGHTS[col]
+    scores = {}
+    start = bisect.bisect_left(vocab, term)
+    for token in vocab[start:]:
+        if not token.startswith(term):
+            break
+        score = weight if token == term else weight * _PREFIX_FACTOR
+        for label in postings[token]:
+            if score > scores.get(label, 0):
+                scores[label] = score
+    return scores
+
+
+def query_search_index(index: dict, query: str, columns=None) -> list:
+    """
+    Tìm các hàng chứa tất cả các từ trong query (không phân biệt dấu, từ cuối hay từ
+    đang gõ dở đều khớp theo tiền tố) trong các cột được chọn (mặc định: mọi cột).
+    Trả về danh sách label đã xếp hạng theo điểm giảm dần.
+    """
+    terms = tokenize(query)
+    columns = [col for col in (columns or index['columns']) if col in index['columns']]
+    if not terms or not columns:
+        return []
+
+    totals = None
+    for term in terms:
+        term_scores = {}
+        for col in columns:
+            for label, score in _matching_labels(index, col, term).items():
+                if score > term_scores.get(label, 0):
+                    term_scores[label] = score
+        if totals is None:
+            totals = term_scores
+        else:
+            totals = {label: totals[label] + score for label, score in term_scores.items() if label in totals}
+        if not totals:
+            return []
+
+    # Điểm bằng nhau thì giữ thứ tự gốc của DataFrame
+    labels = list(totals)
+    positions = index['source'].index.get_indexer(labels)
+    ranked = sorted(range(len(labels)), key=lambda i: (-totals[labels[i]], positions[i]))
+    return [labels[i] for i in ranked]
+
+
+# Chỉ mục tìm kiếm dùng chung, cập nhật gia tăng khi DataFrame nguồn đổi phiên bản
+_search_index_memo = {'lock': threading.Lock(), 'source': None, 'index': None}
+
+
+def search_tasks(df: pd.DataFrame, query: str, columns=None) -> pd.DataFrame:
+    """
+    Tìm kiếm task trên nhiều cột bằng chỉ mục đảo dùng chung, trả về các hàng của df
+    theo thứ tự xếp hạng. Gõ không dấu vẫn khớp với dữ liệu có dấu.
+    """
+    if df.empty or not str(query).strip():
+        return df.iloc[0:0]
+    memo = _search_index_memo
+    with memo['lock']:
+        if memo['source'] is not df:
+            with timed('pipeline.search_index', rows=len(df)):
+                if memo['index'] is None or list(memo['index']['columns']) != [c for c in SEARCH_COLUMN_WEIGHTS if c in df.columns]:
+                    memo['index'] = build_search_index(df)
+                else:
+                    update_search_index(memo['index'], df)
+            memo['source'] = df
+        with timed('pipeline.search') as span:
+            labels = query_search_index(memo['index'], query, columns)
+            span['results'] = len(labels)
+    return df.loc[labels]
@@ -0,0 +1,234 @@
+# utils/sheets_client.py
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+import gspread
+from gspread.http_client import HTTPClient
+from requests.adapters import HTTPAdapter
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from utils.config import (
+    SHEETS_READ_REQUESTS_PER_MINUTE,
+    SHEETS_WRITE_REQUESTS_PER_MINUTE,
+    SHEETS_RATE_BURST,
+    SHEETS_MAX_CONCURRENT_REQUESTS,
+    SHEETS_QUEUE_TIMEOUT,
+)
+from utils.perf_utils import record_span, increment
+
+# Thứ tự cấp lượt gọi API (nhỏ hơn được cấp trước): ghi, đọc của phiên đang chờ giao diện,
+# rồi mới tới đọc nền (kiểm tra/đồng bộ nền, xác nhận hàng vừa ghi)
+PRIORITY_WRITE = 0
+PRIORITY_INTERACTIVE = 1
+PRIORITY_BACKGROUND = 2
+PRIORITY_NAMES = {PRIORITY_WRITE: 'write', PRIORITY_INTERACTIVE: 'interactive', PRIORITY_BACKGROUND: 'background'}
+# Giới hạn số phiên được nhớ thời điểm phục vụ gần nhất
+_MAX_TRACKED_SESSIONS = 1000
+_SESSION_IDLE_SECONDS = 600
+
+
+def _new_bucket(per_minute: int, burst: int) -> dict:
+    """
+    Token bucket cho một loại hạn mức. Tốc độ nạp được chọn để trong mọi cửa sổ 60 giây
+    số lệnh không vượt per_minute: burst + rate * 60 = per_minute.
+    """
+    burst = max(1, min(burst, per_minute // 2))
+    return {'capacity': burst, 'tokens': float(burst), 'rate': (per_minute - burst) / 60.0,
+            'updated': time.monotonic()}
+
+
+def _new_wait_stats() -> dict:
+    return {name: {'granted': 0, 'total_wait': 0.0, 'max_wait': 0.0} for name in PRIORITY_NAMES.values()}
+
+
+# Bộ giới hạn dùng chung cho mọi phiên và luồng nền của tiến trình (client gspread có thể được
+# tạo lại khi cache_resource hết hạn, còn hạn mức thì không)
+_limiter = {
+    'cond': threading.Condition(),
+    'buckets': {
+        'read': _new_bucket(SHEETS_READ_REQUESTS_PER_MINUTE, SHEETS_RATE_BURST),
+        'write': _new_bucket(SHEETS_WRITE_REQUESTS_PER_MINUTE, SHEETS_RATE_BURST),
+    },
+    'max_concurrent': SHEETS_MAX_CONCURRENT_REQUESTS,
+    'waiters': [],        # các lượt đang chờ: {'kind', 'priority', 'session', 'seq', 'granted'}
+    'in_flight': 0,       # số request đang chạy
+    'last_served': {},    # phiên -> thời điểm được cấp lượt gần nhất (để chia lượt công bằng)
+    'seq': itertools.count(),
+    'stats': {'waits': _new_wait_stats(), 'timeouts': 0, 'throttled': 0},
+}
+
+
+def configure_rate_limiter(read_per_minute: int = None, write_per_minute: int = None, burst: int = None,
+                           max_concurrent: int = None):
+    """
+    Đổi hạn mức của bộ giới hạn (ví dụ project được cấp quota cao hơn, hoặc khi kiểm thử tải).
+    Tham số None giữ giá trị trong config.
+    """
+    burst = SHEETS_RATE_BURST if burst is None else burst
+    with _limiter['cond']:
+        _limiter['buckets'] = {
+            'read': _new_bucket(read_per_minute or SHEETS_READ_REQUESTS_PER_MINUTE, burst),
+            'write': _new_bucket(write_per_minute or SHEETS_WRITE_REQUESTS_PER_MINUTE, burst),
+        }
+        _limiter['max_concurrent'] = max_concurrent or SHEETS_MAX_CONCURRENT_REQUESTS
+        _limiter['cond'].notify_all()
+
+
+def _request_origin(kind: str) -> tuple:
+    """
+    (mức ưu tiên, phiên) của request hiện tại: request trong luồng chạy script của một phiên
+    Streamlit là đọc của giao diện; luồng nền (không có ScriptRunContext) được tính theo tên luồng.
+    """
+    ctx = get_script_run_ctx(suppress_warning=True)
+    session = ctx.session_id if ctx is not None else threading.current_thread().name
+    if kind == 'write':
+        return PRIORITY_WRITE, session
+    return (PRIORITY_INTERACTIVE if ctx is not None else PRIORITY_BACKGROUND), session
+
+
+def _refill(now: float):
+    for bucket in _limiter['buckets'].values():
+        bucket['tokens'] = min(bucket['capacity'], bucket['tokens'] + (now - bucket['updated']) * bucket['rate'])
+        bucket['updated'] = now
+
+
+def _dispatch():
+    """
+    Cấp lượt cho các request đang chờ khi còn token của đúng loại hạn mức và còn chỗ trong pool:
+    ưu tiên nhỏ nhất trước, cùng mức thì phiên lâu chưa được phục vụ nhất (chia lượt công bằng
+    giữa các phiên), rồi theo thứ tự đến. Gọi khi đang giữ _limiter['cond'].
+    """
+    now = time.monotonic()
+    _refill(now)
+    granted = False
+    while _limiter['waiters'] and _limiter['in_flight'] < _limiter['max_concurrent']:
+        ready = [w for w in _limiter['waiters'] if _limiter['buckets'][w['kind']]['tokens'] >= 1]
+        if not ready:
+            break
+        waiter = min(ready, key=lambda w: (w['priority'], _limiter['last_served'].get(w['session'], 0.0), w['seq']))
+        _limiter['waiters'].remove(waiter)
+        _limiter['buckets'][waiter['kind']]['tokens'] -= 1
+        _limiter['in_flight'] += 1
+        _limiter['last_served'][waiter['session']] = now
+        waiter['granted'] = True
+        granted = True
+    if granted:
+        _limiter['cond'].notify_all()
+    if len(_limiter['last_served']) > _MAX_TRACKED_SESSIONS:
+        # Bỏ các phiên lâu không gọi API (phiên đã đóng, luồng nền đã kết thúc)
+        _limiter['last_served'] = {s: t for s, t in _limiter['last_served'].items() if now - t < _SESSION_IDLE_SECONDS}
+
+
+def _next_token_wait() -> float:
+    """Số giây tới khi loại hạn mức đang có request chờ được nạp thêm một token."""
+    kinds = {w['kind'] for w in _limiter['waiters']}
+    waits = [(1 - bucket['tokens']) / bucket['rate'] for kind, bucket in _limiter['buckets'].items()
+             if kind in kinds and bucket['tokens'] < 1 and bucket['rate'] > 0]
+    return max(min(waits), 0.001) if waits else None
+
+
+@contextmanager
+def sheets_request_slot(kind: str):
+    """
+    Chờ tới lượt gọi một request Google Sheets API loại kind ('read' hoặc 'write') theo bộ giới hạn
+    dùng chung, và giữ một chỗ trong pool trong lúc request chạy. Ném ConnectionError nếu chờ quá
+    SHEETS_QUEUE_TIMEOUT giây. Thời gian chờ được ghi vào span 'sheets.queue_wait.<mức ưu tiên>'.
+    """
+    priority, session = _request_origin(kind)
+    waiter = {'kind': kind, 'priority': priority, 'session': session, 'seq': next(_limiter['seq']), 'granted': False}
+    name = PRIORITY_NAMES[priority]
+    start = time.monotonic()
+    with _limiter['cond']:
+        _limiter['waiters'].append(waiter)
+        _dispatch()
+        while not waiter['granted']:
+            remaining = start + SHEETS_QUEUE_TIMEOUT - time.monotonic()
+            if remaining <= 0:
+                _limiter['waiters'].remove(waiter)
+                _limiter['stats']['timeouts'] += 1
+                break
+            next_token = _next_token_wait()
+            _limiter['cond'].wait(timeout=remaining if next_token is None else min(remaining, next_token))
+            _dispatch()
+        waited = time.monotonic() - start
+        if waiter['granted']:
+            stats = _limiter['stats']['waits'][name]
+            stats['granted'] += 1
+            stats['total_wait'] += waited
+            stats['max_wait'] = max(stats['max_wait'], waited)
+    if not waiter['granted']:
+        increment('sheets.limiter.timeouts')
+        raise ConnectionError(f"Quá {SHEETS_QUEUE_TIMEOUT:g} giây chưa tới lượt gọi Google Sheets API (giới hạn quota).")
+    record_span(f'sheets.queue_wait.{name}', waited, kind=kind)
+    try:
+        yield
+    finally:
+        with _limiter['cond']:
+            _limiter['in_flight'] -= 1
+            _dispatch()
+
+
+def note_throttled(kind: str):
+    """
+    API vẫn trả 429 (ví dụ tiến trình khác dùng chung quota): bỏ các token còn lại của loại
+    hạn mức đó để các request sau chờ theo tốc độ nạp.
+    """
+    with _limiter['cond']:
+        _limiter['buckets'][kind]['tokens'] = min(_limiter['buckets'][kind]['tokens'], 0.0)
+        _limiter['stats']['throttled'] += 1
+    increment('sheets.limiter.throttled')
+
+
+def call_with_rate_limit(kind: str, fn, *args, **kwargs):
+    """Gọi fn (một request Google Sheets API loại kind) khi tới lượt theo bộ giới hạn dùng chung."""
+    with sheets_request_slot(kind):
+        try:
+            return fn(*args, **kwargs)
+        except gspread.exceptions.APIError as e:
+            if e.code == 429:
+                note_throttled(kind)
+            raise
+
+
+class RateLimitedHTTPClient(HTTPClient):
+    """
+    HTTPClient của gspread dùng chung được cho mọi luồng: mọi request đi qua bộ giới hạn tốc độ
+    của tiến trình (GET là lệnh đọc, còn lại là lệnh ghi), trên một pool kết nối keep-alive đủ
+    cho số request đồng thời tối đa (mặc định requests chỉ giữ 10 kết nối mỗi host).
+    """
+
+    def __init__(self, auth, session=None):
+        super().__init__(auth, session)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=SHEETS_MAX_CONCURRENT_REQUESTS)
+        self.session.mount('https://', adapter)
+
+    def request(self, method: str, endpoint: str, *args, **kwargs):
+        kind = 'read' if method.upper() == 'GET' else 'write'
+        return call_with_rate_limit(kind, super().request, method, endpoint, *args, **kwargs)
+
+
+def get_rate_limiter_stats() -> dict:
+    """
+    Trạng thái bộ giới hạn: số request đang chờ theo mức ưu tiên, đang chạy, token còn lại
+    của mỗi loại hạn mức, thời gian chờ (số lượt, trung bình, tối đa) theo mức ưu tiên,
+    số lượt bỏ vì chờ quá lâu và số lần API vẫn trả 429.
+    """
+    with _limiter['cond']:
+        _refill(time.monotonic())
+        queued = {name: 0 for name in PRIORITY_NAMES.values()}
+        for waiter in _limiter['waiters']:
+            queued[PRIORITY_NAMES[waiter['priority']]] += 1
+        waits = {
+            name: {'granted': s['granted'], 'mean_wait': s['total_wait'] / s['granted'] if s['granted'] else 0.0,
+                   'max_wait': s['max_wait']}
+            for name, s in _limiter['stats']['waits'].items()
+        }
+        return {
+            'queued': queued,
+            'in_flight': _limiter['in_flight'],
+            'max_concurrent': _limiter['max_concurrent'],
+            'tokens': {kind: round(bucket['tokens'], 2) for kind, bucket in _limiter['buckets'].items()},
+            'waits': waits,
+            'timeouts': _limiter['stats']['timeouts'],
+            'throttled': _limiter['stats']['throttled'],
+        }
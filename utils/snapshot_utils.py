@@ -0,0 +1,76 @@
+# utils/snapshot_utils.py
+import json
+import os
+import threading
+from datetime import datetime
+import pandas as pd
+import pyarrow as pa
+from pyarrow import feather
+from utils.config import SNAPSHOT_DIR
+
+_META_KEY = b'snapshot_meta'
+_write_lock = threading.Lock()
+
+
+def _snapshot_path(sheet_id: str) -> str:
+    return os.path.join(SNAPSHOT_DIR, f"{sheet_id}.arrow")
+
+
+def _to_arrow_table(df: pd.DataFrame, meta: dict) -> pa.Table:
+    """
+    Chuyển DataFrame thành bảng Arrow giữ nguyên kiểu: datetime thành timestamp,
+    category thành dictionary, cột object thành chuỗi (ô trống là null).
+    """
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        if series.dtype == object:
+            columns[str(col)] = pa.array([None if pd.isna(v) else str(v) for v in series], type=pa.string())
+        else:
+            columns[str(col)] = pa.Array.from_pandas(series)
+    table = pa.table(columns)
+    return table.replace_schema_metadata({_META_KEY: json.dumps(meta).encode('utf-8')})
+
+
+def save_snapshot(sheet_id: str, df: pd.DataFrame, meta: dict):
+    """
+    Ghi bản chụp của sheet ra đĩa (định dạng Arrow IPC), kèm metadata đồng bộ.
+    Ghi ra file tạm rồi đổi tên để người đọc không bao giờ thấy file dở dang.
+    """
+    meta = dict(meta, saved_at=datetime.now().isoformat(timespec='seconds'))
+    table = _to_arrow_table(df, meta)
+    path = _snapshot_path(sheet_id)
+    with _write_lock:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        feather.write_feather(table, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, path)
+
+
+def save_snapshot_async(sheet_id: str, df: pd.DataFrame, meta: dict):
+    """Ghi bản chụp trong một luồng nền để không chặn lượt rerun hiện tại."""
+    def _worker():
+        try:
+            save_snapshot(sheet_id, df, meta)
+        except Exception as e:
+            print(f"Không thể ghi snapshot cho sheet '{sheet_id}': {e}")
+
+    threading.Thread(target=_worker, name=f"snapshot-{sheet_id}", daemon=True).start()
+
+
+def load_snapshot(sheet_id: str):
+    """
+    Đọc bản chụp từ đĩa bằng memory mapping.
+    Trả về (DataFrame, metadata) hoặc (None, None) nếu chưa có hoặc file hỏng.
+    """
+    path = _snapshot_path(sheet_id)
+    if not os.path.exists(path):
+        return None, None
+    try:
+        table = feather.read_table(path, memory_map=True)
+        raw_meta = (table.schema.metadata or {}).get(_META_KEY)
+        meta = json.loads(raw_meta) if raw_meta else {}
+        return table.to_pandas(), meta
+    except Exception as e:
+        print(f"Không thể đọc snapshot của sheet '{sheet_id}': {e}")
+        return None, None
@@ -0,0 +1,199 @@
+# utils/task_pipeline.py
+import threading
+import numpy as np
+import pandas as pd
+from utils.google_sheet_utils import get_task_log
+from utils.data_utils import get_hcm_today, build_deadline_index, query_deadline_index
+from utils.perf_utils import timed
+
+# Các cột xác định task thuộc hộp công việc (inbox) của một người dùng
+INBOX_COLUMNS = ['task_po', 'task_report_to']
+
+# Kết quả dẫn xuất của mỗi sheet, dùng chung cho mọi phiên:
+# sheet_id -> {'version', 'source', 'epoch', 'confirmed_rows', 'tail_names', 'derived'}
+_pipeline_memo = {'lock': threading.Lock(), 'sheets': {}}
+
+
+def _derive_views(latest_df: pd.DataFrame) -> dict:
+    """
+    Các kết quả dẫn xuất từ trạng thái mới nhất: danh sách thư ký, task theo từng thư ký
+    và chỉ mục task_name -> vị trí hàng (để giải các tham chiếu lưu trong session_state).
+    """
+    if latest_df.empty:
+        return {'po_list': [], 'by_po': {}, 'name_index': pd.Index([], dtype=object)}
+    by_po = {}
+    if 'task_po' in latest_df.columns:
+        by_po = {po: group for po, group in latest_df.groupby('task_po', observed=True, sort=True)}
+    return {'po_list': list(by_po), 'by_po': by_po, 'name_index': pd.Index(latest_df['task_name'])}
+
+
+def _user_key(value) -> str:
+    """Tên đăng nhập được lưu chữ thường; so khớp không phân biệt hoa thường và khoảng trắng thừa."""
+    return str(value).strip().lower()
+
+
+def _build_inboxes(latest_df: pd.DataFrame) -> dict:
+    """{người dùng: tập task_name} với người dùng là thư ký phụ trách hoặc người nhận báo cáo."""
+    inboxes = {}
+    for column in INBOX_COLUMNS:
+        if column in latest_df.columns:
+            for user, names in latest_df.groupby(column, observed=True)['task_name']:
+                inboxes.setdefault(_user_key(user), set()).update(names.dropna())
+    return inboxes
+
+
+def _task_owners(latest_df: pd.DataFrame, name_index: pd.Index, names) -> dict:
+    """{task_name: tập người dùng có task trong inbox} cho các task cho trước, theo latest_df."""
+    positions = name_index.get_indexer(names)
+    rows = latest_df.iloc[positions[positions >= 0]]
+    columns = [column for column in INBOX_COLUMNS if column in rows.columns]
+    return {
+        name: {_user_key(user) for user in users if not pd.isna(user)}
+        for name, *users in rows[['task_name', *columns]].itertuples(index=False)
+    }
+
+
+def _update_inboxes(inboxes: dict, old_owners: dict, new_owners: dict) -> dict:
+    """
+    Cập nhật inbox theo chủ sở hữu cũ/mới của các task vừa thay đổi. Chỉ sao chép tập của
+    những người dùng bị ảnh hưởng, các phiên đang giữ phiên bản cũ không bị thay đổi theo.
+    """
+    updated, copied = dict(inboxes), set()
+
+    def user_inbox(user):
+        if user not in copied:
+            updated[user] = set(updated.get(user, ()))
+            copied.add(user)
+        return updated[user]
+
+    for name, users in old_owners.items():
+        for user in users - new_owners.get(name, set()):
+            user_inbox(user).discard(name)
+    for name, users in new_owners.items():
+        for user in users - old_owners.get(name, set()):
+            user_inbox(user).add(name)
+    return updated
+
+
+def _derive_inboxes(entry: dict, task_log: dict, name_index: pd.Index) -> dict:
+    """
+    Inbox của phiên bản mới. Cùng epoch (sheet chỉ được nối thêm hàng), chỉ các task có hàng
+    nằm sau confirmed_rows của phiên bản trước mới có thể đổi, nên chỉ cập nhật các task đó;
+    ngược lại dựng lại toàn bộ.
+    """
+    latest_df = task_log['latest']
+    if (entry is None or entry['epoch'] != task_log['epoch']
+            or entry['confirmed_rows'] > task_log['confirmed_rows']):
+        return _build_inboxes(latest_df)
+    new_tail = task_log['raw']['task_name'].iloc[entry['confirmed_rows']:]
+    touched = pd.concat([entry['tail_names'], new_tail]).dropna().unique()
+    old_owners = _task_owners(entry['source'], entry['derived']['name_index'], touched)
+    new_owners = _task_owners(latest_df, name_index, touched)
+    return _update_inboxes(entry['derived']['inboxes'], old_owners, new_owners)
+
+
+def get_task_views(sheet_id: str) -> dict:
+    """
+    Các khung dữ liệu dùng cho giao diện của một sheet, tính một lần cho mỗi phiên bản dữ liệu
+    và dùng chung cho mọi phiên:
+    - 'raw', 'history', 'latest', 'version': như get_task_log.
+    - 'po_list': danh sách thư ký (task_po) đã sắp xếp; 'by_po': {task_po: các task mới nhất của thư ký đó}.
+    - 'inboxes': {người dùng: tập task_name} cập nhật gia tăng khi có hàng mới (xem get_user_inbox).
+    - 'read_only', 'synced_at': dữ liệu đang lấy từ snapshot cục bộ (không kết nối được sheet).
+
+    Các DataFrame trả về được chia sẻ giữa các phiên, nơi gọi không được sửa trực tiếp.
+    """
+    task_log = get_task_log(sheet_id)
+    latest_df = task_log['latest']
+    memo = _pipeline_memo
+    with memo['lock']:
+        entry = memo['sheets'].get(sheet_id)
+        if entry is None or entry['version'] != task_log['version'] or entry['source'] is not latest_df:
+            with timed('pipeline.derive_views', rows=len(latest_df)):
+                derived = _derive_views(latest_df)
+                derived['inboxes'] = _derive_inboxes(entry, task_log, derived['name_index']) if not latest_df.empty else {}
+            derived['inbox_frames'] = {}
+            derived['inbox_deadlines'] = {}
+            entry = {
+                'version': task_log['version'],
+                'source': latest_df,
+                'epoch': task_log['epoch'],
+                'confirmed_rows': task_log['confirmed_rows'],
+                'tail_names': task_log['raw']['task_name'].iloc[task_log['confirmed_rows']:] if not latest_df.empty else pd.Series(dtype=object),
+                'derived': derived,
+            }
+            memo['sheets'][sheet_id] = entry
+        derived = entry['derived']
+    return {
+        **task_log,
+        **derived,
+        'read_only': task_log['raw'].attrs.get('read_only', False),
+        'synced_at': task_log['raw'].attrs.get('synced_at'),
+    }
+
+
+def make_task_refs(tasks_df: pd.DataFrame, sort: tuple = None) -> dict:
+    """
+    Tham chiếu gọn tới một tập task (giữ nguyên thứ tự) để lưu trong session_state thay cho
+    bản sao DataFrame: chỉ giữ mảng task_name và cách sắp xếp (cột, tăng dần) nếu có.
+    Dùng task_name thay vì index để tham chiếu vẫn đúng khi dữ liệu có phiên bản mới.
+    """
+    if 'task_name' not in tasks_df:
+        # Không đọc được dữ liệu: khung rỗng không có cột
+        return {'names': np.empty(0, dtype=object), 'sort': sort}
+    # copy=True: không giữ lại khối dữ liệu của tasks_df qua một view của mảng
+    return {'names': tasks_df['task_name'].to_numpy(dtype=object, copy=True), 'sort': sort}
+
+
+def resolve_task_refs(task_views: dict, refs: dict) -> pd.DataFrame:
+    """
+    Lấy các task được tham chiếu từ trạng thái mới nhất dùng chung (get_task_views), theo thứ tự
+    đã lưu hoặc theo refs['sort']. Task không còn trong dữ liệu được bỏ qua.
+    """
+    latest_df = task_views['latest']
+    if latest_df.empty:
+        return latest_df
+    positions = task_views['name_index'].get_indexer(refs['names'])
+    tasks_df = latest_df.iloc[positions[positions >= 0]]
+    if refs['sort'] is not None:
+        column, ascending = refs['sort']
+        tasks_df = tasks_df.sort_values(by=column, ascending=ascending, kind='stable')
+    return tasks_df
+
+
+def with_sort(refs: dict, column: str, ascending: bool) -> dict:
+    """Cùng tập task nhưng đổi cách sắp xếp (không sao chép mảng task_name)."""
+    return {'names': refs['names'], 'sort': (column, ascending)}
+
+
+def get_user_inbox(task_views: dict, username: str) -> pd.DataFrame:
+    """
+    Các task mới nhất mà username là thư ký phụ trách hoặc người nhận báo cáo, theo thứ tự của
+    'latest'. Khung dữ liệu của mỗi người dùng được tạo một lần cho mỗi phiên bản dữ liệu.
+    """
+    user = _user_key(username)
+    with _pipeline_memo['lock']:
+        inbox_df = task_views['inbox_frames'].get(user)
+    if inbox_df is None:
+        positions = task_views['name_index'].get_indexer(list(task_views['inboxes'].get(user, ())))
+        inbox_df = task_views['latest'].iloc[np.sort(positions[positions >= 0])]
+        with _pipeline_memo['lock']:
+            task_views['inbox_frames'][user] = inbox_df
+    return inbox_df
+
+
+def get_inbox_deadline_buckets(task_views: dict, username: str) -> dict:
+    """
+    Phân loại deadline (như get_deadline_buckets) chỉ trên inbox của username. Chỉ mục deadline
+    của mỗi inbox được dựng một lần cho mỗi phiên bản dữ liệu (và mỗi ngày), nên chi phí mỗi
+    lượt rerun theo kích thước inbox chứ không theo toàn bộ task đang mở.
+    """
+    user = _user_key(username)
+    today = get_hcm_today()
+    with _pipeline_memo['lock']:
+        index = task_views['inbox_deadlines'].get(user)
+    if index is None or index['today'] != today:
+        index = build_deadline_index(get_user_inbox(task_views, username), today)
+        with _pipeline_memo['lock']:
+            task_views['inbox_deadlines'][user] = index
+    return query_deadline_index(index)
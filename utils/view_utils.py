@@ -1,9 +1,20 @@
 # utils/view_utils.py
+import sys
+import time
+import uuid
+from datetime import datetime
 import streamlit as st
+import numpy as np
 import pandas as pd
-from datetime import datetime
-from .google_sheet_utils import add_row_from_dict
-from .data_utils import get_current_hcm_time_str, get_id_from_url
+from .config import TASK_PAGE_SIZE, TASK_PAGE_SIZE_OPTIONS
+from .google_sheet_utils import add_row_from_dict, add_rows_from_dicts, get_task_archive
+from .data_utils import (
+    get_current_hcm_time_str, get_hcm_today, diff_task_edits, find_blanked_fill_edits, generate_task_id,
+    get_task_timeline, TASK_CATEGORICAL_COLUMNS,
+)
+from .write_queue import get_write_status, get_write_statuses, STATUS_PENDING, STATUS_COMMITTED, STATUS_FAILED
+from .perf_utils import timed, record_span, record_rerun, get_perf_report, get_recent_spans, export_perf_log, reset_perf_metrics
+from .sheets_client import get_rate_limiter_stats
 
 
 def set_active_view(view_name: str):
@@ -20,12 +31,150 @@ def set_active_view(view_name: str):
     st.rerun()
 
 
-def render_task_card(task_data: pd.Series, sheet_id: str, unique_key_part: int):
+def track_write(write_id):
+    """Ghi nhớ một lượt ghi của phiên hiện tại để báo trạng thái ở các lượt rerun sau."""
+    if write_id:
+        st.session_state.setdefault('pending_write_ids', []).append(write_id)
+
+
+def render_write_status():
+    """
+    Hiển thị trạng thái các thay đổi mà phiên này đã gửi vào hàng đợi ghi:
+    báo thành công/thất bại một lần, và số thay đổi còn đang chờ đồng bộ.
+    """
+    write_ids = st.session_state.get('pending_write_ids', [])
+    if not write_ids:
+        return
+    still_pending, committed = [], 0
+    for write_id, status in get_write_statuses(write_ids).items():
+        if status == STATUS_COMMITTED:
+            committed += 1
+        elif status == STATUS_FAILED:
+            st.error(f"❌ Không lưu được một thay đổi lên Google Sheet: {get_write_status(write_id)['error']}")
+        elif status == STATUS_PENDING:
+            still_pending.append(write_id)
+    if committed:
+        st.toast(f"Đã lưu {committed} thay đổi lên Google Sheet." if committed > 1 else "Đã lưu thay đổi lên Google Sheet.", icon="✅")
+    st.session_state.pending_write_ids = still_pending
+    if still_pending:
+        st.caption(f"⏳ Đang đồng bộ {len(still_pending)} thay đổi lên Google Sheet...")
+
+
+FWS_TASK_URL = 'https://workingspace.familyhospital.vn/task/show/{}'
+
+# Các trạng thái task dùng trong ứng dụng; task ở trạng thái đã đóng không bị coi là trễ hạn
+TASK_CLOSED_STATUSES = ['Đã hoàn thành', 'Đã hủy']
+TASK_STATUSES = ['Mới tạo', 'Đang thực hiện', 'Chờ phản hồi', *TASK_CLOSED_STATUSES]
+
+
+def build_card_view_models(tasks_df: pd.DataFrame) -> list:
+    """
+    Tính sẵn (vector hóa, cho cả nhóm task) các giá trị hiển thị của card:
+    deadline đã định dạng, kiểu cảnh báo, số ngày trễ và link FWS.
+    Chỉ nên gọi cho các task thực sự được hiển thị (ví dụ một trang).
+    """
+    if tasks_df.empty:
+        return []
+    n = len(tasks_df)
+
+    def column(name):
+        return tasks_df[name] if name in tasks_df.columns else pd.Series([None] * n, index=tasks_df.index)
+
+    deadlines = pd.to_datetime(column('task_deadline'), errors='coerce')
+    delta_days = (deadlines - get_hcm_today()).dt.days
+    deadline_text = deadlines.dt.strftime('%d/%m/%Y')
+    style = pd.Series(None, index=tasks_df.index, dtype=object)
+    style[delta_days < 0] = 'error'
+    style[delta_days == 0] = 'warning'
+    style[delta_days > 0] = 'success'
+    is_late = (delta_days < 0) & ~column('task_status').astype(object).isin(TASK_CLOSED_STATUSES)
+
+    links = column('task_link').astype(object)
+    link_ids = links.fillna('').astype(str).str.split('/').str[-1].str.split('?').str[0]
+
+    view_models = []
+    for i in range(n):
+        has_deadline = not pd.isna(deadlines.iat[i])
+        has_link = not pd.isna(links.iat[i]) and links.iat[i] != ''
+        view_models.append({
+            'deadline_text': deadline_text.iat[i] if has_deadline else None,
+            'deadline_style': style.iat[i] if has_deadline else None,
+            'late_caption': f"Trễ {-int(delta_days.iat[i])} ngày" if has_deadline and is_late.iat[i] else None,
+            'fws_url': FWS_TASK_URL.format(link_ids.iat[i]) if has_link else None,
+        })
+    return view_models
+
+
+def _render_deadline(view_model: dict):
+    st.markdown("**Deadline**")
+    if view_model['deadline_text'] is None:
+        st.caption("(chưa có)")
+        return
+    alert = {'error': st.error, 'warning': st.warning, 'success': st.success}[view_model['deadline_style']]
+    alert(view_model['deadline_text'])
+    if view_model['late_caption']:
+        st.caption(view_model['late_caption'])
+
+
+# Cột hiển thị trong lịch sử thay đổi của task, và các cột được so sánh giữa hai phiên bản
+TASK_TIMELINE_COLUMNS = ['add_time', 'task_status', 'task_po', 'task_report_to', 'task_deadline', 'task_comment']
+TASK_TIMELINE_TRACKED_COLUMNS = {
+    'task_status': 'Trạng thái', 'task_po': 'Thư ký', 'task_report_to': 'Báo cáo cho', 'task_deadline': 'Deadline',
+}
+
+
+def render_task_timeline(task_log: dict, task_name: str, sheet_id: str = None):
+    """
+    Hiển thị lịch sử thay đổi của một task (mới nhất ở trên), kèm các trường đã đổi
+    so với phiên bản trước. Chỉ đọc các hàng của task đó qua chỉ mục offsets.
+    Nếu có sheet_id, gồm cả các phiên bản đã được nén sang worksheet lưu trữ.
+    """
+    archived = get_task_archive(sheet_id) if sheet_id else None
+    timeline = get_task_timeline(task_log, task_name, archived=archived)
+    if timeline.empty:
+        st.caption("(chưa có lịch sử)")
+        return
+    tracked = [c for c in TASK_TIMELINE_TRACKED_COLUMNS if c in timeline.columns]
+    current = timeline[tracked].astype(object)
+    previous = current.shift()
+    changed = (current != previous) & ~(current.isna() & previous.isna())
+    changes = [
+        ', '.join(TASK_TIMELINE_TRACKED_COLUMNS[c] for c in tracked if row_changed[c]) or '—'
+        for _, row_changed in changed.iterrows()
+    ]
+    changes[0] = 'Tạo mới'
+
+    table = timeline[[c for c in TASK_TIMELINE_COLUMNS if c in timeline.columns]].assign(changes=changes)
+    st.markdown(f"**🕘 Lịch sử thay đổi ({len(timeline)} phiên bản)**")
+    st.dataframe(
+        table.iloc[::-1],
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            'add_time': st.column_config.DatetimeColumn("Thời điểm", format="DD/MM/YYYY HH:mm:ss"),
+            'task_status': "Trạng thái",
+            'task_po': "Thư ký",
+            'task_report_to': "Báo cáo cho",
+            'task_deadline': st.column_config.DateColumn("Deadline", format="DD/MM/YYYY", required=True),
+            'task_comment': "Ghi chú",
+            'changes': "Thay đổi",
+        },
+    )
+
+
+def render_task_card(task_data: pd.Series, sheet_id: str, unique_key_part: int, read_only: bool = False,
+                     view_model: dict = None, task_log: dict = None):
     """
     Hiển thị một card duy nhất cho task, có thể chuyển đổi giữa chế độ xem và chỉnh sửa.
+    Khi read_only=True (đang dùng snapshot cục bộ), card chỉ hiển thị, không cho chỉnh sửa.
+    view_model: giá trị hiển thị đã tính sẵn bởi build_card_view_models (nếu có).
+    task_log: kết quả get_task_log/get_task_views; nếu có, card có nút xem lịch sử thay đổi.
     """
     card_key = f"card_{unique_key_part}"
-    is_editing = (st.session_state.get('editing_task_key') == card_key)
+    is_editing = not read_only and (st.session_state.get('editing_task_key') == card_key)
+    show_timeline = task_log is not None and st.session_state.get('timeline_task_key') == card_key
+    if view_model is None:
+        view_model = build_card_view_models(task_data.to_frame().T)[0]
 
     with st.container(border=True):
         if is_editing:
@@ -40,31 +189,13 @@ def render_task_card(task_data: pd.Series, sheet_id: str, unique_key_part: int):
                     st.markdown(f"**Báo cáo cho:**");
                     new_task_report_to = st.text_input("", f"{task_data.get('task_report_to', 'N/A')}")
                 with sub_cols[2]:
-                    st.markdown("**Deadline**")
-                    deadline_str = task_data.get('task_deadline')
-                    deadline_dt = pd.to_datetime(deadline_str, format='%Y-%m-%d', errors='coerce')
-                    if pd.isna(deadline_dt):
-                        st.caption("(chưa có)")
-                    else:
-                        today = pd.Timestamp.now().normalize()
-                        delta = (deadline_dt - today).days
-                        task_status = task_data.get('task_status')
-                        if delta < 0:
-                            st.error(f"{deadline_dt.strftime('%d/%m/%Y')}")
-                            if task_status not in ['Đã hoàn thành', 'Đã hủy']: st.caption(f"Trễ {-delta} ngày")
-                        elif delta == 0:
-                            st.warning(f"{deadline_dt.strftime('%d/%m/%Y')}")
-                        else:
-                            st.success(f"{deadline_dt.strftime('%d/%m/%Y')}")
+                    _render_deadline(view_model)
                 with sub_cols[3]:
                     st.markdown(f"**Trạng thái:**")
                     st.info(f"{task_data.get('task_status', 'N/A')}")
                 with sub_cols[4]:
-                    link = task_data.get('task_link', '')
-                    if link:
-                        task_id = get_id_from_url(link)
-                        st.link_button("FWS", url=f'https://workingspace.familyhospital.vn/task/show/{task_id}',
-                                       use_container_width=True)
+                    if view_model['fws_url']:
+                        st.link_button("FWS", url=view_model['fws_url'], use_container_width=True)
                 form_cols = st.columns(2)
                 with form_cols[0]:
                     if st.form_submit_button("Lưu thay đổi", use_container_width=True, type="primary"):
@@ -73,12 +204,12 @@ def render_task_card(task_data: pd.Series, sheet_id: str, unique_key_part: int):
                             'add_time': get_current_hcm_time_str(),
                             'task_deadline': task_data.get('task_deadline', ''),
                             'task_link': task_data.get('task_link', ''),
-                            'task_id': f"TASK-{int(datetime.now().timestamp())}", 'task_des': task_data.get('task_des', ''),
+                            'task_id': generate_task_id(), 'task_des': task_data.get('task_des', ''),
                             'task_report_to': new_task_report_to, 'task_po': new_task_po,
                             'task_status': task_data.get('task_status', ''), 'task_comment': task_data.get('task_status', '')
                         }
                         with st.spinner("Đang lưu..."):
-                            add_row_from_dict(sheet_id, updated_row_data)
+                            track_write(add_row_from_dict(sheet_id, updated_row_data))
                         st.session_state.editing_task_key = None
                         st.rerun()
                 with form_cols[1]:
@@ -96,31 +227,265 @@ def render_task_card(task_data: pd.Series, sheet_id: str, unique_key_part: int):
                 st.markdown(f"**Báo cáo cho:**");
                 st.info(f"{task_data.get('task_report_to', 'N/A')}")
             with sub_cols[2]:
-                st.markdown("**Deadline**")
-                deadline_str = task_data.get('task_deadline')
-                deadline_dt = pd.to_datetime(deadline_str, format='%Y-%m-%d', errors='coerce')
-                if pd.isna(deadline_dt):
-                    st.caption("(chưa có)")
-                else:
-                    today = pd.Timestamp.now().normalize()
-                    delta = (deadline_dt - today).days
-                    task_status = task_data.get('task_status')
-                    if delta < 0:
-                        st.error(f"{deadline_dt.strftime('%d/%m/%Y')}")
-                        if task_status not in ['Đã hoàn thành', 'Đã hủy']: st.caption(f"Trễ {-delta} ngày")
-                    elif delta == 0:
-                        st.warning(f"{deadline_dt.strftime('%d/%m/%Y')}")
-                    else:
-                        st.success(f"{deadline_dt.strftime('%d/%m/%Y')}")
+                _render_deadline(view_model)
             with sub_cols[3]:
                 st.markdown(f"**Trạng thái:**")
                 st.info(f"{task_data.get('task_status', 'N/A')}")
             with sub_cols[4]:
-                link = task_data.get('task_link', '')
-                if link:
-                    task_id = get_id_from_url(link)
-                    st.link_button("FWS", url=f'https://workingspace.familyhospital.vn/task/show/{task_id}',
-                                   use_container_width=True)
-                if st.button("Chỉnh sửa", key=f"edit_btn_{card_key}", use_container_width=True):
+                if view_model['fws_url']:
+                    st.link_button("FWS", url=view_model['fws_url'], use_container_width=True)
+                if not read_only and st.button("Chỉnh sửa", key=f"edit_btn_{card_key}", use_container_width=True):
                     st.session_state.editing_task_key = card_key
                     st.rerun()
+                if task_log is not None and st.button("Ẩn lịch sử" if show_timeline else "Lịch sử",
+                                                      key=f"timeline_btn_{card_key}", use_container_width=True):
+                    st.session_state.timeline_task_key = None if show_timeline else card_key
+                    st.rerun()
+            if show_timeline:
+                render_task_timeline(task_log, task_data.get('task_name'), sheet_id=sheet_id)
+
+
+def reset_task_list(*list_keys: str):
+    """Đưa các danh sách về trang đầu (gọi khi kết quả tìm kiếm/lọc thay đổi)."""
+    for list_key in list_keys:
+        st.session_state.pop(f"task_page_{list_key}", None)
+
+
+def _shift_page(page_key: str, delta: int, page_count: int):
+    """Callback của nút chuyển trang: chạy trước lượt rerun nên nút và nhãn trang dựng theo trang mới."""
+    st.session_state[page_key] = min(max(st.session_state.get(page_key, 1) + delta, 1), page_count)
+
+
+def render_task_list(tasks_df: pd.DataFrame, sheet_id: str, list_key: str, read_only: bool = False,
+                     task_log: dict = None):
+    """
+    Hiển thị danh sách card theo trang: chỉ dựng widget và tính giá trị hiển thị cho
+    các task của trang hiện tại. Key của card là index của task nên không đổi khi chuyển trang.
+    list_key phân biệt trạng thái phân trang của các danh sách trên cùng một trang.
+    """
+    total = len(tasks_df)
+    page_key, size_key = f"task_page_{list_key}", f"task_page_size_{list_key}"
+    page_size = st.session_state.setdefault(size_key, TASK_PAGE_SIZE)
+    page_count = max((total - 1) // page_size + 1, 1)
+    # Trang đã được callback chuyển trang cập nhật; chỉ cần kẹp lại khi danh sách ngắn đi
+    page = st.session_state[page_key] = min(max(st.session_state.get(page_key, 1), 1), page_count)
+    paginated = total > TASK_PAGE_SIZE_OPTIONS[0]
+
+    if paginated:
+        nav_cols = st.columns((1, 2, 1, 2))
+        with nav_cols[0]:
+            st.button("◀ Trước", key=f"prev_{list_key}", disabled=page <= 1, use_container_width=True,
+                      on_click=_shift_page, args=(page_key, -1, page_count))
+        with nav_cols[2]:
+            st.button("Sau ▶", key=f"next_{list_key}", disabled=page >= page_count, use_container_width=True,
+                      on_click=_shift_page, args=(page_key, 1, page_count))
+        with nav_cols[1]:
+            st.markdown(f"Trang **{page}/{page_count}** · {total} task")
+        with nav_cols[3]:
+            st.selectbox("Số task mỗi trang", options=TASK_PAGE_SIZE_OPTIONS, key=size_key, label_visibility="collapsed")
+
+    start = time.perf_counter()
+    page_df = tasks_df.iloc[(page - 1) * page_size: page * page_size]
+    view_models = build_card_view_models(page_df)
+    for (index, row), view_model in zip(page_df.iterrows(), view_models):
+        render_task_card(row, sheet_id, index, read_only=read_only, view_model=view_model, task_log=task_log)
+    elapsed = time.perf_counter() - start
+    record_span('render.task_list', elapsed, list=list_key, cards=len(page_df))
+    if paginated:
+        st.caption(f"⏱ Trang {page}/{page_count} ({len(page_df)} task) hiển thị trong {elapsed * 1000:.0f} ms")
+
+
+# Cột hiển thị và cột cho phép sửa trong chế độ bảng
+TASK_TABLE_COLUMNS = ['task_name', 'task_po', 'task_report_to', 'task_status', 'task_deadline', 'task_link']
+TASK_TABLE_EDITABLE_COLUMNS = ['task_po', 'task_report_to', 'task_status', 'task_deadline']
+
+
+def render_task_table(latest_df: pd.DataFrame, sheet_id: str, read_only: bool = False):
+    """
+    Chế độ bảng gọn cho trạng thái mới nhất của các task: sửa trực tiếp người phụ trách,
+    người nhận báo cáo, trạng thái và deadline. Khi lưu, chỉ các task có thay đổi được ghi
+    thành hàng log mới, tất cả trong một lần append.
+    """
+    table_df = latest_df.reindex(columns=TASK_TABLE_COLUMNS).astype(
+        {column: object for column in TASK_CATEGORICAL_COLUMNS if column in TASK_TABLE_COLUMNS}
+    )
+    # Luôn cho chọn đủ các trạng thái chuẩn, kèm các giá trị khác đang có trên sheet
+    extra_statuses = set(latest_df['task_status'].dropna().astype(str)) - set(TASK_STATUSES)
+    status_options = TASK_STATUSES + sorted(extra_statuses)
+    # Đổi key sau mỗi lần lưu để bảng bỏ các chỉnh sửa cũ và hiển thị dữ liệu mới
+    editor_key = f"task_table_{st.session_state.get('task_table_version', 0)}"
+
+    with timed('render.task_table', rows=len(table_df)):
+        edited_df = st.data_editor(
+            table_df,
+            key=editor_key,
+            hide_index=True,
+            num_rows="fixed",
+            use_container_width=True,
+            disabled=True if read_only else [c for c in TASK_TABLE_COLUMNS if c not in TASK_TABLE_EDITABLE_COLUMNS],
+            column_config={
+                'task_name': st.column_config.TextColumn("Công việc"),
+                # Ô trống sẽ bị backfill điền lại giá trị cũ khi gộp log, nên các cột này bắt buộc có giá trị
+                'task_po': st.column_config.TextColumn("Thư ký phụ trách", required=True),
+                'task_report_to': st.column_config.TextColumn("Báo cáo cho", required=True),
+                'task_status': st.column_config.SelectboxColumn("Trạng thái", options=status_options),
+                'task_deadline': st.column_config.DateColumn("Deadline", format="DD/MM/YYYY"),
+                'task_link': st.column_config.LinkColumn("FWS", display_text="Mở"),
+            },
+        )
+    if read_only:
+        return
+
+    changes = diff_task_edits(latest_df, edited_df, TASK_TABLE_EDITABLE_COLUMNS)
+    blanked = find_blanked_fill_edits(latest_df, edited_df, TASK_TABLE_EDITABLE_COLUMNS)
+    if blanked:
+        changes = [row for row in changes if row['task_name'] not in blanked]
+        st.warning("⚠️ Không thể xóa trắng người phụ trách, người nhận báo cáo hoặc deadline (giá trị cũ sẽ được "
+                   "giữ lại), các thay đổi của những task sau sẽ không được lưu: "
+                   + "; ".join(f"{name} ({', '.join(columns)})" for name, columns in blanked.items()))
+    save_cols = st.columns((2, 2, 8))
+    with save_cols[0]:
+        save_clicked = st.button(f"💾 Lưu {len(changes)} thay đổi", type="primary", disabled=not changes,
+                                 use_container_width=True, key=f"save_{editor_key}")
+    with save_cols[1]:
+        if st.button("Hủy thay đổi", disabled=not changes, use_container_width=True, key=f"discard_{editor_key}"):
+            st.session_state.task_table_version = st.session_state.get('task_table_version', 0) + 1
+            st.rerun()
+    if save_clicked:
+        add_time = get_current_hcm_time_str()
+        for row in changes:
+            row.update(add_time=add_time, task_id=generate_task_id())
+        with st.spinner(f"Đang lưu {len(changes)} thay đổi..."):
+            write_ids = add_rows_from_dicts(sheet_id, changes)
+        if write_ids:
+            for write_id in write_ids:
+                track_write(write_id)
+            st.session_state.task_table_version = st.session_state.get('task_table_version', 0) + 1
+            st.rerun()
+
+
+def _estimate_size(value) -> int:
+    """Ước lượng số byte một giá trị trong session_state giữ (đệ quy với dict/list)."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        # Mảng object chỉ giữ con trỏ tới các chuỗi dùng chung với dữ liệu của tiến trình
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_estimate_size(v) for v in value.values())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(_estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def get_session_memory_report() -> list:
+    """Bộ nhớ riêng mà session_state của phiên hiện tại đang giữ, theo từng key (giảm dần)."""
+    report = [
+        {'key': key, 'type': type(value).__name__, 'bytes': _estimate_size(value)}
+        for key, value in st.session_state.items()
+    ]
+    return sorted(report, key=lambda item: item['bytes'], reverse=True)
+
+
+def render_session_memory_report():
+    """Hiển thị báo cáo bộ nhớ của phiên hiện tại (dùng để kiểm tra dung lượng session_state)."""
+    report = get_session_memory_report()
+    total = sum(item['bytes'] for item in report)
+    with st.expander(f"🧠 Bộ nhớ phiên: {total / 1024:.1f} KB"):
+        st.dataframe(pd.DataFrame(report, columns=['key', 'type', 'bytes']), hide_index=True, use_container_width=True)
+
+
+def start_rerun_timer():
+    """Bắt đầu đo thời gian lượt rerun hiện tại của trang (gọi ở đầu trang)."""
+    st.session_state['_rerun_started'] = time.perf_counter()
+
+
+def finish_rerun_timer(page: str):
+    """
+    Ghi nhận thời gian lượt rerun hiện tại (gọi ở cuối trang) vào histogram của phiên.
+    Lượt rerun bị ngắt giữa chừng (st.rerun, st.stop) không được tính.
+    """
+    started = st.session_state.pop('_rerun_started', None)
+    if started is None:
+        return
+    session_id = st.session_state.setdefault('_perf_session_id', uuid.uuid4().hex[:8])
+    record_rerun(session_id, time.perf_counter() - started, page=page,
+                 user=st.session_state.get('username'), view=st.session_state.get('active_view'))
+
+
+def _latency_table(summaries: dict, label: str) -> pd.DataFrame:
+    """Bảng độ trễ (ms) từ các bản tóm tắt histogram của get_perf_report."""
+    rows = [
+        {label: name, 'Số lượt': s['count'], 'TB (ms)': s['mean'] * 1000, 'p50 (ms)': s['p50'] * 1000,
+         'p95 (ms)': s['p95'] * 1000, 'p99 (ms)': s['p99'] * 1000, 'max (ms)': s['max'] * 1000,
+         'Tổng (s)': s['total']}
+        for name, s in summaries.items()
+    ]
+    return pd.DataFrame(rows).round(2)
+
+
+def render_perf_report():
+    """
+    Trang hiệu năng cho admin: thời gian từng bước của một lượt rerun (đọc Google Sheets,
+    backfill, lọc trạng thái mới nhất, dựng card,...), bộ đếm lệnh gọi API/cache/dung lượng,
+    độ trễ rerun theo từng phiên, và xuất toàn bộ dưới dạng log có cấu trúc (JSON Lines).
+    """
+    report = get_perf_report()
+    counters = report['counters']
+    rerun = report['spans'].get('rerun', {'count': 0, 'p50': 0.0, 'p95': 0.0})
+    cache_lookups = sum(counters.get(f'sheet_cache.{key}', 0) for key in ('hits', 'stale_hits', 'misses', 'coalesced'))
+
+    metric_cols = st.columns(5)
+    metric_cols[0].metric("Số lượt rerun", rerun['count'])
+    metric_cols[1].metric("Rerun p50 / p95", f"{rerun['p50'] * 1000:.0f} / {rerun['p95'] * 1000:.0f} ms")
+    metric_cols[2].metric("Lệnh gọi Sheets API", counters.get('sheets.api_calls', 0))
+    metric_cols[3].metric("Dữ liệu đọc từ Sheets", f"{counters.get('sheets.bytes_read', 0) / 2 ** 20:.1f} MB")
+    metric_cols[4].metric("Tỉ lệ cache hit",
+                          f"{(counters.get('sheet_cache.hits', 0) + counters.get('sheet_cache.stale_hits', 0)) / cache_lookups:.0%}"
+                          if cache_lookups else "–")
+    st.caption(f"Số liệu từ {report['started_at']} ({report['uptime_seconds'] / 60:.0f} phút). "
+               "Phân vị được ước lượng từ histogram (cận trên của bucket).")
+
+    st.subheader("⏱ Thời gian theo bước")
+    if report['spans']:
+        st.dataframe(_latency_table(report['spans'], 'Bước'), hide_index=True, use_container_width=True)
+    else:
+        st.info("Chưa có số liệu.")
+
+    st.subheader("🚦 Hàng đợi Google Sheets API")
+    limiter = get_rate_limiter_stats()
+    limiter_cols = st.columns(4)
+    limiter_cols[0].metric("Đang chờ", sum(limiter['queued'].values()))
+    limiter_cols[1].metric("Đang chạy", f"{limiter['in_flight']} / {limiter['max_concurrent']}")
+    limiter_cols[2].metric("Token đọc / ghi", f"{limiter['tokens']['read']:.1f} / {limiter['tokens']['write']:.1f}")
+    limiter_cols[3].metric("Quá hạn chờ / 429", f"{limiter['timeouts']} / {limiter['throttled']}")
+    st.dataframe(pd.DataFrame([
+        {'Mức ưu tiên': name, 'Đang chờ': limiter['queued'][name], 'Số lượt': waits['granted'],
+         'Chờ TB (ms)': waits['mean_wait'] * 1000, 'Chờ tối đa (ms)': waits['max_wait'] * 1000}
+        for name, waits in limiter['waits'].items()
+    ]).round(2), hide_index=True, use_container_width=True)
+
+    st.subheader("🔢 Bộ đếm")
+    st.dataframe(pd.DataFrame(list(counters.items()), columns=['Bộ đếm', 'Giá trị']),
+                 hide_index=True, use_container_width=True)
+
+    st.subheader("👥 Độ trễ rerun theo phiên")
+    sessions = {f"{s['session']} · {s.get('user') or '?'} · {s.get('page')}": s for s in report['sessions']}
+    if sessions:
+        st.dataframe(_latency_table(sessions, 'Phiên'), hide_index=True, use_container_width=True)
+    else:
+        st.info("Chưa có phiên nào được đo.")
+
+    with st.expander("📜 Các span gần nhất"):
+        st.dataframe(pd.DataFrame(get_recent_spans(200)[::-1]), hide_index=True, use_container_width=True)
+
+    action_cols = st.columns((2, 2, 6))
+    with action_cols[0]:
+        st.download_button("⬇️ Xuất log (JSONL)", data=export_perf_log(), mime="application/x-ndjson",
+                           file_name=f"perf-{datetime.now():%Y%m%d-%H%M%S}.jsonl", use_container_width=True)
+    with action_cols[1]:
+        if st.button("🧹 Đặt lại số liệu", use_container_width=True):
+            reset_perf_metrics()
+            st.rerun()
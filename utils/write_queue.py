@@ -0,0 +1,270 @@
+# utils/write_queue.py
+import json
+import os
+import random
+import threading
+import time
+import uuid
+import streamlit as st
+import gspread
+import requests
+from utils.config import (
+    WRITE_FLUSH_INTERVAL,
+    WRITE_RETRY_BASE_DELAY,
+    WRITE_RETRY_MAX_DELAY,
+    WRITE_MAX_ATTEMPTS,
+    WRITE_JOURNAL_PATH,
+)
+
+# Trạng thái của từng hàng trong hàng đợi
+STATUS_PENDING = 'pending'
+STATUS_COMMITTED = 'committed'
+STATUS_FAILED = 'failed'
+
+# Mã HTTP được coi là lỗi tạm thời (quota, lỗi server) và sẽ được thử lại
+_RETRYABLE_CODES = {429, 500, 502, 503, 504}
+# Giữ trạng thái các hàng đã xong trong bao lâu (giây) để giao diện kịp đọc
+_FINISHED_RETENTION = 3600
+
+# Các hàm do google_sheet_utils cung cấp (xem configure_write_queue)
+_hooks = {'append_rows': None, 'on_flush': None, 'find_written': None}
+
+
+def configure_write_queue(append_rows, on_flush, find_written=None):
+    """
+    Đăng ký cách ghi hàng vào sheet và hàm được gọi sau mỗi lần ghi của một sheet.
+    - append_rows(sheet_id, rows): ghi nhiều hàng bằng một lệnh gọi API.
+    - on_flush(sheet_id): được gọi khi một nhóm hàng đã ghi xong hoặc thất bại hẳn.
+    - find_written(sheet_id, rows): tập vị trí các hàng trong rows đã có trên sheet; dùng để
+      không ghi trùng các hàng nạp lại từ journal hoặc ghi lại sau một lần ghi lỗi.
+    """
+    _hooks['append_rows'] = append_rows
+    _hooks['on_flush'] = on_flush
+    _hooks['find_written'] = find_written
+    # Khởi tạo hàng đợi ngay để các hàng còn dở trong journal được ghi tiếp
+    _get_write_queue()
+
+
+@st.cache_resource
+def _get_write_queue() -> dict:
+    """Hàng đợi ghi dùng chung cho mọi phiên; nạp lại các hàng còn dở trong journal."""
+    queue = {
+        'cond': threading.Condition(),
+        'entries': {},      # write_id -> entry
+        'retry_at': {},     # sheet_id -> thời điểm (time.monotonic) được thử lại
+        'worker': None,
+    }
+    for entry in _read_journal():
+        # Tiến trình trước có thể đã dừng sau append_rows nhưng trước khi kịp cập nhật journal
+        entry.update(status=STATUS_PENDING, attempts=0, error=None, finished_ts=None, replayed=True)
+        queue['entries'][entry['id']] = entry
+    if queue['entries']:
+        _ensure_worker(queue)
+    return queue
+
+
+def _read_journal() -> list:
+    if not os.path.exists(WRITE_JOURNAL_PATH):
+        return []
+    entries = []
+    with open(WRITE_JOURNAL_PATH, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                # Dòng cuối có thể bị ghi dở khi tiến trình bị dừng đột ngột
+                continue
+    return entries
+
+
+def _journal_record(entry: dict) -> str:
+    record = {key: entry[key] for key in ('id', 'sheet_id', 'row', 'created_at')}
+    return json.dumps(record, ensure_ascii=False, default=str) + '\n'
+
+
+def _append_journal(entries: list):
+    os.makedirs(os.path.dirname(WRITE_JOURNAL_PATH) or '.', exist_ok=True)
+    with open(WRITE_JOURNAL_PATH, 'a', encoding='utf-8') as f:
+        f.writelines(_journal_record(entry) for entry in entries)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _rewrite_journal(queue: dict):
+    """Ghi lại journal chỉ với các hàng còn pending (ghi file tạm rồi đổi tên)."""
+    pending = [e for e in queue['entries'].values() if e['status'] == STATUS_PENDING]
+    os.makedirs(os.path.dirname(WRITE_JOURNAL_PATH) or '.', exist_ok=True)
+    tmp_path = f"{WRITE_JOURNAL_PATH}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.writelines(_journal_record(e) for e in sorted(pending, key=lambda e: e['created_at']))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, WRITE_JOURNAL_PATH)
+
+
+def enqueue_row(sheet_id: str, row: list) -> str:
+    """
+    Đưa một hàng vào hàng đợi ghi và trả về write_id để theo dõi trạng thái.
+    Hàng được ghi vào journal trên đĩa trước khi hàm trả về.
+    """
+    return enqueue_rows(sheet_id, [row])[0]
+
+
+def enqueue_rows(sheet_id: str, rows: list) -> list:
+    """
+    Đưa nhiều hàng vào hàng đợi ghi cùng lúc, trả về danh sách write_id theo thứ tự.
+    Các hàng được ghi vào journal bằng một lần fsync và luôn nằm trong cùng một
+    lệnh append_rows, theo đúng thứ tự truyền vào.
+
+    Mỗi hàng được ghi lên sheet đúng một lần kể cả khi tiến trình khởi động lại: hàng nạp lại
+    từ journal, hoặc ghi lại sau một lần ghi lỗi (lệnh ghi có thể đã thành công dù báo lỗi),
+    được đối chiếu với dữ liệu trên sheet (find_written, theo task_id + add_time) trước khi ghi.
+    """
+    queue = _get_write_queue()
+    created_at = time.time()
+    entries = [{
+        'id': uuid.uuid4().hex,
+        'sheet_id': sheet_id,
+        'row': row,
+        'created_at': created_at,
+        'status': STATUS_PENDING,
+        'attempts': 0,
+        'error': None,
+        'finished_ts': None,
+        'replayed': False,
+    } for row in rows]
+    with queue['cond']:
+        _append_journal(entries)
+        for entry in entries:
+            queue['entries'][entry['id']] = entry
+        _ensure_worker(queue)
+        queue['cond'].notify()
+    return [entry['id'] for entry in entries]
+
+
+def get_write_status(write_id: str) -> dict:
+    """
+    Trả về trạng thái ghi của một hàng: {'status', 'attempts', 'error'}.
+    status là 'pending', 'committed', 'failed', hoặc None nếu không còn theo dõi.
+    """
+    queue = _get_write_queue()
+    with queue['cond']:
+        entry = queue['entries'].get(write_id)
+        if entry is None:
+            return {'status': None, 'attempts': 0, 'error': None}
+        return {'status': entry['status'], 'attempts': entry['attempts'], 'error': entry['error']}
+
+
+def get_write_statuses(write_ids) -> dict:
+    """Trạng thái của nhiều hàng cùng lúc: {write_id: status}."""
+    queue = _get_write_queue()
+    with queue['cond']:
+        return {
+            write_id: (queue['entries'][write_id]['status'] if write_id in queue['entries'] else None)
+            for write_id in write_ids
+        }
+
+
+def _ensure_worker(queue: dict):
+    """Khởi động luồng ghi nền nếu chưa chạy. Gọi khi đang giữ queue['cond']."""
+    worker = queue['worker']
+    if worker is None or not worker.is_alive():
+        worker = threading.Thread(target=_worker_loop, args=(queue,), name="sheet-write-queue", daemon=True)
+        queue['worker'] = worker
+        worker.start()
+
+
+def _due_sheets(queue: dict) -> tuple:
+    """Các sheet có hàng pending đã tới lượt ghi, và thời gian chờ tới lượt gần nhất."""
+    now = time.monotonic()
+    due, next_wait = set(), None
+    for entry in queue['entries'].values():
+        if entry['status'] != STATUS_PENDING:
+            continue
+        retry_at = queue['retry_at'].get(entry['sheet_id'], 0.0)
+        if retry_at <= now:
+            due.add(entry['sheet_id'])
+        else:
+            wait = retry_at - now
+            next_wait = wait if next_wait is None else min(next_wait, wait)
+    return due, next_wait
+
+
+def _worker_loop(queue: dict):
+    while True:
+        with queue['cond']:
+            due, next_wait = _due_sheets(queue)
+            while not due:
+                queue['cond'].wait(timeout=next_wait)
+                due, next_wait = _due_sheets(queue)
+        # Chờ hết cửa sổ gom để các phiên khác kịp đưa thêm hàng vào cùng lần ghi
+        time.sleep(WRITE_FLUSH_INTERVAL)
+        for sheet_id in due:
+            _flush_sheet(queue, sheet_id)
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, gspread.exceptions.APIError):
+        return error.code in _RETRYABLE_CODES
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout, ConnectionError))
+
+
+def _backoff_delay(attempts: int) -> float:
+    """Exponential backoff với 'full jitter' để các tiến trình không thử lại cùng lúc."""
+    return random.uniform(0, min(WRITE_RETRY_MAX_DELAY, WRITE_RETRY_BASE_DELAY * 2 ** attempts))
+
+
+def _flush_sheet(queue: dict, sheet_id: str):
+    """Ghi tất cả hàng pending của một sheet bằng một lệnh append_rows."""
+    with queue['cond']:
+        batch = sorted(
+            (e for e in queue['entries'].values() if e['sheet_id'] == sheet_id and e['status'] == STATUS_PENDING),
+            key=lambda e: e['created_at'],
+        )
+    if not batch:
+        return
+
+    error = None
+    try:
+        to_write = batch
+        if _hooks['find_written'] is not None and any(e['replayed'] or e['attempts'] for e in batch):
+            written = _hooks['find_written'](sheet_id, [e['row'] for e in batch])
+            to_write = [e for i, e in enumerate(batch) if i not in written]
+            if written:
+                print(f"Bỏ qua {len(written)} hàng đã có trên sheet ID '{sheet_id}' (ghi từ lần trước).")
+        if to_write:
+            _hooks['append_rows'](sheet_id, [e['row'] for e in to_write])
+    except Exception as e:
+        error = e
+
+    now = time.monotonic()
+    with queue['cond']:
+        if error is None:
+            queue['retry_at'].pop(sheet_id, None)
+            for entry in batch:
+                entry.update(status=STATUS_COMMITTED, error=None, finished_ts=now)
+        else:
+            attempts = max(e['attempts'] for e in batch) + 1
+            give_up = not _is_retryable(error) or attempts >= WRITE_MAX_ATTEMPTS
+            for entry in batch:
+                entry['attempts'] = attempts
+                entry['error'] = str(error)
+                if give_up:
+                    entry.update(status=STATUS_FAILED, finished_ts=now)
+            if give_up:
+                queue['retry_at'].pop(sheet_id, None)
+            else:
+                queue['retry_at'][sheet_id] = now + _backoff_delay(attempts)
+            print(f"Lỗi khi ghi {len(batch)} hàng vào sheet ID '{sheet_id}' (lần {attempts}): {error}")
+
+        # Bỏ các hàng đã xong từ lâu để bộ nhớ không tăng mãi
+        for write_id in [k for k, e in queue['entries'].items()
+                         if e['finished_ts'] is not None and now - e['finished_ts'] > _FINISHED_RETENTION]:
+            del queue['entries'][write_id]
+        try:
+            _rewrite_journal(queue)
+        except OSError as e:
+            print(f"Không thể cập nhật journal ghi: {e}")
+
+    if error is None or batch[0]['status'] == STATUS_FAILED:
+        _hooks['on_flush'](sheet_id)